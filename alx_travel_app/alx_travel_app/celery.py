@@ -13,6 +13,18 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+# Periodic tasks, run with `celery -A alx_travel_app beat`
+app.conf.beat_schedule = {
+    'send-pending-booking-confirmations': {
+        'task': 'listings.tasks.send_pending_confirmations',
+        'schedule': 300.0,
+    },
+    'refresh-listing-stats': {
+        'task': 'listings.tasks.refresh_listing_stats',
+        'schedule': 900.0,
+    },
+}
+
 
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
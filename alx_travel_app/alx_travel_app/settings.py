@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+from datetime import timedelta
 from pathlib import Path
 import environ
 
@@ -49,12 +50,14 @@ INSTALLED_APPS = [
     'rest_framework',
     'corsheaders',
     'drf_yasg',
+    'django_celery_results',
     
     # Local apps
     'listings',
 ]
 
 MIDDLEWARE = [
+    'listings.middleware.ProfilingMiddleware',  # first, so its wall time covers the rest
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware should be before CommonMiddleware
@@ -65,7 +68,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'alxtravelapp.urls'  # Directory name remains alxtravelapp but project name is alx_travel_app
+ROOT_URLCONF = 'alx_travel_app.urls'
 
 TEMPLATES = [
     {
@@ -82,7 +85,7 @@ TEMPLATES = [
     },
 ]
 
-WSGI_APPLICATION = 'alxtravelapp.wsgi.application'  # Directory name remains alxtravelapp but project name is alx_travel_app
+WSGI_APPLICATION = 'alx_travel_app.wsgi.application'
 
 
 # Database
@@ -92,6 +95,76 @@ DATABASES = {
     'default': env.db('DATABASE_URL', default='sqlite:///db.sqlite3')
 }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # The default in-memory test database uses SQLite's shared cache, where
+    # concurrent connections fail with "table is locked" instead of waiting.
+    # A file-backed test database keeps the busy timeout for threaded tests.
+    DATABASES['default'].setdefault('TEST', {'NAME': BASE_DIR / 'test_db.sqlite3'})
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory by default; set CACHE_URL=redis://host:6379/1 to share the
+# cache between workers.
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://')
+}
+
+# Seconds to keep cached listing list/detail responses (0 disables)
+LISTINGS_CACHE_ALIAS = 'default'
+LISTINGS_CACHE_TIMEOUT = env.int('LISTINGS_CACHE_TIMEOUT', default=300)
+# Seconds to keep ?facets= counts per filter combination (0 disables), and
+# how many cities/countries each lists
+LISTINGS_FACET_CACHE_TIMEOUT = env.int('LISTINGS_FACET_CACHE_TIMEOUT', default=30)
+LISTINGS_FACET_LIMIT = env.int('LISTINGS_FACET_LIMIT', default=20)
+
+# Dotted path to the ?search= backend; None picks PostgreSQL tsvector or
+# SQLite FTS5 from the database vendor, '' forces plain icontains search.
+LISTINGS_SEARCH_BACKEND = env('LISTINGS_SEARCH_BACKEND', default=None)
+
+
+# Email
+# https://docs.djangoproject.com/en/5.2/topics/email/
+# Booking confirmations go out through this backend (locmem under tests).
+
+EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', default='bookings@alxtravel.example')
+LISTINGS_EMAIL_DOMAIN = DEFAULT_FROM_EMAIL.rpartition('@')[2]
+
+# Confirmations per send_booking_confirmation task when the periodic sweep
+# re-enqueues lost ones, and which unsent bookings the sweep looks at.
+LISTINGS_CONFIRMATION_BATCH_SIZE = env.int('LISTINGS_CONFIRMATION_BATCH_SIZE', default=100)
+LISTINGS_CONFIRMATION_SWEEP_GRACE = timedelta(minutes=5)
+LISTINGS_CONFIRMATION_SWEEP_WINDOW = timedelta(days=2)
+
+# Items accepted per /api/bookings/batch/ or /batch-status/ request
+LISTINGS_BATCH_MAX_ITEMS = env.int('LISTINGS_BATCH_MAX_ITEMS', default=1000)
+
+# Rows fetched from the database per round trip by /api/bookings/export/
+LISTINGS_EXPORT_CHUNK_SIZE = env.int('LISTINGS_EXPORT_CHUNK_SIZE', default=2000)
+
+# Export jobs write gzip NDJSON files of this many bookings under this directory
+LISTINGS_EXPORT_ROOT = env('LISTINGS_EXPORT_ROOT', default=str(BASE_DIR / 'exports'))
+LISTINGS_EXPORT_CHUNK_ROWS = env.int('LISTINGS_EXPORT_CHUNK_ROWS', default=50000)
+
+
+# Rows per page of the /changes/ feeds, and how old a change must be to be
+# served (transactions still committing are given that long)
+LISTINGS_SYNC_PAGE_SIZE = env.int('LISTINGS_SYNC_PAGE_SIZE', default=500)
+LISTINGS_SYNC_LAG = timedelta(seconds=env.int('LISTINGS_SYNC_LAG_SECONDS', default=5))
+
+# The stats rollup only reads rows older than this, so transactions that
+# commit late are not skipped by its high-water mark.
+LISTINGS_STATS_LAG = timedelta(seconds=env.int('LISTINGS_STATS_LAG_SECONDS', default=60))
+
+# Request profiling (Server-Timing headers, /api/listings/perf-stats/).
+# Histograms are merged into the cache every FLUSH_SECONDS per process; SQL
+# repeated DUPLICATE_THRESHOLD times in one request is logged as an N+1.
+LISTINGS_PROFILING = env.bool('LISTINGS_PROFILING', default=True)
+LISTINGS_PROFILING_FLUSH_SECONDS = env.int('LISTINGS_PROFILING_FLUSH_SECONDS', default=10)
+LISTINGS_PROFILING_DUPLICATE_THRESHOLD = env.int('LISTINGS_PROFILING_DUPLICATE_THRESHOLD', default=3)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -145,6 +218,16 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    'DEFAULT_THROTTLE_CLASSES': [
+        'listings.throttling.TokenBucketThrottle',
+    ],
+}
+
+# Token-bucket limits per '<throttle_scope>.<action>' (listings/throttling.py),
+# per user or, for anonymous clients, per IP; other actions are not limited
+LISTINGS_THROTTLE_RATES = {
+    'listing.list': env('LISTINGS_THROTTLE_LISTING_LIST', default='120/min'),
+    'booking.create': env('LISTINGS_THROTTLE_BOOKING_CREATE', default='10/min'),
 }
 
 # CORS settings
@@ -0,0 +1,49 @@
+"""
+Amenity bitmasks for ``?amenities=`` filtering.
+
+``Listing.amenities`` stays free-form JSON; ``Listing.amenity_mask`` holds
+one bit per name in AMENITIES (append only, bit positions are stored) and
+is derived in save(). A filter becomes the short list of mask values that
+satisfy it, looked up in the ``amenity_mask`` index, or a bitwise AND when
+that list would be too long.
+"""
+AMENITIES = ('wifi', 'kitchen', 'parking', 'pool', 'air_conditioning', 'tv')
+BITS = {name: 1 << position for position, name in enumerate(AMENITIES)}
+ALL = (1 << len(AMENITIES)) - 1
+# Largest IN (...) list worth sending instead of a bitwise scan
+MAX_MASK_VALUES = 64
+
+
+def mask_for(amenities):
+    """Bitmask of a dict of name -> flag, or of a list of names."""
+    if isinstance(amenities, dict):
+        amenities = [name for name, present in amenities.items() if present]
+    elif not isinstance(amenities, (list, tuple)):
+        return 0
+    mask = 0
+    for name in amenities:
+        mask |= BITS.get(name, 0)
+    return mask
+
+
+def matching_masks(required, match='all'):
+    """
+    Sorted mask values having all (``match='all'``) or any of the bits in
+    ``required``, or None when there are more than MAX_MASK_VALUES.
+    """
+    missing = len(AMENITIES) - bin(required).count('1')
+    if match == 'all':
+        if 1 << missing > MAX_MASK_VALUES:
+            return None
+        # Walk the subsets of the bits not asked for
+        free = ALL & ~required
+        masks, subset = [], free
+        while True:
+            masks.append(required | subset)
+            if not subset:
+                return sorted(masks)
+            subset = (subset - 1) & free
+
+    if (ALL + 1) - (1 << missing) > MAX_MASK_VALUES:
+        return None
+    return [mask for mask in range(ALL + 1) if mask & required]
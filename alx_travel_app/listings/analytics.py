@@ -0,0 +1,235 @@
+"""
+Monthly listing rollups behind ``/listings/{id}/stats/`` and ``/listings/host-stats/``.
+
+ListingMonthlyStats holds, per listing and calendar month, the nights and
+revenue of confirmed/completed stays (a stay spanning months is split by
+night, revenue pro rata) and the reviews written that month. The periodic
+``refresh_listing_stats`` task only revisits listing-months touched by
+bookings and reviews whose ``updated_at`` passed the stored high-water
+mark, plus the months signals queued in StaleListingMonth because a stay
+moved away from them or a booking or review was deleted, recomputing each
+of those from source so reruns are harmless.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DateField, Min, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+REVENUE_STATUSES = ('CONFIRMED', 'COMPLETED')
+CENT = Decimal('0.01')
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def months_before(month, count):
+    """First day of the month ``count`` months before ``month``."""
+    index = month.year * 12 + month.month - 1 - count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def days_in_month(month):
+    return (next_month(month) - month).days
+
+
+def month_range(first, last):
+    """Months from ``first`` up to and including ``last``."""
+    months, month = [], month_start(first)
+    while month <= last:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def stay_months(check_in, check_out):
+    """Months holding at least one night of a stay."""
+    return month_range(check_in, check_out - timedelta(days=1))
+
+
+def split_stay(check_in, check_out, total_price):
+    """Yield ``(month, nights, revenue)``; rounding leftovers go to the last month."""
+    nights = (check_out - check_in).days
+    remaining = total_price
+    night = check_in
+    while night < check_out:
+        month_end = min(next_month(night), check_out)
+        in_month = (month_end - night).days
+        if month_end == check_out:
+            revenue = remaining
+        else:
+            revenue = (total_price * in_month / nights).quantize(CENT)
+            remaining -= revenue
+        yield month_start(night), in_month, revenue
+        night = month_end
+
+
+def _aware(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _touched(model, fields, since, upto):
+    rows = model.objects.filter(updated_at__lte=upto)
+    if since is not None:
+        rows = rows.filter(updated_at__gt=since)
+    return rows.values_list(*fields).iterator(chunk_size=5000)
+
+
+def mark_stale(listing_id, months):
+    """Queue listing-months whose rows no longer point at them for the next refresh."""
+    from .models import StaleListingMonth
+
+    StaleListingMonth.objects.bulk_create(
+        [StaleListingMonth(listing_id=listing_id, month=month) for month in months]
+    )
+
+
+def refresh_listing_stats(full=False, batch_size=500):
+    """
+    Bring ListingMonthlyStats up to date; returns the number of listing-months rewritten.
+
+    ``full`` drops the table and rebuilds it, which also catches changes
+    made behind the signals' back (``QuerySet.update``, raw SQL).
+    """
+    from .models import Booking, ListingMonthlyStats, Review, RollupWatermark, StaleListingMonth
+
+    # Rows committed late can carry an updated_at slightly in the past
+    upto = timezone.now() - settings.LISTINGS_STATS_LAG
+    marks = dict(RollupWatermark.objects.values_list('name', 'value'))
+    bookings_since = None if full else marks.get('bookings')
+    reviews_since = None if full else marks.get('reviews')
+
+    touched = defaultdict(set)
+    for listing_id, check_in, check_out in _touched(
+            Booking, ('listing_id', 'check_in', 'check_out'), bookings_since, upto):
+        touched[listing_id].update(stay_months(check_in, check_out))
+    for listing_id, created_at in _touched(Review, ('listing_id', 'created_at'), reviews_since, upto):
+        touched[listing_id].add(month_start(timezone.localdate(created_at)))
+    # Only the rows read here are cleared; ones queued meanwhile wait for the next run
+    stale = list(StaleListingMonth.objects.values_list('pk', 'listing_id', 'month'))
+    if not full:
+        for _, listing_id, month in stale:
+            touched[listing_id].add(month)
+
+    written = 0
+    with transaction.atomic():
+        if full:
+            ListingMonthlyStats.objects.all().delete()
+        for start in range(0, len(stale), batch_size):
+            StaleListingMonth.objects.filter(pk__in=[pk for pk, _, _ in stale[start:start + batch_size]]).delete()
+        listing_ids = sorted(touched)
+        for start in range(0, len(listing_ids), batch_size):
+            batch = {listing_id: touched[listing_id] for listing_id in listing_ids[start:start + batch_size]}
+            written += _rewrite(batch)
+        for name in ('bookings', 'reviews'):
+            RollupWatermark.objects.update_or_create(name=name, defaults={'value': upto})
+    return written
+
+
+def _rewrite(months_by_listing):
+    """Recompute the given listing-months from bookings and reviews."""
+    from .models import Booking, ListingMonthlyStats, Review
+
+    first = min(min(months) for months in months_by_listing.values())
+    last = next_month(max(max(months) for months in months_by_listing.values()))
+    totals = {
+        (listing_id, month): {'booked_nights': 0, 'revenue': Decimal('0'), 'bookings': 0,
+                              'review_count': 0, 'rating_total': 0}
+        for listing_id, months in months_by_listing.items() for month in months
+    }
+
+    stays = Booking.objects.filter(
+        listing_id__in=months_by_listing, status__in=REVENUE_STATUSES,
+        check_in__lt=last, check_out__gt=first,
+    ).values_list('listing_id', 'check_in', 'check_out', 'total_price')
+    for listing_id, check_in, check_out, total_price in stays.iterator(chunk_size=5000):
+        for index, (month, nights, revenue) in enumerate(split_stay(check_in, check_out, total_price)):
+            row = totals.get((listing_id, month))
+            if row is not None:
+                row['booked_nights'] += nights
+                row['revenue'] += revenue
+                # A stay counts as a booking in the month it starts in
+                row['bookings'] += index == 0
+
+    reviews = Review.objects.filter(
+        listing_id__in=months_by_listing, created_at__gte=_aware(first), created_at__lt=_aware(last),
+    ).annotate(month=TruncMonth('created_at', output_field=DateField())).values('listing_id', 'month').annotate(
+        count=Count('id'), rating=Sum('rating'),
+    ).order_by()
+    for review in reviews:
+        row = totals.get((review['listing_id'], review['month']))
+        if row is not None:
+            row['review_count'] = review['count']
+            row['rating_total'] = review['rating']
+
+    # Replace rather than upsert: ON CONFLICT with a target is not portable
+    # (MySQL has no such clause); the caller's transaction hides the gap
+    recomputed = Q()
+    for listing_id, months in months_by_listing.items():
+        recomputed |= Q(listing_id=listing_id, month__in=months)
+    ListingMonthlyStats.objects.filter(recomputed).delete()
+    ListingMonthlyStats.objects.bulk_create([
+        ListingMonthlyStats(listing_id=listing_id, month=month, **values)
+        for (listing_id, month), values in totals.items() if any(values.values())
+    ])
+    return len(totals)
+
+
+def opening_days(listings):
+    """
+    The day each of ``listings`` became available: when it was created, or
+    the first month it has rollup rows for if that is earlier (imported or
+    seeded history).
+    """
+    rows = listings.annotate(first_month=Min('monthly_stats__month')).values_list('created_at', 'first_month')
+    return [min(timezone.localdate(created_at), first_month or date.max) for created_at, first_month in rows]
+
+
+def available_nights(month, opened):
+    """Nights of ``month`` on or after each day in ``opened``, summed."""
+    end = next_month(month)
+    return sum((end - max(month, day)).days for day in opened if day < end)
+
+
+def summarize(rows, opened):
+    """
+    Month-by-month figures plus totals for rollup ``rows``.
+
+    ``rows`` are dicts with ``month`` and the summed rollup columns;
+    ``opened`` holds the opening day of each listing the nights are shared
+    between (see ``opening_days``).
+    """
+    months = []
+    totals = {'booked_nights': 0, 'available_nights': 0, 'revenue': Decimal('0'),
+              'bookings': 0, 'review_count': 0, 'rating_total': 0}
+    for row in rows:
+        available = available_nights(row['month'], opened)
+        months.append(_figures(row, available))
+        totals['available_nights'] += available
+        for key in ('booked_nights', 'revenue', 'bookings', 'review_count', 'rating_total'):
+            totals[key] += row[key]
+    return months, _figures(totals, totals['available_nights'])
+
+
+def _figures(row, available):
+    figures = {
+        'booked_nights': row['booked_nights'],
+        'available_nights': available,
+        'occupancy_rate': round(row['booked_nights'] / available, 4) if available else 0.0,
+        'revenue': row['revenue'],
+        'bookings': row['bookings'],
+        'review_count': row['review_count'],
+        'average_rating': round(row['rating_total'] / row['review_count'], 2) if row['review_count'] else None,
+    }
+    if 'month' in row:
+        figures = {'month': row['month'].strftime('%Y-%m'), **figures}
+    return figures
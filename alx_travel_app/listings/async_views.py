@@ -0,0 +1,123 @@
+"""
+Async listing reads for ASGI deployments.
+
+The views reuse ListingViewSet's queryset, filter backends, pagination and
+fast serializers, so their JSON matches ``/listings/`` and
+``/listings/{id}/`` for the same query string, including availability
+search. Only the queries differ: they go through the async ORM, so under
+ASGI a worker keeps serving other requests while one waits on the
+database. They render JSON only (no browsable API); paging links point
+back at the async endpoint. Responses are cached in response_cache and
+retired by the same writes as the sync ones.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework.renderers import JSONRenderer
+from rest_framework.views import exception_handler
+
+from . import profiling
+from .cache import response_cache
+from .fast_serializers import FastListingSerializer
+from .models import Listing
+from .views import ListingViewSet
+
+
+def _render(data, status=200, headers=None):
+    response = HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status)
+    for name, value in (headers or {}).items():
+        response[name] = value
+    return response
+
+
+class AsyncListingView(View):
+    """Base for the async reads: sets up a ListingViewSet to borrow from."""
+    action = None
+
+    async def get(self, request, **kwargs):
+        viewset = ListingViewSet(action_map={'get': self.action}, format_kwarg=None, args=(), kwargs=kwargs)
+        viewset.request = viewset.initialize_request(request)
+        try:
+            # Permission classes may need request.user, which can hit the session table
+            await sync_to_async(viewset.check_permissions)(viewset.request)
+            await sync_to_async(viewset.check_throttles)(viewset.request)
+            response = await self.cached(viewset, **kwargs)
+        except Exception as exc:
+            response = exception_handler(exc, {'view': viewset, 'request': viewset.request})
+            if response is None:
+                raise
+            headers = {name: value for name, value in response.items() if name.lower() != 'content-type'}
+            response = _render(response.data, response.status_code, headers)
+        rate_limit = getattr(viewset.request, 'rate_limit', None)
+        if rate_limit is not None:
+            for name, value in rate_limit.headers().items():
+                response[name] = value
+        return response
+
+    def cache_key(self, request, **kwargs):
+        raise NotImplementedError
+
+    async def build(self, viewset, **kwargs):
+        raise NotImplementedError
+
+    async def cached(self, viewset, **kwargs):
+        """The response data from response_cache, or built and cached, as the sync views do."""
+        if not response_cache.enabled:
+            return _render(await self.build(viewset, **kwargs))
+
+        key = await sync_to_async(self.cache_key)(viewset.request, **kwargs)
+        data = await sync_to_async(response_cache.get)(key)
+        if data is not None:
+            return _render(data, headers={'X-Cache': 'HIT'})
+        data = await self.build(viewset, **kwargs)
+        await sync_to_async(response_cache.set)(key, data)
+        return _render(data, headers={'X-Cache': 'MISS'})
+
+
+class AsyncListingList(AsyncListingView):
+    """``GET /async/listings/``: ListingViewSet.list with the async ORM."""
+    action = 'list'
+
+    def cache_key(self, request):
+        # Kept apart from the sync entries, whose paging links differ
+        return f'{response_cache.list_key(request)}:async'
+
+    async def build(self, viewset):
+        request = viewset.request
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        serializer = viewset.get_fast_serializer(queryset)
+        rows = serializer.prepare(queryset)
+
+        paginator = viewset.paginator
+        page = await paginator.apaginate_queryset(rows, request, view=viewset) if paginator else None
+        if page is None:
+            rows = [row async for row in rows]
+            with profiling.span(request):
+                return serializer.serialize_many(rows)
+        with profiling.span(request):
+            data = serializer.serialize_many(page)
+        data = paginator.get_paginated_response(data).data
+        data.update(await sync_to_async(viewset.list_extras)(queryset))
+        return data
+
+
+class AsyncListingDetail(AsyncListingView):
+    """``GET /async/listings/{id}/``: ListingViewSet.retrieve with the async ORM."""
+    action = 'retrieve'
+
+    def cache_key(self, request, pk):
+        return response_cache.detail_key(request, pk)
+
+    async def build(self, viewset, pk):
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        # Like ListingSerializer: is_available is annotated when dates are given, else null
+        serializer = FastListingSerializer(
+            availability='annotated' if 'is_available' in queryset.query.annotations else None
+        )
+        try:
+            row = await serializer.prepare(queryset).aget(pk=pk)
+        except (Listing.DoesNotExist, TypeError, ValueError, DjangoValidationError):
+            raise Http404
+        with profiling.span(viewset.request):
+            return serializer.to_representation(row)
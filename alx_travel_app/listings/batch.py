@@ -0,0 +1,183 @@
+"""
+Batch booking imports and status changes for channel-manager integrations.
+
+Items are validated one by one in memory, then handled per listing under
+its listing_lock: one query loads the active bookings overlapping the
+group's dates, conflicts with them and with earlier items of the same
+batch are found in an Occupancy bitmap, and the accepted rows are written
+with one bulk_create. Status changes are checked against
+Booking.STATUS_TRANSITIONS and written with one bulk_update.
+
+Every item gets a result ``{'index', 'code', 'id' | 'errors'}`` with an
+HTTP-like code; a failed item never undoes the others. Bulk writes skip
+signals, so calendars, the response cache and confirmation emails are
+handled here.
+"""
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .cache import response_cache
+from .calendar import Occupancy, refresh_calendar
+from .locks import listing_lock
+from .models import Booking, Listing
+from .serializers import BookingImportSerializer, BookingStatusItemSerializer
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+UNAVAILABLE = "This listing is not available for the selected dates."
+
+
+def _failed(index, code, errors):
+    return {'index': index, 'code': code, 'errors': errors}
+
+
+def _validated(items, serializer_class, results):
+    valid = []
+    for index, item in enumerate(items):
+        serializer = serializer_class(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = _failed(index, 400, serializer.errors)
+    return valid
+
+
+def import_bookings(items):
+    """Create the bookings described by ``items`` (BookingImportSerializer data)."""
+    results = [None] * len(items)
+    valid = _validated(items, BookingImportSerializer, results)
+
+    listings = Listing.objects.only('id', 'price_per_night', 'max_guests').in_bulk(
+        {data['listing'] for _, data in valid}
+    )
+    guests = set(
+        User.objects.filter(pk__in={data['guest_id'] for _, data in valid}).values_list('pk', flat=True)
+    )
+    groups = defaultdict(list)
+    for index, data in valid:
+        listing = listings.get(data['listing'])
+        if listing is None:
+            results[index] = _failed(index, 400, {'listing': [f"Invalid pk \"{data['listing']}\" - object does not exist."]})
+        elif data['guest_id'] not in guests:
+            results[index] = _failed(index, 400, {'guest_id': [f"Invalid pk \"{data['guest_id']}\" - object does not exist."]})
+        elif data['number_of_guests'] > listing.max_guests:
+            results[index] = _failed(index, 400, {
+                'number_of_guests': [f'Maximum {listing.max_guests} guests allowed for this listing.']
+            })
+        else:
+            groups[listing.pk].append((index, data))
+
+    created = []
+    # Fixed lock order, so two imports touching the same listings cannot deadlock
+    for listing_id in sorted(groups):
+        created.extend(_import_group(listings[listing_id], groups[listing_id], results))
+
+    if created:
+        transaction.on_commit(lambda: _enqueue_confirmations(created))
+    return results
+
+
+def _import_group(listing, group, results):
+    first = min(data['check_in'] for _, data in group)
+    last = max(data['check_out'] for _, data in group)
+    with listing_lock(listing.pk):
+        taken = Occupancy.from_stays(
+            Booking.objects.overlapping(first, last).filter(listing_id=listing.pk).values_list('check_in', 'check_out')
+        )
+        accepted = []
+        for index, data in group:
+            if taken.blocked_nights(data['check_in'], data['check_out']):
+                results[index] = _failed(index, 409, {'non_field_errors': [UNAVAILABLE]})
+                continue
+            taken.fill(data['check_in'], data['check_out'], True)
+            nights = (data['check_out'] - data['check_in']).days
+            accepted.append((index, Booking(
+                listing_id=listing.pk,
+                guest_id=data['guest_id'],
+                check_in=data['check_in'],
+                check_out=data['check_out'],
+                number_of_guests=data['number_of_guests'],
+                special_requests=data['special_requests'],
+                total_price=nights * listing.price_per_night,
+            )))
+        if not accepted:
+            return []
+
+        bookings = Booking.objects.bulk_create([booking for _, booking in accepted])
+        if not connections[Booking.objects.db].features.can_return_rows_from_bulk_insert:
+            _read_back_ids(listing, bookings)
+        for (index, _), booking in zip(accepted, bookings):
+            results[index] = {'index': index, 'code': 201, 'id': booking.pk}
+        refresh_calendar(listing.pk, [(booking.check_in, booking.check_out) for booking in bookings])
+        response_cache.invalidate(listing.pk, bookings=True)
+    return [booking.pk for booking in bookings]
+
+
+def _read_back_ids(listing, bookings):
+    """
+    Set the pks bulk_create could not return (MySQL). Under the listing lock
+    no two active bookings of the listing overlap, so each new booking is
+    the only active one starting on its check-in.
+    """
+    ids = dict(
+        Booking.objects.active().filter(listing_id=listing.pk, check_in__in=[b.check_in for b in bookings])
+        .values_list('check_in', 'pk')
+    )
+    for booking in bookings:
+        booking.pk = ids[booking.check_in]
+
+
+def _enqueue_confirmations(booking_ids):
+    from .tasks import send_booking_confirmation
+
+    batch_size = settings.LISTINGS_CONFIRMATION_BATCH_SIZE
+    try:
+        for start in range(0, len(booking_ids), batch_size):
+            send_booking_confirmation.delay(booking_ids[start:start + batch_size])
+    except Exception:
+        # The bookings are saved; send_pending_confirmations retries them
+        logger.exception("Could not queue confirmations for %d imported booking(s)", len(booking_ids))
+
+
+def update_statuses(items):
+    """Apply ``items`` (BookingStatusItemSerializer data) in order, as single updates would."""
+    results = [None] * len(items)
+    valid = _validated(items, BookingStatusItemSerializer, results)
+
+    with transaction.atomic():
+        bookings = Booking.objects.select_for_update().only(
+            'id', 'listing_id', 'status', 'check_in', 'check_out'
+        ).in_bulk({data['id'] for _, data in valid})
+
+        now = timezone.now()
+        changed, freed = {}, defaultdict(list)
+        for index, data in valid:
+            booking = bookings.get(data['id'])
+            if booking is None:
+                results[index] = _failed(index, 404, {'id': ['Not found.']})
+                continue
+            current, status = booking.status, data['status']
+            if status not in Booking.STATUS_TRANSITIONS.get(current, []):
+                results[index] = _failed(index, 400, {'status': [f"Cannot change status from {current} to {status}"]})
+                continue
+            # No transition re-activates a booking, so the nights can only be freed
+            if current in Booking.ACTIVE_STATUSES and status not in Booking.ACTIVE_STATUSES:
+                freed[booking.listing_id].append((booking.check_in, booking.check_out))
+            booking.status, booking.updated_at = status, now
+            changed[booking.pk] = booking
+            results[index] = {'index': index, 'code': 200, 'id': booking.pk}
+
+        # bulk_update() skips auto_now, hence updated_at above; the stats rollup keys on it
+        Booking.objects.bulk_update(changed.values(), ['status', 'updated_at'])
+        for listing_id in sorted(freed):
+            refresh_calendar(listing_id, freed[listing_id])
+        for listing_id in {booking.listing_id for booking in changed.values()}:
+            response_cache.invalidate(listing_id, bookings=True)
+    return results
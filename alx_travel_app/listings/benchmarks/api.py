@@ -0,0 +1,182 @@
+"""
+End-to-end latency of the listing and booking endpoints.
+
+Requests go through the test client, so every middleware, the viewsets,
+filters, pagination and serializers are measured together. The response
+cache is off so each request reaches the database. Every case reports
+p50/p95/p99, throughput and queries per request; ``booking-create`` has
+THREADS guests race for the same nights of one listing each round.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from alx_travel_app.celery import app as celery_app
+
+from ..models import Booking, Listing
+from .base import measure, summarize
+from .data import seed
+
+User = get_user_model()
+
+THREADS = 8
+# Seeded stays reach a few years ahead at most; benchmark bookings go further
+FAR_FUTURE = timedelta(days=20 * 365)
+STAY_NIGHTS = 2
+
+
+def _reads():
+    check_in = date.today() + timedelta(days=30)
+    return [
+        ('list', {}),
+        ('filter', {'city': 'Nairobi', 'min_price': 50, 'max_price': 200, 'ordering': 'price_per_night'}),
+        ('search', {'search': 'mombasa'}),
+        ('availability', {
+            'check_in': check_in.isoformat(), 'check_out': (check_in + timedelta(days=3)).isoformat(), 'guests': 2,
+        }),
+    ]
+
+
+def _payload(listing, guest, check_in):
+    return {
+        'listing': listing.pk,
+        'guest_id': guest.pk,
+        'check_in': check_in.isoformat(),
+        'check_out': (check_in + timedelta(days=STAY_NIGHTS)).isoformat(),
+        'number_of_guests': 1,
+    }
+
+
+def _queries(fn):
+    with CaptureQueriesContext(connection) as ctx:
+        fn()
+    return len(ctx.captured_queries)
+
+
+def _client(user=None):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    return client
+
+
+def _expect(response, status_code):
+    if response.status_code != status_code:
+        raise AssertionError(f'{response.status_code} from {response.request["PATH_INFO"]}: {response.content[:200]!r}')
+
+
+@contextmanager
+def _environment():
+    # As under the test runner: 'testserver' is an allowed host and mail goes
+    # to locmem. Confirmations run inline, there is no broker to queue them on.
+    setup_test_environment()
+    eager = celery_app.conf.task_always_eager
+    celery_app.conf.task_always_eager = True
+    # Lost booking races are expected; don't log every 400
+    request_logger = logging.getLogger('django.request')
+    level = request_logger.level
+    request_logger.setLevel(logging.ERROR)
+    try:
+        # One client sends every request; the rate limits would turn them into 429s
+        with override_settings(LISTINGS_CACHE_TIMEOUT=0, LISTINGS_THROTTLE_RATES={}):
+            yield
+    finally:
+        celery_app.conf.task_always_eager = eager
+        request_logger.setLevel(level)
+        teardown_test_environment()
+
+
+def _contend(listing, guests, first_night, rounds):
+    """Each round every guest posts the same stay at once; at most one may win."""
+    url = reverse('listings:booking-list')
+    samples, outcomes, lock = [], Counter(), threading.Lock()
+
+    def attempt(guest, barrier, check_in):
+        client = _client(guest)
+        try:
+            barrier.wait()
+            start = time.perf_counter()
+            response = client.post(url, _payload(listing, guest, check_in), format='json')
+            elapsed = time.perf_counter() - start
+            with lock:
+                samples.append(elapsed)
+                outcomes[response.status_code] += 1
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    for index in range(rounds):
+        check_in = first_night + timedelta(days=STAY_NIGHTS * index)
+        barrier = threading.Barrier(len(guests))
+        workers = [threading.Thread(target=attempt, args=(guest, barrier, check_in)) for guest in guests]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    elapsed = time.perf_counter() - start
+    return summarize(samples, elapsed), outcomes
+
+
+def run(sizes, repeat, stdout):
+    results = []
+    inserted = 0
+    with _environment():
+        for size in sizes:
+            added = size - inserted
+            seed(seed=size, users=max(THREADS + 2, added // 10), listings=added, bookings=added * 2,
+                 reviews=added // 2)
+            inserted = size
+            stdout.write(f'{Listing.objects.count()} listings, {Booking.objects.count()} bookings')
+
+            def report(case, stats, **extra):
+                results.append({'size': size, 'case': case, **stats, **extra})
+                stdout.write(
+                    f"  {case:<16} p50={stats['p50_ms']:.2f}ms p95={stats['p95_ms']:.2f}ms "
+                    f"p99={stats['p99_ms']:.2f}ms {stats['throughput_rps']:.0f} req/s "
+                    f"{extra.get('queries', '-')} queries"
+                )
+
+            anonymous = _client()
+            list_url = reverse('listings:listing-list')
+            for case, params in _reads():
+                def read():
+                    _expect(anonymous.get(list_url, params), 200)
+                report(case, measure(read, repeat=repeat), queries=_queries(read))
+
+            # The newest listing belongs to this size's batch, so earlier rounds never collide
+            listing = Listing.objects.filter(is_active=True).order_by('-id').first()
+            staff = User.objects.create(username=f'bench-staff-{size}', is_staff=True)
+            guests = [User.objects.create(username=f'bench-guest-{size}-{n}') for n in range(THREADS)]
+            night = date.today() + FAR_FUTURE
+
+            def book():
+                nonlocal night
+                _expect(_client(guests[0]).post(reverse('listings:booking-list'),
+                                                _payload(listing, guests[0], night), format='json'), 201)
+                night += timedelta(days=STAY_NIGHTS)
+            queries = _queries(book)
+            stats, outcomes = _contend(listing, guests, night + timedelta(days=STAY_NIGHTS), repeat)
+            night += timedelta(days=STAY_NIGHTS * (repeat + 1))
+            report('booking-create', stats, queries=queries, created=outcomes[201], conflicts=outcomes[400],
+                   errors=sum(count for code, count in outcomes.items() if code not in (201, 400)))
+
+            for _ in range(repeat + 3):
+                book()
+            pending = iter(list(Booking.objects.filter(listing=listing, status='PENDING').values_list('pk', flat=True)))
+            admin = _client(staff)
+
+            def update_status():
+                url = reverse('listings:booking-update-status', args=[next(pending)])
+                _expect(admin.patch(url, {'status': 'CONFIRMED'}, format='json'), 200)
+            report('booking-status', measure(update_status, repeat=repeat), queries=_queries(update_status))
+    return results
@@ -0,0 +1,162 @@
+"""
+Concurrent throughput of the listing reads: WSGI threads vs ASGI tasks.
+
+``wsgi`` serves the sync ``/listings/`` through Django's WSGI handler with
+a thread per client, like a threaded WSGI server. ``asgi`` serves
+``/async/listings/`` through the ASGI handler with every client a task on
+one event loop; ``asgi-sync`` is the sync view under ASGI, which Django
+runs in a thread per request. Each client sends ``repeat`` requests back
+to back. The handlers are called in-process, so the figures leave out
+the network and HTTP parsing but include every middleware.
+"""
+import asyncio
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from ..models import Listing
+from .base import summarize
+from .data import seed
+
+CONCURRENCY = [1, 8, 32]
+
+
+def _cases():
+    check_in = date.today() + timedelta(days=30)
+    return [
+        ('list', ''),
+        ('availability', urlencode({
+            'check_in': check_in.isoformat(), 'check_out': (check_in + timedelta(days=3)).isoformat(),
+        })),
+    ]
+
+
+def _wsgi_get(application, path, query):
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr, 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    statuses = []
+    response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        b''.join(response)
+    finally:
+        # Like a WSGI server: fires request_finished, which closes the connection
+        response.close()
+    return int(statuses[0].split()[0])
+
+
+async def _asgi_get(application, path, query):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+        'headers': [(b'host', b'testserver')], 'server': ('testserver', 80), 'client': ('127.0.0.1', 0),
+    }
+    received, messages = False, []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await asyncio.Event().wait()  # The client never disconnects early
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    return messages[0]['status']
+
+
+def _check(status, path):
+    if status != 200:
+        raise AssertionError(f'{status} from {path}')
+
+
+def _threaded(application, path, query, concurrency, repeat):
+    samples, lock = [], threading.Lock()
+
+    def client():
+        for _ in range(repeat):
+            start = time.perf_counter()
+            _check(_wsgi_get(application, path, query), path)
+            elapsed = time.perf_counter() - start
+            with lock:
+                samples.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for future in [pool.submit(client) for _ in range(concurrency)]:
+            future.result()
+    return summarize(samples, time.perf_counter() - start)
+
+
+def _evented(application, path, query, concurrency, repeat):
+    samples = []
+
+    async def client():
+        for _ in range(repeat):
+            start = time.perf_counter()
+            _check(await _asgi_get(application, path, query), path)
+            samples.append(time.perf_counter() - start)
+
+    async def main():
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(main())
+    return summarize(samples, elapsed)
+
+
+def run(sizes, repeat, stdout):
+    sync_path, async_path = reverse('listings:listing-list'), reverse('listings:listing-list-async')
+    wsgi, asgi = get_wsgi_application(), get_asgi_application()
+    deployments = [
+        ('wsgi', lambda *args: _threaded(wsgi, sync_path, *args)),
+        ('asgi', lambda *args: _evented(asgi, async_path, *args)),
+        ('asgi-sync', lambda *args: _evented(asgi, sync_path, *args)),
+    ]
+
+    results = []
+    inserted = 0
+    setup_test_environment()
+    try:
+        # Every request should reach the database, not the response cache or
+        # the rate limits
+        with override_settings(LISTINGS_CACHE_TIMEOUT=0, LISTINGS_THROTTLE_RATES={}):
+            for size in sizes:
+                added = size - inserted
+                seed(seed=size, users=max(2, added // 10), listings=added, bookings=added * 2)
+                inserted = size
+                stdout.write(f'{Listing.objects.count()} listings')
+
+                for case, query in _cases():
+                    for concurrency in CONCURRENCY:
+                        for deployment, measure in deployments:
+                            stats = measure(query, concurrency, repeat)
+                            results.append({
+                                'size': size, 'case': case, 'deployment': deployment,
+                                'concurrency': concurrency, **stats,
+                            })
+                            stdout.write(
+                                f"  {case:<13} {deployment:<10} x{concurrency:<3} "
+                                f"p50={stats['p50_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms "
+                                f"{stats['throughput_rps']:.0f} req/s"
+                            )
+    finally:
+        teardown_test_environment()
+    return results
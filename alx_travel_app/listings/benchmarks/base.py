@@ -0,0 +1,97 @@
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.test.utils import setup_databases, teardown_databases
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    """
+    Run a benchmark against a throwaway copy of the test database.
+
+    Benchmarks generate hundreds of thousands of rows; they must never
+    land in the development database.
+    """
+    old_config = setup_databases(verbosity=0, interactive=False, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0, keepdb=keepdb)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed=None):
+    """
+    Latency summary in milliseconds for a list of durations in seconds.
+
+    Throughput is runs per second of ``elapsed`` wall time, which defaults
+    to the sum of the samples (runs one after another).
+    """
+    values = sorted(sample * 1000 for sample in samples)
+    elapsed = sum(samples) if elapsed is None else elapsed
+    return {
+        'runs': len(values),
+        'mean_ms': round(statistics.fmean(values), 3) if values else 0.0,
+        'p50_ms': round(percentile(values, 50), 3),
+        'p95_ms': round(percentile(values, 95), 3),
+        'p99_ms': round(percentile(values, 99), 3),
+        'throughput_rps': round(len(values) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def measure(fn, repeat=20, warmup=2):
+    """Call ``fn`` ``warmup + repeat`` times and summarize the timed runs."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+# Result fields that are measured rather than identifying a measurement
+MEASUREMENTS = {
+    'runs', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps',
+    'queries', 'rows_per_s', 'matches', 'created', 'conflicts', 'errors',
+    'status', 'bytes', 'cpu_ms',
+}
+# Latency changes smaller than this are noise, whatever the percentage
+MIN_DELTA_MS = 1.0
+
+
+def _identity(result):
+    return tuple(sorted((key, value) for key, value in result.items() if key not in MEASUREMENTS))
+
+
+def compare(results, baseline, threshold, metric='p95_ms'):
+    """
+    Regressions of ``results`` against the ``baseline`` results of an earlier run.
+
+    A measurement regresses when ``metric`` grew by more than ``threshold``
+    (0.2 is 20%) and MIN_DELTA_MS, or when it needs more queries. Returns
+    one message per regression; measurements missing on either side are
+    skipped.
+    """
+    previous = {_identity(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(_identity(result))
+        if before is None:
+            continue
+        label = ' '.join(f'{key}={value}' for key, value in _identity(result))
+        old, new = before.get(metric), result.get(metric)
+        if old is not None and new is not None and new > old * (1 + threshold) and new - old >= MIN_DELTA_MS:
+            regressions.append(f'{label}: {metric} {old:.2f}ms -> {new:.2f}ms')
+        if result.get('queries', 0) > before.get('queries', result.get('queries', 0)):
+            regressions.append(f"{label}: queries {before['queries']} -> {result['queries']}")
+    return regressions
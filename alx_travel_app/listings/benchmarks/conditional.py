@@ -0,0 +1,80 @@
+"""
+What conditional GETs save on polled listing reads.
+
+For each case a client first fetches the resource, then keeps polling it
+two ways: ``full`` repeats the plain GET and gets the whole body again,
+``revalidate`` sends the ETag back and gets a 304. Each reports latency,
+the response bytes and the process CPU time per request, and queries. The
+response cache is off, so both reach the database and ``full`` serializes
+every time.
+"""
+import time
+
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..models import Listing
+from .base import measure
+from .data import seed
+
+
+def _cases():
+    listing = Listing.objects.filter(is_active=True).order_by('-id').first()
+    return [
+        ('list', reverse('listings:listing-list'), {}),
+        ('filter', reverse('listings:listing-list'), {'city': 'Nairobi', 'min_price': 50, 'ordering': 'price_per_night'}),
+        ('detail', reverse('listings:listing-detail', args=[listing.pk]), {}),
+    ]
+
+
+def _poll(client, url, params, headers, repeat):
+    """Latency, bytes, CPU and queries of ``repeat`` identical requests."""
+    def get():
+        response = client.get(url, params, **headers)
+        sizes.append(len(response.content))
+        return response
+
+    sizes = []
+    cpu = time.process_time()
+    stats = measure(get, repeat=repeat, warmup=0)
+    cpu = time.process_time() - cpu
+    with CaptureQueriesContext(connection) as ctx:
+        status = get().status_code
+    return {
+        **stats,
+        'status': status,
+        'bytes': round(sum(sizes) / len(sizes)),
+        'cpu_ms': round(cpu / repeat * 1000, 3),
+        'queries': len(ctx.captured_queries),
+    }
+
+
+def run(sizes, repeat, stdout):
+    results = []
+    inserted = 0
+    setup_test_environment()
+    try:
+        with override_settings(LISTINGS_CACHE_TIMEOUT=0, LISTINGS_THROTTLE_RATES={}):
+            for size in sizes:
+                added = size - inserted
+                seed(seed=size, users=max(2, added // 10), listings=added, bookings=added, reviews=added // 4)
+                inserted = size
+                stdout.write(f'{Listing.objects.count()} listings')
+
+                client = APIClient()
+                for case, url, params in _cases():
+                    etag = client.get(url, params)['ETag']
+                    for mode, headers in (('full', {}), ('revalidate', {'HTTP_IF_NONE_MATCH': etag})):
+                        stats = _poll(client, url, params, headers, repeat)
+                        results.append({'size': size, 'case': case, 'mode': mode, **stats})
+                        stdout.write(
+                            f"  {case:<7} {mode:<10} {stats['status']} p50={stats['p50_ms']:.2f}ms "
+                            f"p95={stats['p95_ms']:.2f}ms cpu={stats['cpu_ms']:.2f}ms "
+                            f"{stats['bytes']} bytes {stats['queries']} queries"
+                        )
+    finally:
+        teardown_test_environment()
+    return results
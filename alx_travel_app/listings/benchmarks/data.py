@@ -0,0 +1,15 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+
+def seed(seed=42, batch_size=5000, **counts):
+    """
+    Append a dataset through ``manage.py seed --bulk``.
+
+    ``counts`` are the seed command's ``users``/``listings``/``bookings``/
+    ``reviews`` options; the command also refreshes rating aggregates and
+    the search index.
+    """
+    options = {'users': 0, 'listings': 0, 'bookings': 0, 'reviews': 0, **counts}
+    call_command('seed', bulk=True, seed=seed, batch_size=batch_size, stdout=StringIO(), **options)
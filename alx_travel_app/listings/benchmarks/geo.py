@@ -0,0 +1,56 @@
+"""
+Latency of ``?near=``: haversine over every active listing vs geo_cell pruning.
+
+Each query mirrors what ListingViewSet.list does for a page: a COUNT(*)
+for the paginator plus the nearest page of rows.
+"""
+from ..geo import haversine_km
+from ..models import Listing
+from .base import measure
+from .data import seed
+
+# A seeded city centre (dense) and a spot 30 km outside one (sparse)
+POINTS = {'nairobi': (-1.2921, 36.8219), 'outskirts': (-33.9249, 18.7500)}
+RADII_KM = [1, 5, 25]
+PAGE_SIZE = 10
+
+
+def _scan(latitude, longitude, radius_km):
+    return Listing.objects.filter(is_active=True).annotate(
+        distance_km=haversine_km(latitude, longitude)
+    ).filter(distance_km__lte=radius_km)
+
+
+def _tiles(latitude, longitude, radius_km):
+    return Listing.objects.filter(is_active=True).nearby(latitude, longitude, radius_km)
+
+
+def _query(build, point, radius_km):
+    queryset = build(*point, radius_km).order_by('distance_km', 'id')
+    queryset.count()
+    list(queryset.values('id', 'distance_km')[:PAGE_SIZE])
+
+
+def run(sizes, repeat, stdout):
+    results = []
+    inserted = 0
+    for size in sizes:
+        added = size - inserted
+        seed(seed=size, users=max(2, added // 100), listings=added)
+        inserted = size
+        stdout.write(f'{Listing.objects.count()} listings')
+
+        for name, build in (('scan', _scan), ('geo_cell', _tiles)):
+            for place, point in POINTS.items():
+                for radius_km in RADII_KM:
+                    stats = measure(lambda: _query(build, point, radius_km), repeat=repeat)
+                    matches = build(*point, radius_km).count()
+                    results.append({
+                        'size': size, 'strategy': name, 'point': place,
+                        'radius_km': radius_km, 'matches': matches, **stats,
+                    })
+                    stdout.write(
+                        f"  {name:<9} {place:<10} {radius_km:>3}km {matches:>7} hits "
+                        f"p50={stats['p50_ms']:.2f}ms p95={stats['p95_ms']:.2f}ms"
+                    )
+    return results
@@ -0,0 +1,51 @@
+"""
+Latency of ``?search=``: DRF's icontains SearchFilter vs the full-text backend.
+
+Each query mirrors what ListingViewSet.list does for a page: a COUNT(*)
+for the paginator plus the first page of rows.
+"""
+from rest_framework import filters
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from ..models import Listing
+from ..search import ListingSearchFilter, get_search_backend
+from ..views import ListingViewSet
+from .base import measure
+from .data import seed
+
+# Seeded text comes from Faker's word list; the last term is a prefix
+TERMS = ['power', 'decide maintain', 'mombasa', 'know']
+PAGE_SIZE = 10
+
+
+def _query(filter_class, term):
+    request = Request(APIRequestFactory().get('/', {'search': term}))
+    view = ListingViewSet(request=request, action='list', format_kwarg=None)
+    queryset = filter_class().filter_queryset(request, view.get_queryset(), view)
+    queryset.count()
+    list(queryset[:PAGE_SIZE])
+
+
+def run(sizes, repeat, stdout):
+    backend = get_search_backend()
+    candidates = [('icontains', filters.SearchFilter)]
+    if backend is not None:
+        candidates.append((type(backend).__name__, ListingSearchFilter))
+
+    results = []
+    inserted = 0
+    for size in sizes:
+        added = size - inserted
+        seed(seed=size, users=max(2, added // 100), listings=added)
+        inserted = size
+        stdout.write(f'{Listing.objects.count()} listings')
+
+        for name, filter_class in candidates:
+            for term in TERMS:
+                stats = measure(lambda: _query(filter_class, term), repeat=repeat)
+                results.append({'size': size, 'backend': name, 'term': term, **stats})
+                stdout.write(
+                    f"  {name:<24} {term!r:<16} p50={stats['p50_ms']:.2f}ms p95={stats['p95_ms']:.2f}ms"
+                )
+    return results
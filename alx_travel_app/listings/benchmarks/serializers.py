@@ -0,0 +1,50 @@
+"""
+Serialization throughput of list pages: ModelSerializers vs fast_serializers.
+
+Both sides read the same rows with every relation joined up front, so the
+difference is serialization cost rather than N+1 queries.
+"""
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from ..fast_serializers import FastListingSerializer, FastBookingSerializer
+from ..models import Listing, Booking
+from ..serializers import ListingSerializer, BookingSerializer
+from .base import measure
+from .data import seed
+
+CASES = [
+    ('listing', ListingSerializer, FastListingSerializer,
+     lambda: Listing.objects.select_related('host')),
+    ('booking', BookingSerializer, FastBookingSerializer,
+     lambda: Booking.objects.select_related('listing__host', 'guest', 'review__reviewer')),
+]
+
+
+def run(sizes, repeat, stdout):
+    context = {'request': Request(APIRequestFactory().get('/'))}
+    results = []
+    inserted = 0
+    for size in sizes:
+        added = size - inserted
+        seed(seed=size, users=max(2, added // 10), listings=added, bookings=added, reviews=added // 4)
+        inserted = size
+
+        for name, serializer_class, fast_class, queryset in CASES:
+            def legacy():
+                serializer_class(list(queryset()[:size]), many=True, context=context).data
+
+            def fast():
+                serializer = fast_class()
+                serializer.serialize_many(serializer.prepare(queryset()[:size]))
+
+            for variant, fn in (('ModelSerializer', legacy), ('fast', fast)):
+                stats = measure(fn, repeat=repeat, warmup=1)
+                rows_per_second = round(size / (stats['p50_ms'] / 1000))
+                results.append({'size': size, 'case': name, 'variant': variant,
+                                'rows_per_s': rows_per_second, **stats})
+                stdout.write(
+                    f"  {size:>8} {name:<8} {variant:<16} p50={stats['p50_ms']:.1f}ms "
+                    f"({rows_per_second:,} rows/s)"
+                )
+    return results
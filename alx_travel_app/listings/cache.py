@@ -0,0 +1,165 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+# Readers that pass availability params also depend on bookings
+AVAILABILITY_PARAMS = ('check_in', 'check_out', 'guests')
+# Params that page or shape a list without changing which listings match
+PRESENTATION_PARAMS = ('page', 'cursor', 'count', 'ordering', 'fields', 'expand', 'facets', 'format')
+
+
+class ResponseCache:
+    """
+    Versioned cache for serialized listing responses.
+
+    Entries are never deleted directly. Each key embeds one or more
+    generation counters; a write bumps the counters it affects and every
+    entry built from the old generation simply stops being addressed and
+    ages out. Three generations are tracked:
+
+    * ``list``: listing and review writes (anything visible in the list)
+    * ``availability``: booking writes, only for lists filtered by dates
+    * ``listing:<id>``: any write touching that listing's detail view
+
+    A fourth, ``all``, is part of every key and retires everything at once
+    after writes that bypass signals (bulk seeding and imports).
+    """
+    prefix = 'listings:response'
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'LISTINGS_CACHE_ALIAS', 'default')]
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'LISTINGS_CACHE_TIMEOUT', 300)
+
+    @property
+    def enabled(self):
+        return self.timeout != 0
+
+    def _version_key(self, name):
+        return f'{self.prefix}:version:{name}'
+
+    def _versions(self, *names):
+        keys = [self._version_key(name) for name in ('all',) + names]
+        found = self.cache.get_many(keys)
+        versions = []
+        for key in keys:
+            if key not in found:
+                # Seed from the clock so an evicted counter never restarts at
+                # a value that old entries were stored under.
+                self.cache.add(key, time.time_ns(), None)
+                found[key] = self.cache.get(key)
+            versions.append(str(found[key]))
+        return versions
+
+    def _bump(self, name):
+        key = self._version_key(name)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, time.time_ns(), None)
+
+    @staticmethod
+    def normalize_query(query_params):
+        """Order-insensitive representation of the query string, page included."""
+        return '&'.join(
+            f'{name}={value}'
+            for name in sorted(query_params)
+            for value in sorted(query_params.getlist(name))
+        )
+
+    def _key(self, kind, request, versions, query_params=None):
+        if query_params is None:
+            query_params = request.query_params
+        raw = f'{request.get_host()}|{self.normalize_query(query_params)}'
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        return f'{self.prefix}:{kind}:{".".join(versions)}:{digest}'
+
+    def _list_versions(self, request):
+        names = ['list']
+        if any(param in request.query_params for param in AVAILABILITY_PARAMS):
+            names.append('availability')
+        return self._versions(*names)
+
+    def list_key(self, request):
+        return self._key('list', request, self._list_versions(request))
+
+    def facet_key(self, request, names):
+        """Key of the ``names`` facet counts, shared by every page and ordering of a filter."""
+        query_params = request.query_params.copy()
+        for param in PRESENTATION_PARAMS:
+            query_params.pop(param, None)
+        return self._key(f'facets:{",".join(sorted(names))}', request, self._list_versions(request), query_params)
+
+    def detail_key(self, request, pk):
+        return self._key(f'detail:{pk}', request, self._versions(f'listing:{pk}'))
+
+    def get(self, key):
+        data = self.cache.get(key)
+        self._count('hits' if data is not None else 'misses')
+        return data
+
+    def set(self, key, data, timeout=None):
+        self.cache.set(key, data, self.timeout if timeout is None else timeout)
+
+    def get_entry(self, key):
+        """(data, validator state) cached under ``key`` in one round trip; either may be None."""
+        validators_key = f'{key}:validators'
+        found = self.cache.get_many([key, validators_key])
+        data = found.get(key)
+        self._count('hits' if data is not None else 'misses')
+        return data, found.get(validators_key)
+
+    def set_entry(self, key, data, validators=None):
+        """Cache ``data`` and, when given, the state of its conditional.Validators."""
+        entries = {key: data}
+        if validators is not None:
+            entries[f'{key}:validators'] = validators
+        self.cache.set_many(entries, self.timeout)
+
+    def _count(self, name):
+        key = f'{self.prefix}:stats:{name}'
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            if not self.cache.add(key, 1, None):
+                self.cache.incr(key)
+
+    def stats(self):
+        keys = {name: f'{self.prefix}:stats:{name}' for name in ('hits', 'misses')}
+        found = self.cache.get_many(keys.values())
+        stats = {name: found.get(key, 0) for name, key in keys.items()}
+        total = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / total if total else 0.0
+        return stats
+
+    def reset_stats(self):
+        self.cache.delete_many([f'{self.prefix}:stats:{name}' for name in ('hits', 'misses')])
+
+    def invalidate(self, listing_id, bookings=False):
+        """
+        Retire cached responses affected by a write to ``listing_id``.
+
+        Bumped right away, so the writing request sees its own change, and
+        again on commit, so a reader racing the transaction cannot re-cache
+        the pre-commit rows under the new generation.
+        """
+        def bump():
+            self._bump(f'listing:{listing_id}')
+            self._bump('availability' if bookings else 'list')
+
+        bump()
+        transaction.on_commit(bump)
+
+    def invalidate_all(self):
+        """Retire every cached response, e.g. after bulk writes."""
+        self._bump('all')
+        transaction.on_commit(lambda: self._bump('all'))
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,134 @@
+"""
+Per-listing occupancy bitmaps backing ``/listings/{id}/calendar/``.
+
+Bit ``i`` of a listing's bitmap is set when the night starting on
+``start + i`` days is taken by a pending or confirmed booking. Booking
+writes patch only the nights they touch; calendar reads decode the bitmap
+and never look at the bookings table.
+"""
+from datetime import date
+from itertools import groupby
+
+from .locks import listing_lock
+
+
+class Occupancy:
+    """A set of blocked nights stored as an integer bitset over day ordinals."""
+
+    def __init__(self, start=None, bits=0):
+        self.start = start.toordinal() if start else None
+        self.bits = bits
+
+    @classmethod
+    def from_bytes(cls, start, data):
+        return cls(start, int.from_bytes(data or b'', 'little'))
+
+    @classmethod
+    def from_stays(cls, stays):
+        occupancy = cls()
+        for check_in, check_out in stays:
+            occupancy.fill(check_in, check_out, True)
+        return occupancy
+
+    def to_bytes(self):
+        return self.bits.to_bytes((self.bits.bit_length() + 7) // 8, 'little')
+
+    @property
+    def start_date(self):
+        return date.fromordinal(self.start) if self.start is not None else None
+
+    def fill(self, first, last, blocked):
+        """Mark nights ``[first, last)`` as blocked or free."""
+        first, last = first.toordinal(), last.toordinal()
+        if last <= first:
+            return
+        if self.start is None:
+            self.start = first
+        elif first < self.start:
+            # Rebase so bit 0 stays the earliest night we know about
+            self.bits <<= self.start - first
+            self.start = first
+        mask = ((1 << (last - first)) - 1) << (first - self.start)
+        self.bits = self.bits | mask if blocked else self.bits & ~mask
+
+    def blocked_nights(self, first, last):
+        """Blocked nights in ``[first, last)``, in date order."""
+        if self.start is None or not self.bits:
+            return []
+        lo = max(first.toordinal(), self.start)
+        hi = last.toordinal()
+        if hi <= lo:
+            return []
+        window = (self.bits >> (lo - self.start)) & ((1 << (hi - lo)) - 1)
+        nights = []
+        while window:
+            low_bit = window & -window
+            nights.append(date.fromordinal(lo + low_bit.bit_length() - 1))
+            window ^= low_bit
+        return nights
+
+
+def refresh_calendar(listing_id, ranges):
+    """
+    Re-derive the nights in ``ranges`` for one listing after a booking write.
+
+    Only active bookings overlapping the touched nights are read, so the
+    cost follows the size of the change rather than the listing's history.
+    Listings without a calendar are skipped; it is built in full on first
+    read, which already includes this write.
+    """
+    from .models import Booking, ListingCalendar
+
+    ranges = [(first, last) for first, last in ranges if first and last and first < last]
+    if not ranges:
+        return
+    with listing_lock(listing_id):
+        calendar = ListingCalendar.objects.select_for_update().filter(listing_id=listing_id).first()
+        if calendar is None:
+            return
+
+        occupancy = calendar.occupancy
+        first = min(first for first, _ in ranges)
+        last = max(last for _, last in ranges)
+        for range_first, range_last in ranges:
+            occupancy.fill(range_first, range_last, False)
+        stays = Booking.objects.overlapping(first, last).filter(listing_id=listing_id)
+        for check_in, check_out in stays.values_list('check_in', 'check_out'):
+            occupancy.fill(max(check_in, first), min(check_out, last), True)
+        calendar.occupancy = occupancy
+        calendar.save(update_fields=['start', 'bitmap', 'updated_at'])
+
+
+def rebuild_calendars(listing_ids=None, batch_size=1000):
+    """
+    Rebuild calendars from scratch in one streaming pass over bookings.
+
+    For writes that bypass signals (bulk seeding, imports). ``listing_ids``
+    limits the rebuild; None rebuilds every listing.
+    """
+    from .models import Booking, Listing, ListingCalendar
+
+    listings = Listing.objects.all()
+    if listing_ids is not None:
+        listings = listings.filter(pk__in=listing_ids)
+    ListingCalendar.objects.filter(listing__in=listings).delete()
+
+    stays = (
+        Booking.objects.active().filter(listing__in=listings)
+        .order_by('listing_id').values_list('listing_id', 'check_in', 'check_out')
+        .iterator(chunk_size=batch_size)
+    )
+    calendars = {}
+    for listing_id, rows in groupby(stays, key=lambda row: row[0]):
+        occupancy = Occupancy.from_stays((check_in, check_out) for _, check_in, check_out in rows)
+        calendars[listing_id] = ListingCalendar(listing_id=listing_id, occupancy=occupancy)
+        if len(calendars) >= batch_size:
+            ListingCalendar.objects.bulk_create(calendars.values())
+            calendars = {}
+    ListingCalendar.objects.bulk_create(calendars.values())
+    # Listings without bookings get an empty calendar so reads never fall back
+    ListingCalendar.objects.bulk_create(
+        (ListingCalendar(listing_id=pk) for pk in
+         listings.filter(calendar__isnull=True).values_list('pk', flat=True).iterator(chunk_size=batch_size)),
+        batch_size=batch_size,
+    )
@@ -0,0 +1,82 @@
+"""
+Conditional GET for listing reads.
+
+Validators come from the database, not from the rendered body, so a
+``304 Not Modified`` is answered before anything is serialized:
+
+* a listing's from its ``updated_at``, which every save and review
+  aggregate refresh moves;
+* a list's from ``max(updated_at)`` and ``count`` of the filtered
+  queryset, read in one aggregate query: an edit raises the maximum, and
+  a listing leaving the list lowers the count.
+
+The ETag also covers the query string and rendered format. Lists only
+honour ``If-None-Match``; their Last-Modified cannot see a listing that
+was deactivated, so ``If-Modified-Since`` alone never yields a 304.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .cache import response_cache
+
+
+def list_state(queryset):
+    """(max updated_at, count) of ``queryset`` in one query."""
+    state = queryset.order_by().aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+    return state['last_modified'], state['count']
+
+
+class Validators:
+    """ETag and Last-Modified (a timestamp) of one response."""
+    __slots__ = ('etag', 'last_modified')
+
+    def __init__(self, etag, last_modified=None):
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @classmethod
+    def build(cls, request, last_modified, *state):
+        """Validators of the response to ``request`` for rows last modified at ``last_modified``."""
+        parts = [
+            request.path,
+            response_cache.normalize_query(request.query_params),
+            getattr(request, 'accepted_media_type', ''),
+            last_modified.isoformat() if last_modified else '',
+            *map(str, state),
+        ]
+        etag = f'W/"{hashlib.md5("|".join(parts).encode()).hexdigest()}"'
+        return cls(etag, int(last_modified.timestamp()) if last_modified else None)
+
+    def state(self):
+        """What response_cache keeps alongside the response."""
+        return self.etag, self.last_modified
+
+    def headers(self):
+        headers = {'ETag': self.etag, 'Cache-Control': 'no-cache'}
+        if self.last_modified is not None:
+            headers['Last-Modified'] = http_date(self.last_modified)
+        return headers
+
+    def not_modified(self, request, use_last_modified=True):
+        """A 304 (or 412) when the request's preconditions say so, else None."""
+        response = HttpResponse()
+        for name, value in self.headers().items():
+            response[name] = value
+        conditional = get_conditional_response(
+            request,
+            etag=self.etag,
+            last_modified=self.last_modified if use_last_modified else None,
+            response=response,
+        )
+        # Handed back unchanged when no precondition applies
+        return None if conditional is response else conditional
+
+    def apply(self, response):
+        if response.status_code == 200:
+            for name, value in self.headers().items():
+                response[name] = value
+        return response
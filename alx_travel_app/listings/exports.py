@@ -0,0 +1,167 @@
+"""
+Booking exports for staff.
+
+``/bookings/export/`` streams flat rows: they are read as ``values()``
+through ``iterator(chunk_size=...)``, so the database hands them over in
+chunks and each one is encoded and written to the StreamingHttpResponse
+before the next is read; memory stays flat whatever the row count. The
+renderers only take part in ``?format=`` negotiation and in rendering
+errors; the rows bypass them.
+
+Export jobs (``/export-jobs/``) write full bookings, with the nested
+listing, guest and review of FastBookingSerializer, as gzip NDJSON chunk
+files from a Celery task, see write_export.
+"""
+import csv
+import gzip
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import BaseRenderer
+
+from .fast_serializers import FastBookingSerializer, _date, datetime_formatter, decimal_formatter
+from .filters import BookingFilterSet
+from .models import Booking, ExportJob
+
+# (output column, values() lookup)
+BOOKING_COLUMNS = (
+    ('id', 'id'),
+    ('listing', 'listing_id'),
+    ('listing_title', 'listing__title'),
+    ('guest', 'guest_id'),
+    ('guest_email', 'guest__email'),
+    ('check_in', 'check_in'),
+    ('check_out', 'check_out'),
+    ('number_of_guests', 'number_of_guests'),
+    ('total_price', 'total_price'),
+    ('status', 'status'),
+    ('special_requests', 'special_requests'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+    ('confirmation_sent_at', 'confirmation_sent_at'),
+)
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def booking_rows(queryset, chunk_size):
+    """Export dicts for ``queryset``, formatted like the API (ISO dates, decimal strings)."""
+    format_datetime = datetime_formatter()
+    format_money = decimal_formatter(10, 2)
+    formatters = {
+        'check_in': _date, 'check_out': _date, 'total_price': format_money,
+        'created_at': format_datetime, 'updated_at': format_datetime, 'confirmation_sent_at': format_datetime,
+    }
+    getters = [(name, lookup, formatters.get(name)) for name, lookup in BOOKING_COLUMNS]
+    rows = queryset.values(*(lookup for _, lookup in BOOKING_COLUMNS)).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield {
+            name: row[lookup] if format is None or row[lookup] is None else format(row[lookup])
+            for name, lookup, format in getters
+        }
+
+
+class _Line:
+    """File-like target for csv.writer that hands back the line it was given."""
+    def write(self, value):
+        return value
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return '' if data is None else _dumps(data) + '\n'
+
+    def stream(self, rows):
+        for row in rows:
+            yield _dumps(row) + '\n'
+
+
+class CSVRenderer(BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Errors: one header row of keys and one row of values
+        if not isinstance(data, dict):
+            return ''
+        writer = csv.writer(_Line())
+        return writer.writerow(list(data)) + writer.writerow([
+            value if isinstance(value, str) else _dumps(value) for value in data.values()
+        ])
+
+    def stream(self, rows):
+        writer = csv.writer(_Line())
+        yield writer.writerow([name for name, _ in BOOKING_COLUMNS])
+        for row in rows:
+            yield writer.writerow(row.values())
+
+
+def job_directory(job):
+    return Path(settings.LISTINGS_EXPORT_ROOT) / f'job-{job.pk}'
+
+
+def chunk_path(job, number):
+    return job_directory(job) / f'bookings-{number:05d}.ndjson.gz'
+
+
+def job_queryset(job):
+    """The bookings ``job`` exports; ``job.filters`` were validated when it was created."""
+    return BookingFilterSet(job.filters, queryset=Booking.objects.all()).qs
+
+
+def write_export(job_id, report=None):
+    """
+    Write the chunk files of export job ``job_id``, resuming after its last chunk.
+
+    Chunks are LISTINGS_EXPORT_CHUNK_ROWS bookings in id order. Each is
+    written to a temporary file and renamed into place before the job's
+    checkpoint moves past it, so a worker dying at any point leaves at
+    worst one chunk to write again, under the same name and with the same
+    rows. ``report(rows=, total=, chunks=)`` is called after each chunk.
+    """
+    with transaction.atomic():
+        job = ExportJob.objects.select_for_update().get(pk=job_id)
+        if job.status == 'COMPLETED':
+            return job.rows_written
+        job.status = 'RUNNING'
+        if job.total_rows is None:
+            job.total_rows = job_queryset(job).count()
+        job.save(update_fields=['status', 'total_rows', 'updated_at'])
+
+    job_directory(job).mkdir(parents=True, exist_ok=True)
+    serializer = FastBookingSerializer()
+    rows = serializer.prepare(job_queryset(job).order_by('id'))
+    while True:
+        page = list(rows.filter(id__gt=job.last_id)[:settings.LISTINGS_EXPORT_CHUNK_ROWS])
+        if not page:
+            break
+        number = job.chunks_written + 1
+        path = chunk_path(job, number)
+        partial = path.with_name(path.name + '.part')
+        with gzip.open(partial, 'wt', encoding='utf-8') as fh:
+            for item in serializer.serialize_many(page):
+                fh.write(_dumps(item) + '\n')
+        os.replace(partial, path)
+
+        job.last_id = page[-1]['id']
+        job.chunks_written = number
+        job.rows_written += len(page)
+        job.save(update_fields=['last_id', 'chunks_written', 'rows_written', 'updated_at'])
+        if report is not None:
+            report(rows=job.rows_written, total=job.total_rows, chunks=job.chunks_written)
+
+    job.status = 'COMPLETED'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at', 'updated_at'])
+    return job.rows_written
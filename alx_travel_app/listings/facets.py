@@ -0,0 +1,85 @@
+"""
+Facet counts for ``?facets=`` on the listing list.
+
+Counts are taken over the filtered queryset of the request, before
+paging. Facets with fixed buckets (property types, bedroom buckets, price
+bands) are all counted in one aggregate query with ``COUNT(...) FILTER``;
+``city`` and ``country`` take one GROUP BY query each, keeping the
+LISTINGS_FACET_LIMIT largest values. A request therefore costs at most
+three queries whatever facets it asks for.
+"""
+from django.conf import settings
+from django.db.models import Count, Q
+
+from .models import Listing
+
+# (label, lowest, highest), both inclusive; None is unbounded
+BEDROOM_BUCKETS = [('0-1', 0, 1), ('2', 2, 2), ('3', 3, 3), ('4', 4, 4), ('5+', 5, None)]
+# Upper bounds of the price bands; a band holds min <= price < max
+PRICE_BANDS = [50, 100, 200, 500]
+GROUPED = ('city', 'country')
+FACETS = ('property_type', 'city', 'country', 'bedrooms', 'price_band')
+
+
+def _price_bands():
+    bounds = [None] + PRICE_BANDS + [None]
+    for low, high in zip(bounds, bounds[1:]):
+        if low is None:
+            label = f'<{high}'
+        elif high is None:
+            label = f'{low}+'
+        else:
+            label = f'{low}-{high}'
+        yield label, low, high
+
+
+def _buckets(name):
+    """(bucket, Q) pairs of a fixed-bucket facet."""
+    if name == 'property_type':
+        for value, _ in Listing.PROPERTY_TYPES:
+            yield {'value': value}, Q(property_type=value)
+    elif name == 'bedrooms':
+        for label, low, high in BEDROOM_BUCKETS:
+            condition = Q(bedrooms__gte=low) & (Q(bedrooms__lte=high) if high is not None else Q())
+            yield {'value': label, 'min': low, 'max': high}, condition
+    elif name == 'price_band':
+        for label, low, high in _price_bands():
+            condition = Q()
+            if low is not None:
+                condition &= Q(price_per_night__gte=low)
+            if high is not None:
+                condition &= Q(price_per_night__lt=high)
+            yield {'value': label, 'min': low, 'max': high}, condition
+
+
+def facet_counts(queryset, names):
+    """
+    ``{facet: [{'value': ..., 'count': n}, ...]}`` for ``names`` over ``queryset``.
+
+    Fixed-bucket facets list every bucket, empty ones included, in their
+    own order; ``city``/``country`` list the largest values first.
+    """
+    queryset = queryset.order_by()
+    facets = {}
+
+    buckets = {name: list(_buckets(name)) for name in names if name not in GROUPED}
+    aggregates = {}
+    for name, pairs in buckets.items():
+        for position, (_, condition) in enumerate(pairs):
+            aggregates[f'{name}_{position}'] = Count('pk', filter=condition)
+    if aggregates:
+        counts = queryset.aggregate(**aggregates)
+        for name, pairs in buckets.items():
+            facets[name] = [
+                {**bucket, 'count': counts[f'{name}_{position}']}
+                for position, (bucket, _) in enumerate(pairs)
+            ]
+
+    for name in GROUPED:
+        if name in names:
+            rows = queryset.values(name).annotate(count=Count('pk')).order_by('-count', name)
+            facets[name] = [
+                {'value': row[name], 'count': row['count']}
+                for row in rows[:settings.LISTINGS_FACET_LIMIT]
+            ]
+    return {name: facets[name] for name in names}
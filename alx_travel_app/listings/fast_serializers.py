@@ -0,0 +1,278 @@
+"""
+Read-only serializers for list endpoints.
+
+They work on ``values()`` rows instead of model instances and build plain
+dicts with precomputed getters, skipping ModelSerializer's per-field
+machinery. Output is byte-for-byte what ListingSerializer and
+BookingSerializer produce by default; the tests hold them to that.
+
+Both accept ``?fields=a,b`` to trim the top-level keys and ``?expand=``
+to add nested objects (``host``, ``listing``, ``guest``, ``review``) back
+to a trimmed field set.
+"""
+import decimal
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .models import Booking
+
+_date = serializers.DateField().to_representation
+
+
+def datetime_formatter():
+    """
+    DRF DateTimeField.to_representation with the timezone resolved once.
+
+    Looking up the current timezone per value dominates list serialization,
+    so it is fetched when the serializer is built. Non-default settings use
+    DRF's own field.
+    """
+    if not settings.USE_TZ or api_settings.DATETIME_FORMAT.lower() != ISO_8601:
+        return serializers.DateTimeField().to_representation
+    tz = timezone.get_current_timezone()
+
+    def format_datetime(value):
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return format_datetime
+
+
+def decimal_formatter(max_digits, decimal_places):
+    """DRF DecimalField.to_representation with the quantize context built once."""
+    if not api_settings.COERCE_DECIMAL_TO_STRING:
+        return serializers.DecimalField(max_digits=max_digits, decimal_places=decimal_places).to_representation
+    exponent = decimal.Decimal('.1') ** decimal_places
+    context = decimal.getcontext().copy()
+    context.prec = max_digits
+
+    def format_decimal(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return '{:f}'.format(value.quantize(exponent, context=context))
+    return format_decimal
+
+
+def _kilometres(value):
+    return round(value, 3)
+
+
+USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name')
+
+
+def _column(column):
+    return [column], lambda row: row[column]
+
+
+def _formatted(column, formatter):
+    def get(row):
+        value = row[column]
+        return None if value is None else formatter(value)
+    return [column], get
+
+
+def _user(prefix):
+    columns = [(field, f'{prefix}__{field}') for field in USER_FIELDS]
+    return [column for _, column in columns], lambda row: {field: row[column] for field, column in columns}
+
+
+def _split(value):
+    return [item.strip() for item in value.split(',') if item.strip()] if value else []
+
+
+def _has_dates(request):
+    return 'check_in' in request.query_params and 'check_out' in request.query_params
+
+
+class FastSerializer:
+    """
+    Base for values()-based read serializers.
+
+    ``get_fields()`` returns ``{name: (columns, getter)}`` in output order,
+    with column names already carrying ``prefix`` so the same class can
+    read a related object out of a joined row. ``expandable`` maps an
+    ``?expand=`` name to the nested field it adds back.
+    """
+    expandable = {}
+    # Always selected so KeysetPagination can build cursors from trimmed rows
+    keyset_columns = ('created_at', 'id')
+
+    def __init__(self, fields=None, expand=(), prefix=''):
+        self.prefix = prefix
+        self.format_datetime = datetime_formatter()
+        self.format_money = decimal_formatter(10, 2)
+        self.format_coordinate = decimal_formatter(9, 6)
+        definitions = self.get_fields()
+        names = list(definitions)
+        if fields:
+            wanted = set(fields) | {self.expandable[name] for name in expand if name in self.expandable}
+            names = [name for name in names if name in wanted]
+
+        self.columns = []
+        self.getters = []
+        for name in names:
+            columns, getter = definitions[name]
+            self.columns.extend(columns)
+            self.getters.append((name, getter))
+
+    @classmethod
+    def from_request(cls, request, **kwargs):
+        return cls(
+            fields=_split(request.query_params.get('fields')),
+            expand=_split(request.query_params.get('expand')),
+            **kwargs
+        )
+
+    def get_fields(self):
+        raise NotImplementedError
+
+    def prepare(self, queryset):
+        """Turn a model queryset into a values() queryset with just the needed columns."""
+        return queryset.values(*dict.fromkeys([*self.columns, *self.keyset_columns]))
+
+    def to_representation(self, row):
+        return {name: get(row) for name, get in self.getters}
+
+    def prefetch(self, rows):
+        """Hook to load anything the rows need in bulk before serializing."""
+
+    def serialize_many(self, rows):
+        self.prefetch(rows)
+        return [self.to_representation(row) for row in rows]
+
+
+class FastListingSerializer(FastSerializer):
+    """
+    Mirror of ListingSerializer's read output.
+
+    ``availability`` says where is_available comes from: ``'annotated'``
+    for rows carrying the AvailabilityFilter annotation, a dict of listing
+    id to bool (filled in after the page is fetched), or None for null.
+    ``distance`` adds ``distance_km`` for rows annotated by NearbyFilter.
+    """
+    expandable = {'host': 'host'}
+
+    def __init__(self, fields=None, expand=(), prefix='', availability=None, distance=False):
+        self.availability = availability
+        self.distance = distance
+        super().__init__(fields, expand, prefix)
+
+    def get_fields(self):
+        p = self.prefix
+        return {
+            'id': _column(f'{p}id'),
+            'title': _column(f'{p}title'),
+            'description': _column(f'{p}description'),
+            'host': _user(f'{p}host'),
+            'property_type': _column(f'{p}property_type'),
+            'price_per_night': _formatted(f'{p}price_per_night', self.format_money),
+            'bedrooms': _column(f'{p}bedrooms'),
+            'bathrooms': _column(f'{p}bathrooms'),
+            'max_guests': _column(f'{p}max_guests'),
+            'address': _column(f'{p}address'),
+            'city': _column(f'{p}city'),
+            'country': _column(f'{p}country'),
+            'latitude': _formatted(f'{p}latitude', self.format_coordinate),
+            'longitude': _formatted(f'{p}longitude', self.format_coordinate),
+            'amenities': _column(f'{p}amenities'),
+            'is_active': _column(f'{p}is_active'),
+            'created_at': _formatted(f'{p}created_at', self.format_datetime),
+            'updated_at': _formatted(f'{p}updated_at', self.format_datetime),
+            'average_rating': _formatted(f'{p}rating_avg', float),
+            'review_count': _column(f'{p}review_count'),
+            'is_available': self._is_available(),
+            **({'distance_km': _formatted(f'{p}distance_km', _kilometres)} if self.distance else {}),
+        }
+
+    def _is_available(self):
+        if self.availability == 'annotated':
+            return _column(f'{self.prefix}is_available')
+        if self.availability is not None:
+            availability, column = self.availability, f'{self.prefix}id'
+            return [column], lambda row: availability.get(row[column])
+        return [], lambda row: None
+
+
+class FastBookingSerializer(FastSerializer):
+    """
+    Mirror of BookingSerializer's read output, in one joined query.
+
+    Like ListingSerializer, the nested listing reports is_available when
+    the request carries check_in/check_out; ``prefetch`` resolves
+    it for a whole page with one query.
+    """
+    expandable = {'listing': 'listing_details', 'guest': 'guest', 'review': 'review'}
+
+    def __init__(self, fields=None, expand=(), prefix='', dates=None):
+        self.dates = dates
+        self.availability = {} if dates else None
+        self.listing_serializer = FastListingSerializer(
+            prefix=f'{prefix}listing__', availability=self.availability
+        )
+        super().__init__(fields, expand, prefix)
+
+    @classmethod
+    def from_request(cls, request, **kwargs):
+        if _has_dates(request):
+            kwargs.setdefault('dates', (request.query_params['check_in'], request.query_params['check_out']))
+        return super().from_request(request, **kwargs)
+
+    def get_fields(self):
+        p = self.prefix
+        reviewer_columns, reviewer = _user(f'{p}review__reviewer')
+        listing = self.listing_serializer
+        format_datetime = self.format_datetime
+
+        def review(row):
+            if row[f'{p}review__id'] is None:
+                return None
+            return {
+                'id': row[f'{p}review__id'],
+                'booking': row[f'{p}id'],
+                'reviewer': reviewer(row),
+                'rating': row[f'{p}review__rating'],
+                'comment': row[f'{p}review__comment'],
+                'created_at': format_datetime(row[f'{p}review__created_at']),
+                'updated_at': format_datetime(row[f'{p}review__updated_at']),
+            }
+        review_columns = [
+            f'{p}id', f'{p}review__id', f'{p}review__rating', f'{p}review__comment',
+            f'{p}review__created_at', f'{p}review__updated_at',
+        ] + reviewer_columns
+
+        return {
+            'id': _column(f'{p}id'),
+            'listing': _column(f'{p}listing'),
+            'listing_details': (listing.columns, listing.to_representation),
+            'guest': _user(f'{p}guest'),
+            'check_in': _formatted(f'{p}check_in', _date),
+            'check_out': _formatted(f'{p}check_out', _date),
+            'total_price': _formatted(f'{p}total_price', self.format_money),
+            'status': _column(f'{p}status'),
+            'number_of_guests': _column(f'{p}number_of_guests'),
+            'special_requests': _column(f'{p}special_requests'),
+            'created_at': _formatted(f'{p}created_at', self.format_datetime),
+            'updated_at': _formatted(f'{p}updated_at', self.format_datetime),
+            'review': (review_columns, review),
+        }
+
+    def prepare(self, queryset):
+        columns = [*self.columns, *self.keyset_columns]
+        if self.availability is not None:
+            columns.append(f'{self.prefix}listing')
+        return queryset.values(*dict.fromkeys(columns))
+
+    def prefetch(self, rows):
+        """Resolve nested is_available for ``rows`` with a single query."""
+        if self.availability is None:
+            return
+        listing_ids = {row[f'{self.prefix}listing'] for row in rows}
+        busy = set(
+            Booking.objects.overlapping(*self.dates)
+            .filter(listing_id__in=listing_ids)
+            .values_list('listing_id', flat=True)
+        )
+        self.availability.clear()
+        self.availability.update({listing_id: listing_id not in busy for listing_id in listing_ids})
@@ -0,0 +1,98 @@
+import django_filters
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+from .models import Booking, Listing
+from .serializers import AmenityQuerySerializer, AvailabilityQuerySerializer, NearbyQuerySerializer
+
+
+class AvailabilityFilter(BaseFilterBackend):
+    """
+    Availability search for listings.
+
+    When ``check_in``/``check_out`` are present every listing is annotated
+    with ``is_available`` in the same query. On list requests unavailable
+    listings, and listings too small for ``guests``, are excluded with a
+    NOT EXISTS anti-join instead of being checked row by row.
+    """
+    params = ('check_in', 'check_out', 'guests')
+
+    def filter_queryset(self, request, queryset, view):
+        if not any(param in request.query_params for param in self.params):
+            return queryset
+
+        serializer = AvailabilityQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        check_in = serializer.validated_data['check_in']
+        check_out = serializer.validated_data['check_out']
+
+        if getattr(view, 'action', None) != 'list':
+            return queryset.with_availability(check_in, check_out)
+        return queryset.available(check_in, check_out, serializer.validated_data.get('guests'))
+
+
+class ListingFilterSet(django_filters.FilterSet):
+    """
+    Exact and range filters for the listing list.
+
+    ``city``/``property_type`` plus a price range (sorted by price) is
+    served by the partial ``listing_active_*_price_idx`` indexes; bedroom
+    and guest bounds are checked on the rows those return.
+    """
+    min_price = django_filters.NumberFilter(field_name='price_per_night', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='price_per_night', lookup_expr='lte')
+    min_bedrooms = django_filters.NumberFilter(field_name='bedrooms', lookup_expr='gte')
+    max_bedrooms = django_filters.NumberFilter(field_name='bedrooms', lookup_expr='lte')
+    min_guests = django_filters.NumberFilter(field_name='max_guests', lookup_expr='gte')
+    max_guests = django_filters.NumberFilter(field_name='max_guests', lookup_expr='lte')
+
+    class Meta:
+        model = Listing
+        fields = ['property_type', 'bedrooms', 'bathrooms', 'city', 'country']
+
+
+class AmenityFilter(BaseFilterBackend):
+    """
+    ``?amenities=wifi,pool`` filter for listings.
+
+    Listings must offer every named amenity, or at least one of them with
+    ``amenities_match=any``. Matches on the amenity_mask column rather
+    than the JSON, see listings.amenities.
+    """
+    def filter_queryset(self, request, queryset, view):
+        if 'amenities' not in request.query_params:
+            return queryset
+
+        serializer = AmenityQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return queryset.with_amenities(
+            serializer.validated_data['amenities'], serializer.validated_data['amenities_match']
+        )
+
+
+class NearbyFilter(BaseFilterBackend):
+    """
+    ``?near=lat,lng&radius_km=`` search for listings.
+
+    Keeps listings within the radius, annotated with ``distance_km`` and
+    nearest first unless ``ordering`` is given. Runs after the ordering and
+    search backends so distance wins over relevance.
+    """
+    def filter_queryset(self, request, queryset, view):
+        if 'near' not in request.query_params or getattr(view, 'action', None) != 'list':
+            return queryset
+
+        serializer = NearbyQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        latitude, longitude = serializer.validated_data['near']
+        queryset = queryset.nearby(latitude, longitude, serializer.validated_data['radius_km'])
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+        return queryset.order_by('distance_km', 'id')
+
+
+class BookingFilterSet(django_filters.FilterSet):
+    """Booking list filters, shared with exports (listings.exports)."""
+    class Meta:
+        model = Booking
+        fields = ['listing', 'status', 'guest']
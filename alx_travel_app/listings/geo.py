@@ -0,0 +1,85 @@
+"""
+Nearby search without PostGIS.
+
+Every listing stores ``geo_cell``, the number of the 0.1° x 0.1° tile its
+coordinates fall in (rows run south to north, columns west to east). A
+radius query turns its bounding box into one contiguous cell range per
+tile row, which the ``geo_cell`` index answers with a few
+range scans; the exact box and the haversine distance are then computed
+in SQL for those candidates only.
+"""
+import math
+
+from django.db.models import FloatField, Value
+from django.db.models.functions import ASin, Cast, Cos, Least, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+CELLS_PER_DEGREE = 10
+CELLS_PER_ROW = 360 * CELLS_PER_DEGREE
+ROWS = 180 * CELLS_PER_DEGREE
+
+
+# Keeps tile edges like -179.9 from landing in the previous tile through
+# binary rounding; any monotonic mapping works as long as it is used for
+# both saving and querying.
+_EDGE = 1e-9
+
+
+def _row(latitude):
+    return min(int(math.floor((latitude + 90) * CELLS_PER_DEGREE + _EDGE)), ROWS - 1)
+
+
+def _column(longitude):
+    return int(math.floor((longitude + 180) * CELLS_PER_DEGREE + _EDGE)) % CELLS_PER_ROW
+
+
+def cell_for(latitude, longitude):
+    """Tile number of a coordinate pair, None when either is missing."""
+    if latitude is None or longitude is None:
+        return None
+    return _row(float(latitude)) * CELLS_PER_ROW + _column(float(longitude))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    ``(lat_min, lat_max, lng_ranges)`` enclosing the circle; the longitude
+    span is split in two where it crosses the antimeridian.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    lat_min = max(latitude - math.degrees(angle), -90.0)
+    lat_max = min(latitude + math.degrees(angle), 90.0)
+    if lat_min <= -90 or lat_max >= 90 or angle >= math.pi / 2:
+        return lat_min, lat_max, [(-180.0, 180.0)]
+
+    spread = math.degrees(math.asin(min(1.0, math.sin(angle) / math.cos(math.radians(latitude)))))
+    west, east = longitude - spread, longitude + spread
+    if spread >= 180:
+        return lat_min, lat_max, [(-180.0, 180.0)]
+    if west < -180:
+        return lat_min, lat_max, [(west + 360, 180.0), (-180.0, east)]
+    if east > 180:
+        return lat_min, lat_max, [(west, 180.0), (-180.0, east - 360)]
+    return lat_min, lat_max, [(west, east)]
+
+
+def cell_ranges(lat_min, lat_max, lng_ranges):
+    """Inclusive ``(first, last)`` geo_cell ranges covering a bounding box."""
+    ranges = []
+    for row in range(_row(lat_min), _row(lat_max) + 1):
+        base = row * CELLS_PER_ROW
+        for west, east in lng_ranges:
+            last = CELLS_PER_ROW - 1 if east >= 180 else _column(east)
+            ranges.append((base + _column(west), base + last))
+    return ranges
+
+
+def haversine_km(latitude, longitude):
+    """Expression for the great-circle distance from a point to each row, in km."""
+    lat = Radians(Cast('latitude', FloatField()))
+    lng = Radians(Cast('longitude', FloatField()))
+    origin_lat = math.radians(latitude)
+    half_dlat = Sin((lat - Value(origin_lat)) / 2)
+    half_dlng = Sin((lng - Value(math.radians(longitude))) / 2)
+    a = Power(half_dlat, 2) + Value(math.cos(origin_lat)) * Cos(lat) * Power(half_dlng, 2)
+    # Rounding can push ``a`` a hair past 1, outside asin's domain
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(Least(a, Value(1.0))))
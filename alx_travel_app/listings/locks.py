@@ -0,0 +1,28 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F
+
+
+@contextmanager
+def listing_lock(listing_id, using=DEFAULT_DB_ALIAS):
+    """
+    Serialize booking writes for a single listing.
+
+    Opens a transaction and, on databases with ``SELECT ... FOR UPDATE``,
+    locks the listing row so concurrent writers for the same listing queue
+    up behind each other while other listings proceed in parallel. SQLite
+    has no row locks, so there a no-op write to the listing row takes the
+    database's write lock instead: it serializes every writer, in this
+    process or another, until the outermost transaction ends. Writers wait
+    for it up to the connection's busy timeout.
+    """
+    from .models import Listing
+
+    listing = Listing.objects.using(using).filter(pk=listing_id)
+    with transaction.atomic(using=using):
+        if connections[using].features.has_select_for_update:
+            list(listing.select_for_update().values_list('pk'))
+        else:
+            listing.update(id=F('id'))
+        yield
@@ -0,0 +1,57 @@
+import json
+from importlib import import_module
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...benchmarks.base import benchmark_database, compare
+
+SCENARIOS = {
+    'api': 'listings.benchmarks.api',
+    'asgi': 'listings.benchmarks.asgi',
+    'conditional': 'listings.benchmarks.conditional',
+    'geo': 'listings.benchmarks.geo',
+    'search': 'listings.benchmarks.search',
+    'serializers': 'listings.benchmarks.serializers',
+}
+
+
+class Command(BaseCommand):
+    help = 'Runs a performance benchmark against a throwaway test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(SCENARIOS), help='Benchmark to run')
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                            help='Dataset sizes to measure at, grown incrementally')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per measurement')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='Fail if results regressed against this earlier --output file')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Allowed p95 slowdown against --baseline, as a fraction (default 0.2)')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as fh:
+                baseline = json.load(fh)
+            if baseline.get('scenario') != options['scenario']:
+                raise CommandError(f"{options['baseline']} is a {baseline.get('scenario')} baseline")
+
+        scenario = import_module(SCENARIOS[options['scenario']])
+        sizes = sorted(options['sizes'])
+
+        self.stdout.write(self.style.SUCCESS(f"Running {options['scenario']} benchmark at sizes {sizes}"))
+        with benchmark_database():
+            results = scenario.run(sizes, options['repeat'], self.stdout)
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump({'scenario': options['scenario'], 'results': results}, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if baseline is not None:
+            regressions = compare(results, baseline['results'], options['threshold'])
+            for regression in regressions:
+                self.stderr.write(regression)
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
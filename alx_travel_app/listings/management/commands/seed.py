@@ -1,13 +1,31 @@
 import random
+import time
 from datetime import datetime, timedelta
+from multiprocessing import Pool
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections
 from django.utils import timezone
 from faker import Faker
+from ... import seeding
+from ...cache import response_cache
+from ...calendar import rebuild_calendars
 from ...models import Listing, Booking, Review
+from ...search import get_search_backend
 
 User = get_user_model()
 
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _run_chunk(task):
+    insert, plan, chunk = task
+    return insert(plan, chunk)
+
 class Command(BaseCommand):
     help = 'Seeds the database with sample data for the alx travel app'
 
@@ -16,8 +34,16 @@ class Command(BaseCommand):
         parser.add_argument('--listings', type=int, default=10, help='Number of listings to create')
         parser.add_argument('--bookings', type=int, default=20, help='Number of bookings to create')
         parser.add_argument('--reviews', type=int, default=15, help='Number of reviews to create')
+        parser.add_argument('--bulk', action='store_true',
+                            help='High-volume mode: append rows with bulk_create instead of topping up')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per bulk_create batch (--bulk)')
+        parser.add_argument('--workers', type=int, default=1, help='Worker processes (--bulk)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; same seed, same data (--bulk)')
 
     def handle(self, *args, **options):
+        if options['bulk']:
+            return self.handle_bulk(**options)
+
         fake = Faker()
         Faker.seed(42)  # For consistent results
 
@@ -150,4 +176,77 @@ class Command(BaseCommand):
                 reviews.append(review)
             self.stdout.write(self.style.SUCCESS(f'Created {min(num_reviews, len(completed_bookings))} reviews'))
 
-        self.stdout.write(self.style.SUCCESS('Database seeding completed successfully!'))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS('Database seeding completed successfully!'))
+
+    def handle_bulk(self, **options):
+        """
+        Append users, listings, bookings and reviews with bulk_create.
+
+        The password is hashed once, rows are generated chunk by chunk and
+        chunks can be spread over worker processes; see listings.seeding.
+        """
+        workers = max(1, options['workers'])
+        if workers > 1 and connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING('SQLite allows a single writer, using 1 worker'))
+            workers = 1
+
+        plan = seeding.SeedPlan.build(
+            seed=options['seed'],
+            users=options['users'],
+            listings=options['listings'],
+            bookings=options['bookings'],
+            reviews=options['reviews'],
+            batch_size=options['batch_size'],
+            password=make_password('password123'),
+            today=timezone.now().date(),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Bulk seeding with seed {plan.seed}, batch size {plan.batch_size}, {workers} worker(s)...'
+        ))
+
+        pool = None
+        if workers > 1:
+            # Children must open their own connections
+            connections.close_all()
+            pool = Pool(workers, initializer=_init_worker)
+        started = time.perf_counter()
+        try:
+            users = sum(self._run_phase('users', seeding.insert_users, plan, plan.users, pool))
+            totals = [0, 0, 0]
+            for counts in self._run_phase('listings', seeding.insert_listings, plan, plan.listings, pool):
+                totals = [total + count for total, count in zip(totals, counts)]
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        seeding.reset_sequences()
+        new_listings = Listing.objects.filter(pk__gte=plan.listing_base)
+        new_listings.refresh_rating_stats()
+        rebuild_calendars(new_listings.values('pk'))
+        backend = get_search_backend()
+        if backend is not None:
+            backend.rebuild()
+        response_cache.invalidate_all()
+
+        elapsed = time.perf_counter() - started
+        rows = users + sum(totals)
+        listings, bookings, reviews = totals
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {users} users, {listings} listings, {bookings} bookings and {reviews} reviews: '
+            f'{rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)'
+        ))
+
+    def _run_phase(self, name, insert, plan, total, pool):
+        """Yield per-chunk results of ``insert``, reporting throughput as chunks finish."""
+        tasks = ((insert, plan, chunk) for chunk in plan.chunks(total))
+        results = pool.imap_unordered(_run_chunk, tasks) if pool else map(_run_chunk, tasks)
+        started = time.perf_counter()
+        done = rows = 0
+        for result in results:
+            counts = (result,) if isinstance(result, int) else result
+            done += counts[0]
+            rows += sum(counts)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'  {name}: {done}/{total} ({rows / elapsed:,.0f} rows/s)')
+            yield result
@@ -0,0 +1,112 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .profiling import RequestProfile, profile_store
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilingMiddleware:
+    """
+    Time every request per view name and report it in a Server-Timing header.
+
+    Wall time, query count and database time, serialization time (DRF
+    rendering plus ``profiling.span`` blocks) and response size go to
+    listings.profiling.profile_store. Parameterized SQL run
+    LISTINGS_PROFILING_DUPLICATE_THRESHOLD or more times in one request is
+    logged as a probable N+1. Keep it first in MIDDLEWARE so the wall time
+    covers the others.
+
+    Under ASGI it runs async. Database connections belong to the thread
+    the async ORM runs queries on, so the wrappers are installed there.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.LISTINGS_PROFILING:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        profile = request.profile = RequestProfile()
+        with self._wrap_connections(profile):
+            response = self.get_response(request)
+        return self._finish(request, response, profile, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if not settings.LISTINGS_PROFILING:
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        profile = request.profile = RequestProfile()
+        wrappers = await sync_to_async(self._wrap_connections)(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(wrappers.close)()
+        return self._finish(request, response, profile, time.perf_counter() - start)
+
+    @staticmethod
+    def _wrap_connections(profile):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(profile))
+        return stack
+
+    def _finish(self, request, response, profile, total):
+        view = self._view_name(request)
+        duplicates = profile.duplicates(settings.LISTINGS_PROFILING_DUPLICATE_THRESHOLD)
+        if duplicates:
+            sql, count = max(duplicates.items(), key=lambda item: item[1])
+            logger.warning("Possible N+1 in %s: %d statement(s) repeated, e.g. %dx %s",
+                           view, len(duplicates), count, sql[:200])
+
+        size = 0 if response.streaming else len(response.content)
+        profile_store.record(
+            view,
+            duplicate_sql=bool(duplicates),
+            total_ms=total * 1000,
+            db_ms=profile.db_time * 1000,
+            serialize_ms=profile.serialize_time * 1000,
+            queries=profile.queries,
+            size_bytes=size,
+        )
+        timings = [
+            f'total;dur={total * 1000:.1f}',
+            f'db;dur={profile.db_time * 1000:.1f};desc="{profile.queries} queries"',
+            f'serialize;dur={profile.serialize_time * 1000:.1f}',
+        ]
+        if duplicates:
+            timings.append(f'dupsql;desc="{sum(duplicates.values())} repeated queries"')
+        response['Server-Timing'] = ', '.join(timings)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered (serialized to bytes) right after this hook
+        profile = getattr(request, 'profile', None)
+        if profile is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                profile.serialize_time += time.perf_counter() - started
+            response.add_post_render_callback(rendered)
+        return response
+
+    @staticmethod
+    def _view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unresolved'
+        return match.url_name or match.view_name or 'unnamed'
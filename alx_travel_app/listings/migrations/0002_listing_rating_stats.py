@@ -0,0 +1,36 @@
+# Generated by Django 4.2.10 on 2026-10-17 04:05
+
+from django.db import migrations, models
+
+
+def backfill_rating_stats(apps, schema_editor):
+    Listing = apps.get_model('listings', 'Listing')
+    Review = apps.get_model('listings', 'Review')
+    stats = Review.objects.values('listing_id').annotate(
+        avg=models.Avg('rating'), count=models.Count('id')
+    ).order_by()
+    for row in stats.iterator():
+        Listing.objects.filter(pk=row['listing_id']).update(
+            rating_avg=row['avg'], review_count=row['count']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='rating_avg',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-17 04:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0002_listing_rating_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['listing', 'status', 'check_in', 'check_out'], name='listings_bo_listing_e7f266_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.10 on 2026-10-17 04:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0003_booking_availability_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['-created_at', '-id'], name='listings_bo_created_4cf32a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['guest', '-created_at', '-id'], name='listings_bo_guest_i_93b1fb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['is_active', '-created_at', '-id'], name='listings_li_is_acti_47a6a7_idx'),
+        ),
+    ]
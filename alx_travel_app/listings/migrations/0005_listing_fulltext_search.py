@@ -0,0 +1,54 @@
+from django.db import migrations
+
+FTS_TABLE = 'listings_listing_fts'
+FTS_COLUMNS = 'title, description, address, city, country'
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE listings_listing ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(city, '') || ' ' || coalesce(country, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(description, '') || ' ' || coalesce(address, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX listings_listing_search_idx ON listings_listing USING GIN (search_vector)",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS listings_listing_search_idx",
+    "ALTER TABLE listings_listing DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({FTS_COLUMNS}, prefix='2 3')",
+    f"INSERT INTO {FTS_TABLE} (rowid, {FTS_COLUMNS}) SELECT id, {FTS_COLUMNS} FROM listings_listing",
+]
+SQLITE_REVERSE = [
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+    """
+    Full-text search structures that the ORM does not model: a generated
+    tsvector column with a GIN index on PostgreSQL, an FTS5 table on SQLite.
+    Other databases keep using icontains search.
+    """
+
+    dependencies = [
+        ('listings', '0004_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            _run({'postgresql': POSTGRES_REVERSE, 'sqlite': SQLITE_REVERSE}),
+        ),
+    ]
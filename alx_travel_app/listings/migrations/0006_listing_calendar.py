@@ -0,0 +1,42 @@
+# Generated by Django 4.2.10 on 2026-10-17 04:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+from itertools import groupby
+
+from listings.calendar import Occupancy
+
+
+def backfill_calendars(apps, schema_editor):
+    Listing = apps.get_model('listings', 'Listing')
+    Booking = apps.get_model('listings', 'Booking')
+    ListingCalendar = apps.get_model('listings', 'ListingCalendar')
+    stays = Booking.objects.filter(status__in=['CONFIRMED', 'PENDING']).order_by('listing_id').values_list(
+        'listing_id', 'check_in', 'check_out'
+    )
+    calendars = {pk: ListingCalendar(listing_id=pk) for pk in Listing.objects.values_list('pk', flat=True)}
+    for listing_id, rows in groupby(stays.iterator(), key=lambda row: row[0]):
+        occupancy = Occupancy.from_stays((check_in, check_out) for _, check_in, check_out in rows)
+        calendars[listing_id].start = occupancy.start_date
+        calendars[listing_id].bitmap = occupancy.to_bytes()
+    ListingCalendar.objects.bulk_create(calendars.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0005_listing_fulltext_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingCalendar',
+            fields=[
+                ('listing', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='calendar', serialize=False, to='listings.listing')),
+                ('start', models.DateField(blank=True, null=True)),
+                ('bitmap', models.BinaryField(default=b'')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_calendars, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.10 on 2026-10-17 04:28
+
+from django.db import migrations, models
+
+
+def mark_existing_confirmed(apps, schema_editor):
+    # Bookings made before confirmations existed must not be mailed by the sweep
+    Booking = apps.get_model('listings', 'Booking')
+    Booking.objects.update(confirmation_sent_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0006_listing_calendar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='confirmation_sent_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(mark_existing_confirmed, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('confirmation_sent_at__isnull', True)), fields=['created_at'], name='booking_unconfirmed_idx'),
+        ),
+    ]
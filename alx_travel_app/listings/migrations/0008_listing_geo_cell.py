@@ -0,0 +1,40 @@
+# Generated by Django 4.2.10 on 2026-10-17 04:33
+
+from django.db import migrations, models
+
+from listings.geo import cell_for
+
+
+def backfill_geo_cells(apps, schema_editor):
+    Listing = apps.get_model('listings', 'Listing')
+    located = Listing.objects.filter(latitude__isnull=False, longitude__isnull=False).only(
+        'latitude', 'longitude'
+    )
+    batch = []
+    for listing in located.iterator(chunk_size=2000):
+        listing.geo_cell = cell_for(listing.latitude, listing.longitude)
+        batch.append(listing)
+        if len(batch) >= 2000:
+            Listing.objects.bulk_update(batch, ['geo_cell'])
+            batch = []
+    Listing.objects.bulk_update(batch, ['geo_cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0007_booking_confirmation_sent_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='geo_cell',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_geo_cells, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['geo_cell'], name='listings_li_geo_cel_b94d9c_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.10 on 2026-10-17 04:36
+
+from django.db import migrations, models
+
+from listings.amenities import mask_for
+
+
+def backfill_amenity_masks(apps, schema_editor):
+    Listing = apps.get_model('listings', 'Listing')
+    batch = []
+    for listing in Listing.objects.only('amenities').iterator(chunk_size=2000):
+        listing.amenity_mask = mask_for(listing.amenities)
+        if listing.amenity_mask:
+            batch.append(listing)
+        if len(batch) >= 2000:
+            Listing.objects.bulk_update(batch, ['amenity_mask'])
+            batch = []
+    Listing.objects.bulk_update(batch, ['amenity_mask'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0008_listing_geo_cell'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='amenity_mask',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_amenity_masks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['amenity_mask'], name='listings_li_amenity_2ece04_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-17 05:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0012_export_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['updated_at', 'id'], name='listings_li_updated_42b339_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.10 on 2026-10-17 05:27
+
+from django.db import migrations, models
+
+
+def backfill_rating_histogram(apps, schema_editor):
+    Listing = apps.get_model('listings', 'Listing')
+    Review = apps.get_model('listings', 'Review')
+    stats = Review.objects.values('listing_id').annotate(
+        **{f'stars_{stars}': models.Count('id', filter=models.Q(rating=stars)) for stars in range(1, 6)}
+    ).order_by()
+    for row in stats.iterator():
+        Listing.objects.filter(pk=row.pop('listing_id')).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0013_listing_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='stars_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='stars_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='stars_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='stars_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='stars_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_histogram, migrations.RunPython.noop),
+    ]
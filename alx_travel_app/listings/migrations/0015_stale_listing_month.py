@@ -0,0 +1,21 @@
+# Generated by Django 4.2.10 on 2026-10-17 06:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0014_listing_rating_histogram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaleListingMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('listing_id', models.BigIntegerField()),
+                ('month', models.DateField()),
+            ],
+        ),
+    ]
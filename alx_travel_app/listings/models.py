@@ -1,10 +1,108 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.functions import Cast, Coalesce, NullIf
 from django.utils import timezone
 
+from . import amenities as amenity_bits, geo
+
 User = get_user_model()
 
+# Star ratings a review can give
+STARS = range(1, 6)
+
+
+class ListingQuerySet(models.QuerySet):
+    def with_availability(self, check_in, check_out):
+        """Annotate each listing with ``is_available`` for the given dates."""
+        conflicts = Booking.objects.overlapping(check_in, check_out).filter(
+            listing=models.OuterRef('pk')
+        )
+        return self.annotate(is_available=~models.Exists(conflicts))
+
+    def available(self, check_in, check_out, guests=None):
+        """Only listings free for the given dates (and guest count) via NOT EXISTS."""
+        queryset = self.with_availability(check_in, check_out).filter(is_available=True)
+        if guests:
+            queryset = queryset.filter(max_guests__gte=guests)
+        return queryset
+
+    def nearby(self, latitude, longitude, radius_km):
+        """
+        Listings within ``radius_km`` of a point, annotated with ``distance_km``.
+
+        Candidates come from geo_cell ranges (see listings.geo), so only the
+        tiles around the point are read before distances are computed.
+        """
+        lat_min, lat_max, lng_ranges = geo.bounding_box(latitude, longitude, radius_km)
+        cells = models.Q()
+        for first, last in geo.cell_ranges(lat_min, lat_max, lng_ranges):
+            cells |= models.Q(geo_cell__range=(first, last))
+        box = models.Q()
+        for west, east in lng_ranges:
+            box |= models.Q(longitude__range=(west, east))
+        return self.filter(cells, box, latitude__range=(lat_min, lat_max)).annotate(
+            distance_km=geo.haversine_km(latitude, longitude)
+        ).filter(distance_km__lte=radius_km)
+
+    def with_amenities(self, names, match='all'):
+        """Listings offering all (or, with ``match='any'``, any) of ``names``."""
+        required = amenity_bits.mask_for(names)
+        masks = amenity_bits.matching_masks(required, match)
+        if masks is not None:
+            return self.filter(amenity_mask__in=masks)
+        queryset = self.alias(amenity_has=models.F('amenity_mask').bitand(required))
+        if match == 'all':
+            return queryset.filter(amenity_has=required)
+        return queryset.exclude(amenity_has=0)
+
+    def refresh_rating_stats(self):
+        """
+        Recompute the review aggregates and histogram of every listing in one
+        UPDATE, moving updated_at so ETags and change feeds see backfills.
+        """
+        reviews = Review.objects.filter(listing=models.OuterRef('pk')).order_by().values('listing')
+
+        def counted(**lookups):
+            count = reviews.filter(**lookups).annotate(count=models.Count('id')).values('count')
+            return Coalesce(models.Subquery(count), 0)
+
+        return self.update(
+            rating_avg=Coalesce(models.Subquery(reviews.annotate(avg=models.Avg('rating')).values('avg')), 0.0),
+            review_count=counted(),
+            **{f'stars_{stars}': counted(rating=stars) for stars in STARS},
+            updated_at=timezone.now(),
+        )
+
+    def shift_rating(self, removed=None, added=None):
+        """
+        Move one review out of star bucket ``removed`` and/or into ``added``.
+
+        A single UPDATE with F() expressions, so concurrent review writes
+        to a listing cannot lose each other's counts; rating_avg and
+        review_count are derived from the new histogram in the same
+        statement and updated_at moves with them.
+        """
+        deltas = dict.fromkeys(STARS, 0)
+        if removed is not None:
+            deltas[removed] -= 1
+        if added is not None:
+            deltas[added] += 1
+        # Plain ints: PostgreSQL has no integer + boolean operator
+        count_delta = int(added is not None) - int(removed is not None)
+        count = models.F('review_count') + count_delta if count_delta else models.F('review_count')
+        total = sum(
+            stars * (models.F(f'stars_{stars}') + delta if delta else models.F(f'stars_{stars}'))
+            for stars, delta in deltas.items()
+        )
+        return self.update(
+            **{f'stars_{stars}': models.F(f'stars_{stars}') + delta for stars, delta in deltas.items() if delta},
+            review_count=count,
+            rating_avg=Coalesce(Cast(total, models.FloatField()) / NullIf(count, 0), 0.0),
+            updated_at=timezone.now(),
+        )
+
+
 class Listing(models.Model):
     """Model representing a property listing."""
     PROPERTY_TYPES = [
@@ -30,25 +128,95 @@ class Listing(models.Model):
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     amenities = models.JSONField(default=dict, blank=True)  # Stores amenities as key-value pairs
+    # One bit per listings.amenities.AMENITIES entry, derived in save()
+    amenity_mask = models.PositiveIntegerField(default=0, editable=False)
+    # Map tile of (latitude, longitude), derived in save(); see listings.geo
+    geo_cell = models.IntegerField(null=True, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
+    # Denormalized review aggregates, kept in sync by listings.signals:
+    # the number of reviews giving each star rating, and what follows from it
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+    rating_avg = models.FloatField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ListingQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['city', 'country']),
-            models.Index(fields=['price_per_night']),
             models.Index(fields=['property_type']),
+            # Price/capacity searches only ever see active listings: equality
+            # column first, then price for the range and ORDER BY price
+            models.Index(
+                fields=['city', 'price_per_night'],
+                condition=models.Q(is_active=True),
+                name='listing_active_city_price_idx',
+            ),
+            models.Index(
+                fields=['property_type', 'price_per_night'],
+                condition=models.Q(is_active=True),
+                name='listing_active_type_price_idx',
+            ),
+            models.Index(
+                fields=['price_per_night'],
+                condition=models.Q(is_active=True),
+                name='listing_active_price_idx',
+            ),
+            # MySQL skips partial indexes; this one keeps price ranges indexed there
+            models.Index(fields=['price_per_night']),
+            # Keyset pagination over active listings, newest first
+            models.Index(fields=['is_active', '-created_at', '-id']),
+            # Nearby search: one range scan per row of map tiles
+            models.Index(fields=['geo_cell']),
+            # ?amenities= looks up the mask values that match
+            models.Index(fields=['amenity_mask']),
+            # Change feed (listings.changes), deactivated listings included
+            models.Index(fields=['updated_at', 'id']),
         ]
 
     def __str__(self):
         return f"{self.title} in {self.city}, {self.country}"
 
+    # Columns derived in save() from the fields they depend on
+    DERIVED_FIELDS = {'geo_cell': ('latitude', 'longitude'), 'amenity_mask': ('amenities',)}
+
+    def save(self, *args, **kwargs):
+        """Keep geo_cell and amenity_mask in step with their source fields."""
+        self.geo_cell = geo.cell_for(self.latitude, self.longitude)
+        self.amenity_mask = amenity_bits.mask_for(self.amenities)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            for derived, sources in self.DERIVED_FIELDS.items():
+                if update_fields & set(sources):
+                    update_fields.add(derived)
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
     def average_rating(self):
-        """Calculate the average rating for this listing."""
-        from django.db.models import Avg
-        return self.reviews.aggregate(Avg('rating'))['rating__avg'] or 0
+        """Return the average rating for this listing."""
+        return self.rating_avg
+
+    def rating_histogram(self):
+        """``{stars: number of reviews}`` for 1 to 5 stars."""
+        return {stars: getattr(self, f'stars_{stars}') for stars in STARS}
+
+
+class BookingQuerySet(models.QuerySet):
+    def active(self):
+        """Bookings that still block the listing's calendar."""
+        return self.filter(status__in=Booking.ACTIVE_STATUSES)
+
+    def overlapping(self, check_in, check_out):
+        """Active bookings whose stay intersects [check_in, check_out)."""
+        return self.active().filter(check_in__lt=check_out, check_out__gt=check_in)
 
 
 class Booking(models.Model):
@@ -59,6 +227,13 @@ class Booking(models.Model):
         ('CANCELLED', 'Cancelled'),
         ('COMPLETED', 'Completed'),
     ]
+    ACTIVE_STATUSES = ['CONFIRMED', 'PENDING']
+    STATUS_TRANSITIONS = {
+        'PENDING': ['CONFIRMED', 'CANCELLED'],
+        'CONFIRMED': ['COMPLETED', 'CANCELLED'],
+        'COMPLETED': [],
+        'CANCELLED': [],
+    }
 
     listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='bookings')
     guest = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings')
@@ -68,11 +243,30 @@ class Booking(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     number_of_guests = models.PositiveIntegerField(validators=[MinValueValidator(1)])
     special_requests = models.TextField(blank=True)
+    # Set by listings.tasks.send_booking_confirmation once the guest was emailed
+    confirmation_sent_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BookingQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Covers the availability anti-join: listing = ? AND status IN (...) AND date overlap
+            models.Index(fields=['listing', 'status', 'check_in', 'check_out']),
+            # Keyset pagination for staff (all bookings) and guests (own bookings)
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['guest', '-created_at', '-id']),
+            # High-water mark scans for the analytics rollup
+            models.Index(fields=['updated_at', 'id']),
+            # Sweep for confirmations that were never sent
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(confirmation_sent_at__isnull=True),
+                name='booking_unconfirmed_idx',
+            ),
+        ]
         constraints = [
             models.CheckConstraint(
                 check=models.Q(check_out__gt=models.F('check_in')),
@@ -86,18 +280,93 @@ class Booking(models.Model):
 
     def is_available(self):
         """Check if the listing is available for the requested dates."""
-        from django.db.models import Q
-        
-        conflicting_bookings = Booking.objects.filter(
-            listing=self.listing,
-            status__in=['CONFIRMED', 'PENDING'],
-        ).exclude(id=self.id).filter(
-            Q(check_in__lt=self.check_out) & Q(check_out__gt=self.check_in)
-        )
-        
+        conflicting_bookings = Booking.objects.overlapping(
+            self.check_in, self.check_out
+        ).filter(listing_id=self.listing_id).exclude(id=self.id)
+
         return not conflicting_bookings.exists()
 
 
+class ListingCalendar(models.Model):
+    """Blocked nights of a listing as a bitmap, see listings.calendar."""
+    listing = models.OneToOneField(Listing, on_delete=models.CASCADE, primary_key=True, related_name='calendar')
+    # Bit i of ``bitmap`` (little-endian) is the night starting ``start + i`` days
+    start = models.DateField(null=True, blank=True)
+    bitmap = models.BinaryField(default=b'')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Calendar for listing {self.listing_id}"
+
+    @property
+    def occupancy(self):
+        from .calendar import Occupancy
+        return Occupancy.from_bytes(self.start, bytes(self.bitmap))
+
+    @occupancy.setter
+    def occupancy(self, occupancy):
+        self.start = occupancy.start_date
+        self.bitmap = occupancy.to_bytes()
+
+    @classmethod
+    def build(cls, listing_id):
+        """
+        Create or replace the calendar of one listing from its active bookings.
+
+        Built under listing_lock, like the booking writes that patch
+        calendars: a booking in flight is either committed before the read
+        or patched into the saved calendar afterwards.
+        """
+        from .calendar import Occupancy
+        from .locks import listing_lock
+        with listing_lock(listing_id):
+            stays = Booking.objects.active().filter(listing_id=listing_id).values_list('check_in', 'check_out')
+            calendar = cls(listing_id=listing_id)
+            calendar.occupancy = Occupancy.from_stays(stays)
+            calendar.save()
+        return calendar
+
+
+class ListingMonthlyStats(models.Model):
+    """Per listing and month rollup of stays and reviews, see listings.analytics."""
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='monthly_stats')
+    month = models.DateField()  # First day of the month
+    booked_nights = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    bookings = models.PositiveIntegerField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    rating_total = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['listing', 'month']
+        constraints = [
+            models.UniqueConstraint(fields=['listing', 'month'], name='one_stats_row_per_listing_month'),
+        ]
+
+    def __str__(self):
+        return f"Stats for listing {self.listing_id} in {self.month:%Y-%m}"
+
+
+class RollupWatermark(models.Model):
+    """How far (by updated_at) a rollup has read its source table."""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} up to {self.value}"
+
+
+class StaleListingMonth(models.Model):
+    """A listing-month a change left behind, recomputed by the next rollup refresh."""
+    # No foreign key: deleting a listing writes these for its cascaded bookings
+    listing_id = models.BigIntegerField()
+    month = models.DateField()  # First day of the month
+
+    def __str__(self):
+        return f"Stale stats for listing {self.listing_id} in {self.month:%Y-%m}"
+
+
 class Review(models.Model):
     """Model representing a review for a listing."""
     listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='reviews')
@@ -112,6 +381,10 @@ class Review(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # High-water mark scans for the analytics rollup
+            models.Index(fields=['updated_at', 'id']),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['booking'],
@@ -130,9 +403,61 @@ class Review(models.Model):
         return f"{self.rating} stars by {self.reviewer.email} for {self.listing.title}"
 
     def save(self, *args, **kwargs):
-        """Ensure the reviewer is the guest who made the booking."""
-        if self.reviewer != self.booking.guest:
+        """
+        Ensure the reviewer is the guest who made the (completed) booking of
+        this listing.
+
+        The booking is read in one query, or not at all when it is already
+        loaded; the listing's histogram is updated in the same transaction
+        (see listings.signals).
+        """
+        if Review.booking.is_cached(self):
+            booking = (self.booking.guest_id, self.booking.status, self.booking.listing_id)
+        else:
+            booking = Booking.objects.filter(pk=self.booking_id).values_list(
+                'guest_id', 'status', 'listing_id'
+            ).get()
+        guest_id, status, listing_id = booking
+        if self.reviewer_id != guest_id:
             raise ValueError("Only the guest who made the booking can leave a review.")
-        if self.booking.status != 'COMPLETED':
+        if status != 'COMPLETED':
             raise ValueError("Can only leave a review for completed bookings.")
-        super().save(*args, **kwargs)
+        if self.listing_id != listing_id:
+            raise ValueError("The booking is for another listing.")
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class ExportJob(models.Model):
+    """
+    A background NDJSON export of bookings, written by listings.tasks.export_bookings.
+
+    ``last_id`` and the counters are the checkpoint of the last chunk file
+    written, so a restarted task carries on from there. Live progress is
+    reported through the Celery result backend.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    ]
+
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs')
+    filters = models.JSONField(default=dict, blank=True)
+    task_id = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    rows_written = models.PositiveIntegerField(default=0)
+    chunks_written = models.PositiveIntegerField(default=0)
+    last_id = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Booking export {self.pk} ({self.status})"
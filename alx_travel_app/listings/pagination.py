@@ -0,0 +1,185 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import datetime
+
+from django.core.paginator import InvalidPage, Paginator as DjangoPaginator
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def known_count(view):
+    """The row count a view has already read for this list, if any (``view.list_count``)."""
+    return getattr(view, 'list_count', None)
+
+
+def _value(item, field):
+    return item[field] if isinstance(item, dict) else getattr(item, field)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over ``(created_at, id)``, newest first.
+
+    The cursor carries the last row's sort key, so each page is a single
+    indexed range scan with no OFFSET and, unless ``?count=true`` is given,
+    no COUNT(*). ``id`` breaks ties between rows created in the same
+    instant, which keeps pages stable while rows are being inserted.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    ordering_query_param = api_settings.ORDERING_PARAM
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self._begin(request)
+        self.count = None
+        if self._wants_count(request):
+            self.count = known_count(view)
+            if self.count is None:
+                self.count = queryset.count()
+        return self._end(list(self._window(queryset)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset for async views, querying with the async ORM."""
+        self._begin(request)
+        self.count = await queryset.acount() if self._wants_count(request) else None
+        return self._end([item async for item in self._window(queryset)])
+
+    def _begin(self, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.position, self.reverse = self.decode_cursor(request)
+
+        if request.query_params.get(self.ordering_query_param):
+            raise ValidationError({
+                self.ordering_query_param: 'Ordering cannot be combined with cursor pagination.'
+            })
+        if request.query_params.get('near'):
+            raise ValidationError({'near': 'Distance ordering cannot be combined with cursor pagination.'})
+
+    def _wants_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true')
+
+    def _window(self, queryset):
+        if self.position is not None:
+            created_at, pk = self.position
+            if self.reverse:
+                queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+            else:
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+        if self.reverse:
+            queryset = queryset.order_by('created_at', 'pk')
+        else:
+            queryset = queryset.order_by('-created_at', '-pk')
+        return queryset[:self.page_size + 1]
+
+    def _end(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+
+        # Moving backwards we always came from a later page; moving forwards
+        # any cursor at all means there is an earlier one.
+        self.has_next = has_more if not self.reverse else True
+        self.has_previous = has_more if self.reverse else self.position is not None
+        return self.page
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            created_at, pk, reverse = urlsafe_b64decode(encoded.encode()).decode().split('|')
+            return (datetime.fromisoformat(created_at), int(pk)), reverse == '1'
+        except (BinasciiError, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, item, reverse):
+        raw = f"{_value(item, 'created_at').isoformat()}|{_value(item, 'id')}|{int(reverse)}"
+        encoded = urlsafe_b64encode(raw.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+
+class PageOrKeysetPagination(PageNumberPagination):
+    """
+    Default page-number pagination, switching to KeysetPagination when the
+    request carries a ``cursor`` parameter (``?cursor=`` for the first page).
+    Existing ``?page=`` clients are unaffected.
+    """
+    keyset_class = KeysetPagination
+    counted = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.counted = known_count(view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, queryset, page_size):
+        paginator = DjangoPaginator(queryset, page_size)
+        if self.counted is not None:
+            # Saves the paginator's COUNT(*)
+            paginator.count = self.counted
+        return paginator
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset for async views: the same pages and errors, with
+        the COUNT(*) and page rows fetched through the async ORM.
+        """
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return await self.keyset.apaginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Counted here so the Paginator never queries synchronously
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+
+        self.page.object_list = [item async for item in self.page.object_list]
+        self.request = request
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
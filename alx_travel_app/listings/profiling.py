@@ -0,0 +1,204 @@
+"""
+Per-view request profiles collected by listings.middleware.ProfilingMiddleware.
+
+Each request records wall time, query count, database time, serialization
+time and response size. Histograms are kept per process and written to the
+shared cache every few seconds as one blob per process, so a flush costs
+two cache round trips however many views there are, and
+``/api/listings/perf-stats/`` adds up every worker's blob.
+"""
+import bisect
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Upper bounds of the histogram buckets; the last bucket is open-ended
+BUCKETS = {
+    'total_ms': (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+    'db_ms': (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+    'serialize_ms': (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+    'queries': (1, 2, 3, 5, 10, 20, 50, 100, 250),
+    'size_bytes': (1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+}
+# Sums are stored as integers (microseconds for times) so the cache can incr them
+SCALE = {'total_ms': 1000, 'db_ms': 1000, 'serialize_ms': 1000, 'queries': 1, 'size_bytes': 1}
+# Generation of a process that has not flushed yet
+_UNSEEN = object()
+
+
+class RequestProfile:
+    """What one request spent, filled in by the middleware's execute wrapper."""
+    __slots__ = ('queries', 'db_time', 'statements', 'serialize_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+        self.serialize_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.statements[sql] += 1
+
+    def duplicates(self, threshold):
+        """Statements (parameterized SQL) run at least ``threshold`` times: likely N+1s."""
+        return {sql: count for sql, count in self.statements.items() if count >= threshold}
+
+
+@contextmanager
+def span(request):
+    """Add the time spent in the block to the request's ``serialize_time``."""
+    profile = getattr(getattr(request, '_request', request), 'profile', None)
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.serialize_time += time.perf_counter() - start
+
+
+class ProfileStore:
+    """
+    Per-process histograms, periodically written to the shared cache.
+
+    Each process owns one cache entry holding its running totals, so writes
+    never race and need no counters. ``reset`` bumps a generation key;
+    processes that see a new generation drop their totals on their next
+    flush, and blobs from older generations are ignored until then.
+    """
+    prefix = 'listings:perf'
+
+    def __init__(self):
+        self._generation = _UNSEEN
+        self._start()
+        if hasattr(os, 'register_at_fork'):
+            # Workers forked from a preloaded parent must not share its identity
+            os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        self._lock = threading.Lock()
+        self._totals = defaultdict(int)
+        self._worker = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._flushed_at = time.monotonic()
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'LISTINGS_CACHE_ALIAS', 'default')]
+
+    @property
+    def _workers_key(self):
+        return f'{self.prefix}:workers'
+
+    @property
+    def _generation_key(self):
+        return f'{self.prefix}:generation'
+
+    def _blob_key(self, worker):
+        return f'{self.prefix}:worker:{worker}'
+
+    def record(self, view, duplicate_sql=False, **values):
+        """Count one request of ``view``; ``values`` are keyed like BUCKETS."""
+        with self._lock:
+            self._totals[view, 'requests', 'count'] += 1
+            if duplicate_sql:
+                self._totals[view, 'duplicates', 'count'] += 1
+            for metric, value in values.items():
+                bucket = bisect.bisect_left(BUCKETS[metric], value)
+                self._totals[view, metric, bucket] += 1
+                self._totals[view, metric, 'sum'] += int(value * SCALE[metric])
+            due = time.monotonic() - self._flushed_at >= settings.LISTINGS_PROFILING_FLUSH_SECONDS
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write this process's totals: one read and one write."""
+        cache = self.cache
+        found = cache.get_many([self._workers_key, self._generation_key])
+        workers, generation = found.get(self._workers_key) or set(), found.get(self._generation_key)
+        with self._lock:
+            if generation != self._generation:
+                if self._generation is not _UNSEEN:
+                    # perf-stats was reset elsewhere since the last flush
+                    self._totals.clear()
+                self._generation = generation
+            totals, self._flushed_at = dict(self._totals), time.monotonic()
+        entries = {self._blob_key(self._worker): (generation, totals)}
+        # Racy, but a worker lost here is re-added by its next flush
+        if self._worker not in workers:
+            entries[self._workers_key] = workers | {self._worker}
+        cache.set_many(entries, None)
+
+    def snapshot(self):
+        """Aggregated histograms and approximate percentiles for every view."""
+        self.flush()
+        cache = self.cache
+        found = cache.get_many([self._workers_key, self._generation_key])
+        blobs = cache.get_many([self._blob_key(worker) for worker in found.get(self._workers_key) or ()])
+        totals = Counter()
+        for generation, counts in blobs.values():
+            if generation == found.get(self._generation_key):
+                totals.update(counts)
+
+        report = {}
+        for view in sorted({view for view, _, _ in totals}):
+            count = totals[view, 'requests', 'count']
+            if not count:
+                continue
+            metrics = {}
+            for metric, bounds in BUCKETS.items():
+                counts = [totals[view, metric, bucket] for bucket in range(len(bounds) + 1)]
+                total = totals[view, metric, 'sum'] / SCALE[metric]
+                metrics[metric] = {
+                    'mean': round(total / count, 3),
+                    'p50': _bucket_percentile(bounds, counts, 50),
+                    'p95': _bucket_percentile(bounds, counts, 95),
+                    'p99': _bucket_percentile(bounds, counts, 99),
+                    'histogram': {_bucket_label(bounds, index): n for index, n in enumerate(counts) if n},
+                }
+            duplicates = totals[view, 'duplicates', 'count']
+            report[view] = {'requests': count, 'requests_with_duplicate_sql': duplicates, **metrics}
+        return report
+
+    def reset(self):
+        generation = uuid.uuid4().hex
+        with self._lock:
+            self._totals.clear()
+            self._generation = generation
+        cache = self.cache
+        cache.set(self._generation_key, generation, None)
+        workers = cache.get(self._workers_key) or ()
+        cache.delete_many([self._workers_key, *map(self._blob_key, workers)])
+
+
+def _bucket_label(bounds, index):
+    return f'<={bounds[index]}' if index < len(bounds) else f'>{bounds[-1]}'
+
+
+def _bucket_percentile(bounds, counts, pct):
+    """Upper bound of the bucket holding the ``pct`` percentile (None if open-ended)."""
+    total = sum(counts)
+    if not total:
+        return None
+    rank, seen = pct / 100 * total, 0
+    for index, count in enumerate(counts):
+        seen += count
+        if seen >= rank:
+            return bounds[index] if index < len(bounds) else None
+    return None
+
+
+profile_store = ProfileStore()
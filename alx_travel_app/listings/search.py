@@ -0,0 +1,148 @@
+import re
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+FTS_TABLE = 'listings_listing_fts'
+# Columns mirrored into the full-text index, in FTS5 column order
+FTS_COLUMNS = ('title', 'description', 'address', 'city', 'country')
+
+DEFAULT_BACKENDS = {
+    'postgresql': 'listings.search.PostgresSearchBackend',
+    'sqlite': 'listings.search.SQLiteFTSSearchBackend',
+}
+
+_TERM_RE = re.compile(r'\w+')
+MAX_TERMS = 8
+
+
+def search_terms(terms):
+    """Reduce raw search terms to plain word tokens safe for MATCH/tsquery."""
+    tokens = []
+    for term in terms:
+        tokens.extend(_TERM_RE.findall(term.lower()))
+    return tokens[:MAX_TERMS]
+
+
+class PostgresSearchBackend:
+    """
+    Ranked full-text search over the ``search_vector`` column.
+
+    The column is a stored generated tsvector with a GIN index, added by
+    migration 0005, so PostgreSQL keeps it current on every write and there
+    is nothing to sync from Python.
+    """
+    config = 'english'
+    rank_ordering = '-search_rank'
+
+    def search(self, queryset, terms):
+        table = queryset.model._meta.db_table
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        rank = RawSQL(
+            f"ts_rank({table}.search_vector, to_tsquery('{self.config}', %s))", [tsquery]
+        )
+        return queryset.annotate(search_rank=rank).extra(
+            where=[f"{table}.search_vector @@ to_tsquery('{self.config}', %s)"],
+            params=[tsquery],
+        )
+
+    def index(self, listing):
+        pass
+
+    def remove(self, listing_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class SQLiteFTSSearchBackend:
+    """
+    Ranked full-text search through an FTS5 virtual table.
+
+    The table is created by migration 0005 and kept in sync with listing
+    writes by listings.signals. Writes that bypass signals (bulk_create,
+    queryset.update) must be followed by ``rebuild()``.
+    """
+    # bm25() weights per column in FTS_COLUMNS order; lower scores rank higher
+    weights = (10.0, 1.0, 1.0, 5.0, 5.0)
+    rank_ordering = 'search_rank'
+
+    def search(self, queryset, terms):
+        table = queryset.model._meta.db_table
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(weight) for weight in self.weights)
+        return queryset.extra(
+            select={'search_rank': f'bm25({FTS_TABLE}, {weights})'},
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = {table}.id', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+        )
+
+    def index(self, listing):
+        columns = ', '.join(FTS_COLUMNS)
+        placeholders = ', '.join(['%s'] * len(FTS_COLUMNS))
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [listing.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, {columns}) VALUES (%s, {placeholders})',
+                [listing.pk] + [getattr(listing, column) for column in FTS_COLUMNS],
+            )
+
+    def remove(self, listing_id):
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [listing_id])
+
+    def rebuild(self):
+        from .models import Listing
+
+        columns = ', '.join(FTS_COLUMNS)
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, {columns}) '
+                f'SELECT id, {columns} FROM {Listing._meta.db_table}'
+            )
+
+
+def get_search_backend(using=DEFAULT_DB_ALIAS):
+    """
+    Return the configured search backend, or None for plain icontains.
+
+    ``LISTINGS_SEARCH_BACKEND`` may name a backend class; left unset the
+    backend is picked from the database vendor.
+    """
+    path = getattr(settings, 'LISTINGS_SEARCH_BACKEND', None)
+    if path is None:
+        path = DEFAULT_BACKENDS.get(connections[using].vendor)
+    if not path:
+        return None
+    return import_string(path)()
+
+
+class ListingSearchFilter(filters.SearchFilter):
+    """
+    ``?search=`` backed by the full-text search backend.
+
+    Falls back to DRF's icontains SearchFilter when no backend is available.
+    Sits after OrderingFilter so that, unless the client asked for an
+    explicit ``ordering``, results are ranked by relevance first.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        backend = get_search_backend(queryset.db)
+        if backend is None:
+            return super().filter_queryset(request, queryset, view)
+
+        terms = search_terms(self.get_search_terms(request))
+        if not terms:
+            return queryset
+
+        queryset = backend.search(queryset, terms)
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            queryset = queryset.order_by(backend.rank_ordering, *queryset.query.order_by)
+        return queryset
@@ -0,0 +1,223 @@
+"""
+High-volume data generation for ``manage.py seed --bulk``.
+
+Work is split into fixed-size chunks. Every chunk draws from its own RNG
+seeded with ``(seed, phase, chunk)`` and writes rows with precomputed
+primary keys, so the output is identical whether one process or many
+produce it and in whatever order chunks finish.
+"""
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from . import amenities, geo
+from .models import Listing, Booking, Review
+
+User = get_user_model()
+
+CITIES = [
+    ('Nairobi', 'Kenya', -1.2921, 36.8219), ('Mombasa', 'Kenya', -4.0435, 39.6682),
+    ('Nakuru', 'Kenya', -0.3031, 36.0800), ('Kisumu', 'Kenya', -0.0917, 34.7680),
+    ('Eldoret', 'Kenya', 0.5143, 35.2698), ('Kigali', 'Rwanda', -1.9441, 30.0619),
+    ('Kampala', 'Uganda', 0.3476, 32.5825), ('Arusha', 'Tanzania', -3.3869, 36.6830),
+    ('Zanzibar', 'Tanzania', -6.1659, 39.2026), ('Cape Town', 'South Africa', -33.9249, 18.4241),
+]
+AMENITIES = amenities.AMENITIES
+PROPERTY_TYPES = [choice[0] for choice in Listing.PROPERTY_TYPES]
+# First stay of every listing starts this far in the past, so the
+# calendar holds completed history as well as upcoming bookings.
+HISTORY_DAYS = 365
+COORDINATE = Decimal('0.000001')
+
+
+def _spread(total, parts, index):
+    """Offset and size of slice ``index`` when ``total`` is split evenly into ``parts``."""
+    quotient, remainder = divmod(total, parts)
+    return index * quotient + min(index, remainder), quotient + (index < remainder)
+
+
+@dataclass(frozen=True)
+class SeedPlan:
+    seed: int
+    users: int
+    listings: int
+    bookings: int
+    reviews: int
+    batch_size: int
+    password: str
+    today: date
+    user_base: int
+    listing_base: int
+    booking_base: int
+    review_base: int
+
+    @classmethod
+    def build(cls, **kwargs):
+        """Plan a run that appends after the current highest primary keys."""
+        def next_id(model):
+            return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+        return cls(
+            user_base=next_id(User),
+            listing_base=next_id(Listing),
+            booking_base=next_id(Booking),
+            review_base=next_id(Review),
+            **kwargs
+        )
+
+    def chunks(self, total):
+        return range(-(-total // self.batch_size))
+
+    def rng(self, phase, chunk):
+        return random.Random(f'{self.seed}:{phase}:{chunk}')
+
+    def faker(self, rng):
+        fake = Faker()
+        fake.seed_instance(rng.getrandbits(32))
+        return fake
+
+
+def generate_users(plan, chunk):
+    rng = plan.rng('users', chunk)
+    fake = plan.faker(rng)
+    start = chunk * plan.batch_size
+    for index in range(start, min(start + plan.batch_size, plan.users)):
+        pk = plan.user_base + index
+        yield User(
+            id=pk,
+            username=f'guest{pk}',
+            email=f'guest{pk}@example.com',
+            password=plan.password,
+            first_name=fake.first_name(),
+            last_name=fake.last_name(),
+        )
+
+
+def generate_listings(plan, chunk):
+    rng = plan.rng('listings', chunk)
+    fake = plan.faker(rng)
+    start = chunk * plan.batch_size
+    for index in range(start, min(start + plan.batch_size, plan.listings)):
+        city, country, latitude, longitude = rng.choice(CITIES)
+        listing = Listing(
+            id=plan.listing_base + index,
+            title=fake.sentence(nb_words=4),
+            description=fake.paragraph(nb_sentences=6),
+            host_id=plan.user_base + rng.randrange(plan.users),
+            property_type=rng.choice(PROPERTY_TYPES),
+            price_per_night=Decimal(rng.randint(20, 500)),
+            bedrooms=rng.randint(1, 6),
+            bathrooms=rng.randint(1, 4),
+            max_guests=rng.randint(2, 12),
+            address=fake.street_address(),
+            city=city,
+            country=country,
+            latitude=Decimal(latitude + rng.uniform(-0.1, 0.1)).quantize(COORDINATE),
+            longitude=Decimal(longitude + rng.uniform(-0.1, 0.1)).quantize(COORDINATE),
+            amenities={amenity: rng.random() < 0.5 for amenity in AMENITIES},
+            is_active=rng.random() < 0.75,
+        )
+        # bulk_create skips save(), which normally derives these
+        listing.geo_cell = geo.cell_for(listing.latitude, listing.longitude)
+        listing.amenity_mask = amenities.mask_for(listing.amenities)
+        yield index, listing
+
+
+def _booking_status(rng, check_in, check_out, today):
+    if check_out <= today:
+        return 'COMPLETED' if rng.random() < 0.85 else 'CANCELLED'
+    if check_in <= today:
+        return 'CONFIRMED'
+    return rng.choice(['PENDING', 'CONFIRMED', 'CONFIRMED', 'CANCELLED'])
+
+
+def generate_stays(plan, rng, index, listing):
+    """
+    Yield ``(booking, review_or_None)`` for one listing.
+
+    Stays are laid out back to back with random gaps, so no two bookings
+    of a listing ever overlap, whatever their status.
+    """
+    if plan.users < 2:
+        return
+    offset, count = _spread(plan.bookings, plan.listings, index)
+    _, review_quota = _spread(plan.reviews, plan.listings, index)
+    reviewed_guests = set()
+    seeded_at = timezone.now()
+    check_in = plan.today - timedelta(days=HISTORY_DAYS - rng.randint(0, 30))
+
+    for position in range(offset, offset + count):
+        check_in += timedelta(days=rng.randint(0, 14))
+        nights = rng.randint(1, 14)
+        check_out = check_in + timedelta(days=nights)
+        guest_id = listing.host_id
+        while guest_id == listing.host_id:
+            guest_id = plan.user_base + rng.randrange(plan.users)
+
+        booking = Booking(
+            id=plan.booking_base + position,
+            listing_id=listing.id,
+            guest_id=guest_id,
+            check_in=check_in,
+            check_out=check_out,
+            total_price=nights * listing.price_per_night,
+            status=_booking_status(rng, check_in, check_out, plan.today),
+            number_of_guests=rng.randint(1, min(listing.max_guests, 6)),
+            special_requests='Late check-in please' if rng.random() > 0.7 else '',
+            # Historic data, never queue confirmation emails for it
+            confirmation_sent_at=seeded_at,
+        )
+
+        review = None
+        if (booking.status == 'COMPLETED' and len(reviewed_guests) < review_quota
+                and guest_id not in reviewed_guests):
+            reviewed_guests.add(guest_id)
+            # One review per booking, so the booking position is a free unique id
+            review = Review(
+                id=plan.review_base + position,
+                listing_id=listing.id,
+                booking_id=booking.id,
+                reviewer_id=guest_id,
+                rating=rng.randint(1, 5),
+                comment='Lovely stay.' if rng.random() > 0.2 else '',
+            )
+        yield booking, review
+        check_in = check_out
+
+
+def insert_users(plan, chunk):
+    return len(User.objects.bulk_create(generate_users(plan, chunk), batch_size=plan.batch_size))
+
+
+def insert_listings(plan, chunk):
+    """Insert one chunk of listings together with their bookings and reviews."""
+    rng = plan.rng('stays', chunk)
+    listings, bookings, reviews = [], [], []
+    for index, listing in generate_listings(plan, chunk):
+        listings.append(listing)
+        for booking, review in generate_stays(plan, rng, index, listing):
+            bookings.append(booking)
+            if review is not None:
+                reviews.append(review)
+
+    Listing.objects.bulk_create(listings, batch_size=plan.batch_size)
+    Booking.objects.bulk_create(bookings, batch_size=plan.batch_size)
+    Review.objects.bulk_create(reviews, batch_size=plan.batch_size)
+    return len(listings), len(bookings), len(reviews)
+
+
+def reset_sequences():
+    """Move id sequences past the explicitly assigned primary keys (PostgreSQL)."""
+    from django.core.management.color import no_style
+
+    statements = connection.ops.sequence_reset_sql(no_style(), [User, Listing, Booking, Review])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
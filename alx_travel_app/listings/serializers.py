@@ -1,5 +1,14 @@
+from datetime import timedelta
+from celery.result import AsyncResult
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Listing, Booking, Review
+from .amenities import AMENITIES
+from .analytics import months_before
+from .facets import FACETS
+from .locks import listing_lock
+from .models import Listing, Booking, ExportJob, Review
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -36,6 +45,40 @@ class ReviewSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Rating must be between 1 and 5")
         return value
 
+
+class ListingReviewSerializer(ReviewSerializer):
+    """
+    Reviews under ``/listings/{id}/reviews/``: the reviewer is the requesting
+    user and the listing (``context['listing']``) comes from the URL.
+
+    The booking row read by the ``booking`` field is all validation needs,
+    and Review.save reuses it instead of fetching it again.
+    """
+    reviewer_id = None
+
+    class Meta(ReviewSerializer.Meta):
+        fields = ['id', 'booking', 'reviewer', 'rating', 'comment', 'created_at', 'updated_at']
+
+    def validate(self, data):
+        booking = data['booking']
+        if booking.listing_id != self.context['listing'].pk:
+            raise serializers.ValidationError({'booking': 'This booking is for another listing.'})
+        if booking.guest_id != self.context['request'].user.pk:
+            raise serializers.ValidationError({'booking': 'Only the guest who made the booking can leave a review.'})
+        if booking.status != 'COMPLETED':
+            raise serializers.ValidationError({'booking': 'Can only leave a review for completed bookings.'})
+        return data
+
+    def create(self, validated_data):
+        validated_data.update(listing=self.context['listing'], reviewer=self.context['request'].user)
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            # one_review_per_booking / one_review_per_listing_per_user
+            raise serializers.ValidationError({'booking': 'You have already reviewed this listing.'})
+
+
 class ListingSerializer(serializers.ModelSerializer):
     """Serializer for the Listing model"""
     host = UserSerializer(read_only=True)
@@ -45,7 +88,7 @@ class ListingSerializer(serializers.ModelSerializer):
         write_only=True,
         required=False
     )
-    average_rating = serializers.FloatField(read_only=True)
+    average_rating = serializers.FloatField(source='rating_avg', read_only=True)
     is_available = serializers.SerializerMethodField()
 
     class Meta:
@@ -55,14 +98,18 @@ class ListingSerializer(serializers.ModelSerializer):
             'price_per_night', 'bedrooms', 'bathrooms', 'max_guests',
             'address', 'city', 'country', 'latitude', 'longitude',
             'amenities', 'is_active', 'created_at', 'updated_at',
-            'average_rating', 'is_available'
+            'average_rating', 'review_count', 'is_available'
         ]
-        read_only_fields = ('id', 'created_at', 'updated_at', 'average_rating')
+        read_only_fields = ('id', 'created_at', 'updated_at', 'average_rating', 'review_count')
         extra_kwargs = {
             'amenities': {'required': False, 'default': dict}
         }
 
     def get_is_available(self, obj):
+        # Annotated in bulk by AvailabilityFilter when check_in/check_out are given
+        if hasattr(obj, 'is_available'):
+            return obj.is_available
+
         request = self.context.get('request')
         if not request or 'check_in' not in request.query_params or 'check_out' not in request.query_params:
             return None
@@ -71,11 +118,103 @@ class ListingSerializer(serializers.ModelSerializer):
         check_out = request.query_params['check_out']
         
         # simplified availability check 
-        return not obj.bookings.filter(
-            check_in__lt=check_out,
-            check_out__gt=check_in,
-            status__in=['CONFIRMED', 'PENDING']
-        ).exists()
+        return not obj.bookings.overlapping(check_in, check_out).exists()
+
+class AvailabilityQuerySerializer(serializers.Serializer):
+    """Validates the check_in/check_out/guests query params of an availability search"""
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    guests = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, data):
+        if data['check_in'] >= data['check_out']:
+            raise serializers.ValidationError({"check_out": "Check-out date must be after check-in date."})
+        return data
+
+class NearbyQuerySerializer(serializers.Serializer):
+    """Validates the near=lat,lng and radius_km query params of a nearby search"""
+    near = serializers.CharField()
+    radius_km = serializers.FloatField(min_value=0.1, max_value=200, default=10)
+
+    def validate_near(self, value):
+        try:
+            latitude, longitude = (float(part) for part in value.split(','))
+        except ValueError:
+            raise serializers.ValidationError("Expected 'latitude,longitude'.")
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise serializers.ValidationError("Coordinates out of range.")
+        return latitude, longitude
+
+class AmenityQuerySerializer(serializers.Serializer):
+    """Validates the amenities=a,b and amenities_match=all|any query params"""
+    amenities = serializers.CharField()
+    amenities_match = serializers.ChoiceField(choices=['all', 'any'], default='all')
+
+    def validate_amenities(self, value):
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = sorted(set(names) - set(AMENITIES))
+        if not names or unknown:
+            raise serializers.ValidationError(
+                f"Unknown amenities: {', '.join(unknown) or '(none given)'}. Choose from {', '.join(AMENITIES)}."
+            )
+        return names
+
+class FacetQuerySerializer(serializers.Serializer):
+    """Validates the facets=a,b query param of a listing list"""
+    facets = serializers.CharField()
+
+    def validate_facets(self, value):
+        names = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+        unknown = sorted(set(names) - set(FACETS))
+        if not names or unknown:
+            raise serializers.ValidationError(
+                f"Unknown facets: {', '.join(unknown) or '(none given)'}. Choose from {', '.join(FACETS)}."
+            )
+        return names
+
+class CalendarQuerySerializer(serializers.Serializer):
+    """Validates the from/to query params of a listing calendar (``to`` is exclusive)"""
+    DEFAULT_DAYS = 365
+    MAX_DAYS = 731
+
+    def get_fields(self):
+        # ``from`` is a keyword, so the fields cannot be declared as attributes
+        return {
+            'from': serializers.DateField(required=False),
+            'to': serializers.DateField(required=False),
+        }
+
+    def validate(self, data):
+        first = data.get('from') or timezone.localdate()
+        last = data.get('to') or first + timedelta(days=self.DEFAULT_DAYS)
+        if last <= first:
+            raise serializers.ValidationError({"to": "End date must be after start date."})
+        if (last - first).days > self.MAX_DAYS:
+            raise serializers.ValidationError({"to": f"At most {self.MAX_DAYS} days per request."})
+        return {'from': first, 'to': last}
+
+class StatsQuerySerializer(serializers.Serializer):
+    """Validates the from/to months (YYYY-MM, inclusive) of a stats request"""
+    DEFAULT_MONTHS = 12
+    MAX_MONTHS = 36
+
+    def get_fields(self):
+        # ``from`` is a keyword, so the fields cannot be declared as attributes
+        month = {'required': False, 'input_formats': ['%Y-%m', 'iso-8601']}
+        return {'from': serializers.DateField(**month), 'to': serializers.DateField(**month)}
+
+    def validate(self, data):
+        last = (data.get('to') or timezone.localdate()).replace(day=1)
+        first = data.get('from')
+        if first is None:
+            first = months_before(last, self.DEFAULT_MONTHS - 1)
+        first = first.replace(day=1)
+        months = (last.year - first.year) * 12 + last.month - first.month + 1
+        if months < 1:
+            raise serializers.ValidationError({"to": "End month must not be before start month."})
+        if months > self.MAX_MONTHS:
+            raise serializers.ValidationError({"to": f"At most {self.MAX_MONTHS} months per request."})
+        return {'from': first, 'to': last}
 
 class BookingSerializer(serializers.ModelSerializer):
     """Serializer for the Booking model"""
@@ -102,7 +241,7 @@ class BookingSerializer(serializers.ModelSerializer):
             'number_of_guests', 'special_requests', 'created_at',
             'updated_at', 'review'
         ]
-        read_only_fields = ('id', 'created_at', 'updated_at', 'review')
+        read_only_fields = ('id', 'total_price', 'created_at', 'updated_at', 'review')
 
     def validate(self, data):
         """
@@ -140,10 +279,22 @@ class BookingSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        # Calculate total price
-        days = (validated_data['check_out'] - validated_data['check_in']).days
-        validated_data['total_price'] = days * validated_data['listing'].price_per_night
-        return super().create(validated_data)
+        listing = validated_data['listing']
+        check_in = validated_data['check_in']
+        check_out = validated_data['check_out']
+
+        # validate() is only a fast path; re-check under the listing lock so
+        # two parallel requests for the same dates cannot both insert.
+        with listing_lock(listing.pk):
+            if listing.bookings.overlapping(check_in, check_out).exists():
+                raise serializers.ValidationError(
+                    "This listing is not available for the selected dates."
+                )
+
+            # Calculate total price
+            days = (check_out - check_in).days
+            validated_data['total_price'] = days * listing.price_per_night
+            return super().create(validated_data)
 
 class BookingStatusUpdateSerializer(serializers.ModelSerializer):
     """Serializer for updating booking status"""
@@ -155,16 +306,78 @@ class BookingStatusUpdateSerializer(serializers.ModelSerializer):
         }
 
     def validate_status(self, value):
-        valid_transitions = {
-            'PENDING': ['CONFIRMED', 'CANCELLED'],
-            'CONFIRMED': ['COMPLETED', 'CANCELLED'],
-            'COMPLETED': [],
-            'CANCELLED': []
-        }
-        
         current_status = self.instance.status
-        if value not in valid_transitions.get(current_status, []):
+        if value not in Booking.STATUS_TRANSITIONS.get(current_status, []):
             raise serializers.ValidationError(
                 f"Cannot change status from {current_status} to {value}"
             )
         return value
+
+
+class BookingImportSerializer(serializers.Serializer):
+    """
+    One item of a batch booking import.
+
+    Only checks the item itself; the listing, guest and date conflicts are
+    resolved for the whole batch at once in listings.batch.
+    """
+    listing = serializers.IntegerField(min_value=1)
+    guest_id = serializers.IntegerField(min_value=1)
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    number_of_guests = serializers.IntegerField(min_value=1)
+    special_requests = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate(self, data):
+        if data['check_in'] >= data['check_out']:
+            raise serializers.ValidationError({"check_out": "Check-out date must be after check-in date."})
+        return data
+
+
+class BookingStatusItemSerializer(serializers.Serializer):
+    """One item of a batch status update."""
+    id = serializers.IntegerField(min_value=1)
+    status = serializers.ChoiceField(choices=Booking.STATUS_CHOICES)
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    """
+    An export job; ``filters`` are the booking list filters (listing,
+    status, guest). ``progress`` comes from the Celery result backend.
+    """
+    progress = serializers.SerializerMethodField()
+    chunks = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            'id', 'status', 'filters', 'total_rows', 'rows_written', 'chunks_written',
+            'progress', 'chunks', 'error', 'created_at', 'updated_at', 'finished_at',
+        ]
+        read_only_fields = [field for field in fields if field != 'filters']
+
+    def validate_filters(self, value):
+        from .filters import BookingFilterSet
+
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Expected an object of booking filters.")
+        filterset = BookingFilterSet(value, queryset=Booking.objects.none())
+        if not filterset.is_valid():
+            raise serializers.ValidationError(filterset.errors)
+        return {name: value[name] for name in filterset.filters if value.get(name) not in (None, '')}
+
+    def get_progress(self, job):
+        if not job.task_id:
+            return None
+        # One backend read; AsyncResult.state and .info would each fetch it
+        meta = AsyncResult(job.task_id).backend.get_task_meta(job.task_id)
+        info = meta['result'] if isinstance(meta['result'], dict) else {}
+        return {'state': meta['status'], **{key: info.get(key) for key in ('rows', 'total', 'chunks')}}
+
+    def get_chunks(self, job):
+        request = self.context.get('request')
+        urls = []
+        for number in range(1, job.chunks_written + 1):
+            url = reverse('listings:export-job-chunk', args=[job.pk, number])
+            urls.append(request.build_absolute_uri(url) if request else url)
+        return urls
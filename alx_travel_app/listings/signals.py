@@ -0,0 +1,136 @@
+from django.db.models.signals import post_init, post_save, post_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import analytics
+from .cache import response_cache
+from .calendar import refresh_calendar
+from .models import Listing, Booking, Review
+from .search import FTS_COLUMNS, get_search_backend
+
+
+@receiver(post_init, sender=Review)
+def remember_rating_state(sender, instance, **kwargs):
+    # Which listing histogram bucket currently counts this review
+    instance._rating_state = (instance.listing_id, instance.rating) if instance.pk else None
+
+
+@receiver(post_save, sender=Review)
+def update_listing_rating_stats(sender, instance, **kwargs):
+    """Move the review between histogram buckets, leaving the reviews table unread."""
+    old, new = instance._rating_state, (instance.listing_id, instance.rating)
+    instance._rating_state = new
+    if old == new:
+        return
+    if old is not None and old[0] != new[0]:
+        Listing.objects.filter(pk=old[0]).shift_rating(removed=old[1])
+        old = None
+    Listing.objects.filter(pk=new[0]).shift_rating(removed=old and old[1], added=new[1])
+
+
+@receiver(post_delete, sender=Review)
+def remove_listing_rating(sender, instance, **kwargs):
+    if instance._rating_state is not None:
+        listing_id, rating = instance._rating_state
+        Listing.objects.filter(pk=listing_id).shift_rating(removed=rating)
+
+
+def _review_month(review):
+    return analytics.month_start(timezone.localdate(review.created_at))
+
+
+@receiver(pre_save, sender=Review)
+def mark_review_month_moved(sender, instance, **kwargs):
+    # The rollup finds the new listing by updated_at, never the old one
+    old = instance._rating_state
+    if old is not None and old[0] != instance.listing_id:
+        analytics.mark_stale(old[0], [_review_month(instance)])
+
+
+@receiver(post_delete, sender=Review)
+def mark_review_month_deleted(sender, instance, **kwargs):
+    analytics.mark_stale(instance.listing_id, [_review_month(instance)])
+
+
+@receiver(post_save, sender=Listing)
+@receiver(post_delete, sender=Listing)
+def invalidate_listing_responses(sender, instance, **kwargs):
+    response_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_review_responses(sender, instance, **kwargs):
+    response_cache.invalidate(instance.listing_id)
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_booking_responses(sender, instance, **kwargs):
+    response_cache.invalidate(instance.listing_id, bookings=True)
+
+
+def _calendar_state(booking):
+    return (booking.listing_id, booking.status in Booking.ACTIVE_STATUSES, booking.check_in, booking.check_out)
+
+
+def _stats_state(booking):
+    return (booking.listing_id, booking.status in analytics.REVENUE_STATUSES, booking.check_in, booking.check_out)
+
+
+@receiver(post_init, sender=Booking)
+def remember_booking_state(sender, instance, **kwargs):
+    # What the listing calendar and the stats rollup currently reflect for this booking
+    saved = instance.pk is not None
+    instance._calendar_state = _calendar_state(instance) if saved else None
+    instance._stats_state = _stats_state(instance) if saved else None
+
+
+@receiver(post_save, sender=Booking)
+def mark_stay_months_moved(sender, instance, **kwargs):
+    """Queue the months a counted stay left; the rollup finds its new ones by updated_at."""
+    old, new = instance._stats_state, _stats_state(instance)
+    instance._stats_state = new
+    if old is not None and old[1] and (old[0], *old[2:]) != (new[0], *new[2:]):
+        analytics.mark_stale(old[0], analytics.stay_months(old[2], old[3]))
+
+
+@receiver(post_delete, sender=Booking)
+def mark_stay_months_deleted(sender, instance, **kwargs):
+    if instance.status in analytics.REVENUE_STATUSES:
+        analytics.mark_stale(instance.listing_id, analytics.stay_months(instance.check_in, instance.check_out))
+
+
+@receiver(post_save, sender=Booking)
+def update_listing_calendar(sender, instance, **kwargs):
+    """Patch the nights touched by a booking create, status change or date change."""
+    old, new = instance._calendar_state, _calendar_state(instance)
+    instance._calendar_state = new
+    if old == new or ((old is None or not old[1]) and not new[1]):
+        return
+    if old is not None and old[0] != new[0]:
+        refresh_calendar(old[0], [old[2:]])
+        old = None
+    refresh_calendar(new[0], [new[2:]] + ([old[2:]] if old else []))
+
+
+@receiver(post_delete, sender=Booking)
+def release_listing_calendar(sender, instance, **kwargs):
+    if instance.status in Booking.ACTIVE_STATUSES:
+        refresh_calendar(instance.listing_id, [(instance.check_in, instance.check_out)])
+
+
+@receiver(post_save, sender=Listing)
+def index_listing_for_search(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & set(FTS_COLUMNS):
+        return
+    backend = get_search_backend()
+    if backend is not None:
+        backend.index(instance)
+
+
+@receiver(post_delete, sender=Listing)
+def remove_listing_from_search(sender, instance, **kwargs):
+    backend = get_search_backend()
+    if backend is not None:
+        backend.remove(instance.pk)
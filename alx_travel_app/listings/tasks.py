@@ -1,6 +1,13 @@
 from celery import shared_task
+from django.conf import settings
+from django.core import mail
+from django.db import transaction
+from django.utils import timezone
 import logging
 
+from . import analytics, exports
+from .models import Booking, ExportJob
+
 logger = logging.getLogger(__name__)
 
 @shared_task
@@ -23,20 +30,119 @@ def example_task(param):
     return f"Task completed with parameter: {param}"
 
 
+@shared_task(bind=True, autoretry_for=(OSError,), retry_backoff=True, max_retries=5)
+def send_booking_confirmation(self, booking_ids):
+    """
+    Email the guests of ``booking_ids`` (an id or a list of ids) their confirmation.
+
+    Details come from one joined query and all messages go out over one
+    backend connection. Each booking is claimed by stamping
+    ``confirmation_sent_at`` in its own transaction around its message, so
+    a failed send un-stamps only that booking: retries resend from there,
+    and duplicate deliveries of the task skip what was already sent.
+    """
+    if isinstance(booking_ids, int):
+        booking_ids = [booking_ids]
+
+    bookings = list(
+        Booking.objects.filter(pk__in=booking_ids, confirmation_sent_at__isnull=True)
+        .select_related('listing', 'listing__host', 'guest')
+        .order_by('pk')
+    )
+    bookings = [booking for booking in bookings if booking.guest.email]
+    if not bookings:
+        return 0
+
+    sent = 0
+    with mail.get_connection() as connection:
+        for booking in bookings:
+            with transaction.atomic():
+                # The claim holds the row until the message is out; a
+                # concurrent task waits on it, then finds it stamped
+                claimed = Booking.objects.filter(pk=booking.pk, confirmation_sent_at__isnull=True).update(
+                    confirmation_sent_at=timezone.now()
+                )
+                if claimed:
+                    sent += connection.send_messages([_confirmation_message(booking)])
+    logger.info(f"Sent {sent} booking confirmation(s)")
+    return sent
+
+
 @shared_task
-def send_booking_confirmation(booking_id):
+def send_pending_confirmations():
     """
-    Send a confirmation email for a new booking.
-    
-    In a real application, this would connect to an email service
-    and send an actual email with booking details.
+    Periodic sweep for confirmations whose task was lost (broker down,
+    worker killed before acking). Enqueues them in batches.
     """
-    logger.info(f"Sending confirmation for booking {booking_id}")
-    # In a real application, you would:
-    # 1. Fetch booking details from the database
-    # 2. Generate email content with booking information
-    # 3. Send email using an email service
-    return f"Confirmation sent for booking {booking_id}"
+    now = timezone.now()
+    pending = Booking.objects.filter(
+        confirmation_sent_at__isnull=True,
+        created_at__gte=now - settings.LISTINGS_CONFIRMATION_SWEEP_WINDOW,
+        created_at__lt=now - settings.LISTINGS_CONFIRMATION_SWEEP_GRACE,
+    ).order_by('pk').values_list('pk', flat=True)
+
+    batch_size = settings.LISTINGS_CONFIRMATION_BATCH_SIZE
+    ids = list(pending)
+    for start in range(0, len(ids), batch_size):
+        send_booking_confirmation.delay(ids[start:start + batch_size])
+    return len(ids)
+
+
+def _confirmation_message(booking):
+    listing = booking.listing
+    nights = (booking.check_out - booking.check_in).days
+    body = (
+        f"Hi {booking.guest.first_name or booking.guest.username},\n\n"
+        f"Thank you for booking {listing.title} in {listing.city}, {listing.country}.\n\n"
+        f"Check-in: {booking.check_in:%A %d %B %Y}\n"
+        f"Check-out: {booking.check_out:%A %d %B %Y} ({nights} night{'s' if nights != 1 else ''})\n"
+        f"Guests: {booking.number_of_guests}\n"
+        f"Total: {booking.total_price}\n"
+        f"Status: {booking.get_status_display()}\n\n"
+        f"Your host is {listing.host.get_full_name() or listing.host.username}.\n"
+    )
+    return mail.EmailMessage(
+        subject=f"Your booking at {listing.title}",
+        body=body,
+        to=[booking.guest.email],
+        # Stable id so a provider can drop a resend after a worker crash
+        headers={'Message-ID': f'<booking-{booking.pk}-confirmation@{settings.LISTINGS_EMAIL_DOMAIN}>'},
+    )
+
+
+@shared_task
+def refresh_listing_stats(full=False):
+    """
+    Fold booking and review changes since the last run into the monthly
+    listing rollup; see listings.analytics.
+    """
+    written = analytics.refresh_listing_stats(full=full)
+    logger.info(f"Refreshed {written} listing-month(s) of stats")
+    return written
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True,
+             autoretry_for=(OSError,), retry_backoff=True, max_retries=5)
+def export_bookings(self, job_id):
+    """
+    Write the gzip NDJSON chunks of an ExportJob, carrying on from its last chunk.
+
+    Acknowledged only once done, so a job whose worker died is delivered
+    again and resumes. Progress goes to the result backend as PROGRESS
+    state with ``rows``/``total``/``chunks``. OSErrors are retried; the job
+    is marked FAILED once they run out of retries, other errors at once.
+    """
+    def report(**progress):
+        self.update_state(state='PROGRESS', meta=progress)
+
+    try:
+        rows = exports.write_export(job_id, report)
+    except Exception as exc:
+        if not isinstance(exc, OSError) or self.request.retries >= self.max_retries:
+            ExportJob.objects.filter(pk=job_id).update(status='FAILED', error=str(exc), updated_at=timezone.now())
+        raise
+    logger.info(f"Export job {job_id} wrote {rows} booking(s)")
+    return {'rows': rows}
 
 
 @shared_task
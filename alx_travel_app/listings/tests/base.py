@@ -0,0 +1,29 @@
+from django.core.cache import caches
+from django import test
+
+from alx_travel_app.celery import app as celery_app
+
+# Run tasks inline (there is no broker under test); mail goes to the
+# locmem backend the test runner installs.
+celery_app.conf.task_always_eager = True
+
+
+class CacheResetMixin:
+    """
+    Start every test with empty caches.
+
+    Cached responses and counters would otherwise outlive the rolled back
+    rows they were built from and leak into the next test.
+    """
+    def _pre_setup(self):
+        super()._pre_setup()
+        for cache in caches.all():
+            cache.clear()
+
+
+class TestCase(CacheResetMixin, test.TestCase):
+    pass
+
+
+class TransactionTestCase(CacheResetMixin, test.TransactionTestCase):
+    pass
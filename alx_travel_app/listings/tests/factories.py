@@ -0,0 +1,77 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import count
+
+from django.contrib.auth import get_user_model
+
+from ..models import Listing, Booking, Review
+
+User = get_user_model()
+
+_sequence = count(1)
+
+
+def make_user(**kwargs):
+    n = next(_sequence)
+    defaults = {
+        'username': f'user{n}',
+        'email': f'user{n}@example.com',
+        'password': 'password123',
+    }
+    defaults.update(kwargs)
+    return User.objects.create_user(**defaults)
+
+
+def listing_kwargs(host, **kwargs):
+    n = next(_sequence)
+    defaults = {
+        'title': f'Listing {n}',
+        'description': 'A cosy place to stay.',
+        'host': host,
+        'property_type': 'APARTMENT',
+        'price_per_night': Decimal('100.00'),
+        'bedrooms': 2,
+        'bathrooms': 1,
+        'max_guests': 4,
+        'address': f'{n} Main Street',
+        'city': 'Nairobi',
+        'country': 'Kenya',
+    }
+    defaults.update(kwargs)
+    return defaults
+
+
+def make_listing(host=None, **kwargs):
+    return Listing.objects.create(**listing_kwargs(host or make_user(), **kwargs))
+
+
+def make_listings(host, n, **kwargs):
+    return Listing.objects.bulk_create(
+        Listing(**listing_kwargs(host, **kwargs)) for _ in range(n)
+    )
+
+
+def make_booking(listing, guest=None, check_in=None, nights=3, **kwargs):
+    check_in = check_in or date.today() + timedelta(days=10)
+    check_out = check_in + timedelta(days=nights)
+    defaults = {
+        'listing': listing,
+        'guest': guest or make_user(),
+        'check_in': check_in,
+        'check_out': check_out,
+        'total_price': nights * listing.price_per_night,
+        'status': 'CONFIRMED',
+        'number_of_guests': 1,
+    }
+    defaults.update(kwargs)
+    return Booking.objects.create(**defaults)
+
+
+def make_review(booking, rating=5, **kwargs):
+    return Review.objects.create(
+        listing=booking.listing,
+        booking=booking,
+        reviewer=booking.guest,
+        rating=rating,
+        **kwargs
+    )
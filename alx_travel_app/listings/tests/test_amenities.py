@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings, skipUnlessDBFeature
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .. import amenities
+from ..models import Listing
+from .base import TestCase
+from .factories import make_user, make_listing
+
+
+class AmenityMaskTests(SimpleTestCase):
+    def test_mask_from_flags_or_names(self):
+        self.assertEqual(amenities.mask_for({'wifi': True, 'pool': False, 'tv': True}), 0b100001)
+        self.assertEqual(amenities.mask_for(['wifi', 'tv', 'sauna']), 0b100001)
+        self.assertEqual(amenities.mask_for(None), 0)
+
+    def test_matching_masks(self):
+        wifi_pool = amenities.mask_for(['wifi', 'pool'])
+        every = amenities.matching_masks(wifi_pool, 'all')
+        self.assertEqual(len(every), 16)
+        self.assertTrue(all(mask & wifi_pool == wifi_pool for mask in every))
+        some = amenities.matching_masks(wifi_pool, 'any')
+        self.assertEqual(some, [mask for mask in range(64) if mask & wifi_pool])
+
+
+@override_settings(LISTINGS_CACHE_TIMEOUT=0)
+class AmenityFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        host = make_user()
+        cls.both = make_listing(host, amenities={'wifi': True, 'pool': True, 'tv': False})
+        cls.wifi = make_listing(host, amenities={'wifi': True, 'pool': False})
+        cls.pool = make_listing(host, amenities=['pool', 'kitchen'])
+        cls.none = make_listing(host, amenities={})
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('listings:listing-list')
+
+    def _ids(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return {row['id'] for row in response.data['results']}
+
+    def test_all_of(self):
+        self.assertEqual(self._ids(amenities='wifi,pool'), {self.both.pk})
+        self.assertEqual(self._ids(amenities='wifi'), {self.both.pk, self.wifi.pk})
+
+    def test_any_of(self):
+        self.assertEqual(
+            self._ids(amenities='wifi, pool', amenities_match='any'),
+            {self.both.pk, self.wifi.pk, self.pool.pk},
+        )
+
+    def test_bitwise_fallback_matches(self):
+        with mock.patch.object(amenities, 'MAX_MASK_VALUES', 0):
+            self.assertEqual(self._ids(amenities='wifi,pool'), {self.both.pk})
+            self.assertEqual(self._ids(amenities='kitchen,tv', amenities_match='any'), {self.pool.pk})
+
+    def test_unknown_amenity_is_rejected(self):
+        response = self.client.get(self.url, {'amenities': 'wifi,sauna'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('sauna', str(response.data['amenities']))
+        self.assertEqual(self.client.get(self.url, {'amenities': ','}).status_code, 400)
+
+    def test_mask_follows_saves(self):
+        listing = Listing.objects.get(pk=self.none.pk)
+        listing.amenities = {'tv': True}
+        listing.save(update_fields=['amenities'])
+        self.assertEqual(Listing.objects.get(pk=listing.pk).amenity_mask, amenities.BITS['tv'])
+
+    @skipUnlessDBFeature('supports_explaining_query_execution')
+    def test_lookup_uses_the_mask_index(self):
+        index = next(index.name for index in Listing._meta.indexes if index.fields == ['amenity_mask'])
+        for match in ('all', 'any'):
+            self.assertIn(index, Listing.objects.with_amenities(['wifi', 'pool'], match).explain())
@@ -0,0 +1,195 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .. import analytics
+from ..models import Booking, Listing, ListingMonthlyStats, RollupWatermark, StaleListingMonth
+from ..tasks import refresh_listing_stats
+from .base import TestCase
+from .factories import make_user, make_listing, make_booking, make_review
+
+
+class SplitStayTests(SimpleTestCase):
+    def test_stay_across_months_is_split_by_night(self):
+        parts = list(analytics.split_stay(date(2026, 1, 30), date(2026, 2, 3), Decimal('100.00')))
+        self.assertEqual(parts, [
+            (date(2026, 1, 1), 2, Decimal('50.00')),
+            (date(2026, 2, 1), 2, Decimal('50.00')),
+        ])
+
+    def test_rounding_leftover_goes_to_last_month(self):
+        parts = list(analytics.split_stay(date(2026, 1, 31), date(2026, 2, 3), Decimal('100.00')))
+        self.assertEqual([revenue for _, _, revenue in parts], [Decimal('33.33'), Decimal('66.67')])
+
+    def test_month_helpers(self):
+        self.assertEqual(analytics.months_before(date(2026, 3, 1), 3), date(2025, 12, 1))
+        self.assertEqual(analytics.days_in_month(date(2028, 2, 1)), 29)
+
+
+@override_settings(LISTINGS_STATS_LAG=timedelta(0))
+class ListingStatsRollupTests(TestCase):
+    def setUp(self):
+        self.host = make_user()
+        self.listing = make_listing(self.host, price_per_night=Decimal('100'))
+        self.other = make_listing(self.host, price_per_night=Decimal('100'))
+        self.march = date(2026, 3, 1)
+
+    def _stats(self, listing=None):
+        return {
+            row.month: row for row in ListingMonthlyStats.objects.filter(listing=listing or self.listing)
+        }
+
+    def _book(self, listing, check_in, nights, status='CONFIRMED'):
+        return make_booking(listing, check_in=check_in, nights=nights, status=status)
+
+    @staticmethod
+    def _long_ago():
+        return timezone.now() - timedelta(days=365)
+
+    def test_rollup_counts_confirmed_and_completed_stays(self):
+        self._book(self.listing, date(2026, 3, 30), 4)
+        self._book(self.listing, date(2026, 3, 10), 2, status='COMPLETED')
+        self._book(self.listing, date(2026, 3, 20), 2, status='PENDING')
+        self._book(self.listing, date(2026, 3, 24), 2, status='CANCELLED')
+        refresh_listing_stats()
+
+        stats = self._stats()
+        self.assertEqual(stats[self.march].booked_nights, 4)
+        self.assertEqual(stats[self.march].revenue, Decimal('400.00'))
+        self.assertEqual(stats[self.march].bookings, 2)
+        self.assertEqual(stats[date(2026, 4, 1)].booked_nights, 2)
+        self.assertEqual(stats[date(2026, 4, 1)].bookings, 0)
+
+    def test_incremental_run_only_revisits_changed_listings(self):
+        booking = self._book(self.listing, date(2026, 3, 10), 2)
+        self._book(self.other, date(2026, 3, 10), 3)
+        refresh_listing_stats()
+        untouched = self._stats(self.other)[self.march].updated_at
+
+        booking.status = 'CANCELLED'
+        booking.save()
+        self.assertEqual(refresh_listing_stats(), 1)
+        self.assertEqual(self._stats(), {})
+        self.assertEqual(self._stats(self.other)[self.march].updated_at, untouched)
+        self.assertEqual(refresh_listing_stats(), 0)
+
+    def test_incremental_run_replaces_changed_months_without_upserts(self):
+        self._book(self.listing, date(2026, 3, 10), 2)
+        refresh_listing_stats()
+        self._book(self.listing, date(2026, 3, 20), 3)
+        with CaptureQueriesContext(connection) as ctx:
+            refresh_listing_stats()
+        # ON CONFLICT ... (target) is unavailable on MySQL
+        self.assertFalse(any('ON CONFLICT' in query['sql'].upper() for query in ctx.captured_queries))
+        self.assertEqual(self._stats()[self.march].booked_nights, 5)
+        self.assertEqual(ListingMonthlyStats.objects.filter(listing=self.listing).count(), 1)
+
+    def test_reviews_roll_up_by_month_written(self):
+        for rating in (5, 2):
+            make_review(self._book(self.listing, date(2026, 1, 1), 2, status='COMPLETED'), rating=rating)
+        refresh_listing_stats()
+
+        this_month = timezone.localdate().replace(day=1)
+        row = self._stats()[this_month]
+        self.assertEqual((row.review_count, row.rating_total), (2, 7))
+
+    def test_incremental_run_drops_deleted_bookings_and_reviews(self):
+        booking = self._book(self.listing, date(2026, 3, 10), 2, status='COMPLETED')
+        make_review(booking)
+        refresh_listing_stats()
+        self.assertEqual(len(self._stats()), 2)
+
+        Booking.objects.filter(pk=booking.pk).delete()
+        self.assertEqual(refresh_listing_stats(), 2)
+        self.assertEqual(self._stats(), {})
+        self.assertFalse(StaleListingMonth.objects.exists())
+
+    def test_incremental_run_clears_months_a_stay_moved_out_of(self):
+        booking = self._book(self.listing, date(2026, 3, 10), 2)
+        refresh_listing_stats()
+        booking.listing, booking.check_in, booking.check_out = self.other, date(2026, 5, 10), date(2026, 5, 12)
+        booking.save()
+        refresh_listing_stats()
+        self.assertEqual(self._stats(), {})
+        self.assertEqual(self._stats(self.other)[date(2026, 5, 1)].booked_nights, 2)
+
+    def test_full_rebuild_catches_bulk_updates(self):
+        self._book(self.listing, date(2026, 3, 10), 2)
+        refresh_listing_stats()
+        # QuerySet.update() sends no signals, and the watermark has passed the new updated_at
+        Booking.objects.update(check_in=date(2026, 6, 10), check_out=date(2026, 6, 12), updated_at=self._long_ago())
+        refresh_listing_stats()
+        self.assertIn(self.march, self._stats())
+        refresh_listing_stats(full=True)
+        self.assertEqual(list(self._stats()), [date(2026, 6, 1)])
+
+    def test_watermark_advances(self):
+        refresh_listing_stats()
+        self.assertEqual(set(RollupWatermark.objects.values_list('name', flat=True)), {'bookings', 'reviews'})
+
+
+@override_settings(LISTINGS_STATS_LAG=timedelta(0))
+class ListingStatsEndpointTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.host = make_user()
+        self.first = make_listing(self.host)
+        self.second = make_listing(self.host)
+        make_booking(self.first, check_in=date(2026, 3, 1), nights=31, total_price=Decimal('3100'))
+        make_booking(self.second, check_in=date(2026, 3, 1), nights=10, total_price=Decimal('1000'))
+        refresh_listing_stats()
+        self.client.force_authenticate(self.host)
+
+    def test_listing_stats(self):
+        url = reverse('listings:listing-stats', args=[self.first.pk])
+        response = self.client.get(url, {'from': '2026-02', 'to': '2026-03'})
+        self.assertEqual(response.status_code, 200, response.data)
+        february, march = response.data['months']
+        self.assertEqual((february['month'], february['occupancy_rate'], february['average_rating']),
+                         ('2026-02', 0.0, None))
+        self.assertEqual((march['booked_nights'], march['occupancy_rate']), (31, 1.0))
+        self.assertEqual(response.data['totals']['revenue'], Decimal('3100.00'))
+        self.assertIsNotNone(response.data['refreshed_at'])
+
+    def test_host_summary(self):
+        response = self.client.get(reverse('listings:listing-host-stats'), {'from': '2026-03', 'to': '2026-03'})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['listings'], 2)
+        march = response.data['months'][0]
+        self.assertEqual((march['booked_nights'], march['available_nights']), (41, 62))
+        self.assertEqual(march['revenue'], Decimal('4100.00'))
+
+    def test_capacity_counts_listings_from_the_day_they_opened(self):
+        # No stays, opened halfway through March
+        opened_mid_march = make_listing(self.host)
+        Listing.objects.filter(pk=opened_mid_march.pk).update(created_at=timezone.make_aware(datetime(2026, 3, 17)))
+        make_listing(self.host)  # Opened today: no capacity in March
+        response = self.client.get(reverse('listings:listing-host-stats'), {'from': '2026-02', 'to': '2026-03'})
+        self.assertEqual(response.data['listings'], 4)
+        february, march = response.data['months']
+        self.assertEqual(february['available_nights'], 0)
+        # first and second count from their first stay's month, the others from creation
+        self.assertEqual((march['booked_nights'], march['available_nights']), (41, 31 + 31 + 15))
+
+    def test_only_host_or_staff(self):
+        url = reverse('listings:listing-stats', args=[self.first.pk])
+        self.client.force_authenticate(make_user())
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_authenticate(make_user(is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.get(reverse('listings:listing-host-stats'), {'host': self.host.pk})
+        self.assertEqual(response.data['listings'], 2)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_window_validation(self):
+        url = reverse('listings:listing-stats', args=[self.first.pk])
+        self.assertEqual(len(self.client.get(url).data['months']), 12)
+        self.assertEqual(self.client.get(url, {'from': '2026-05', 'to': '2026-03'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'from': '2020-01', 'to': '2026-03'}).status_code, 400)
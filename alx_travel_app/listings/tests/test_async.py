@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .base import TestCase
+from .factories import make_user, make_listing, make_listings, make_booking
+
+
+class AsyncListingReadTests(TestCase):
+    def setUp(self):
+        self.host = make_user()
+        make_listings(self.host, 12)
+        self.listing = make_listing(self.host, city='Mombasa', max_guests=6)
+        make_booking(self.listing, check_in=date.today() + timedelta(days=10))
+        self.sync = APIClient()
+        self.client = AsyncClient()
+
+    def _both(self, name, params=None, args=()):
+        sync = self.sync.get(reverse(f'listings:{name}', args=args), params)
+        asynchronous = self.async_get(reverse(f'listings:{name}-async', args=args), params)
+        return sync, asynchronous
+
+    def async_get(self, url, params=None):
+        return async_to_sync(self.client.get)(url, params or {})
+
+    def assertSameResponse(self, sync, asynchronous):
+        self.assertEqual(asynchronous.status_code, sync.status_code)
+        self.assertEqual(asynchronous['Content-Type'], 'application/json')
+        # Paging links lead back to the endpoint that was called
+        content = asynchronous.content.decode().replace('/async/listings/', '/listings/')
+        self.assertJSONEqual(content, sync.content.decode())
+
+    @override_settings(LISTINGS_CACHE_TIMEOUT=0)
+    def test_list_matches_sync(self):
+        check_in = date.today() + timedelta(days=11)
+        for params in (
+            {},
+            {'page': 2},
+            {'page': 'last', 'ordering': 'price_per_night'},
+            {'cursor': ''},
+            {'cursor': '', 'count': 'true'},
+            {'city': 'Mombasa', 'min_guests': 5},
+            {'fields': 'id,title', 'expand': 'host'},
+            {'check_in': check_in.isoformat(), 'check_out': (check_in + timedelta(days=2)).isoformat()},
+        ):
+            with self.subTest(params=params):
+                self.assertSameResponse(*self._both('listing-list', params))
+
+    @override_settings(LISTINGS_CACHE_TIMEOUT=0)
+    def test_list_errors_match_sync(self):
+        for params in ({'page': 9}, {'check_in': 'soon'}, {'cursor': 'bogus'}, {'min_price': 'cheap'}):
+            with self.subTest(params=params):
+                sync, asynchronous = self._both('listing-list', params)
+                self.assertIn(sync.status_code, (400, 404))
+                self.assertSameResponse(sync, asynchronous)
+
+    @override_settings(LISTINGS_CACHE_TIMEOUT=0)
+    def test_detail_matches_sync(self):
+        check_in = date.today() + timedelta(days=11)
+        dates = {'check_in': check_in.isoformat(), 'check_out': (check_in + timedelta(days=2)).isoformat()}
+        for params in ({}, dates):
+            with self.subTest(params=params):
+                self.assertSameResponse(*self._both('listing-detail', params, args=[self.listing.pk]))
+        for pk in (999999, 'abc'):
+            with self.subTest(pk=pk):
+                self.assertSameResponse(*self._both('listing-detail', args=[pk]))
+
+    def test_cached_until_a_write(self):
+        urls = [reverse('listings:listing-list-async'), reverse('listings:listing-detail-async', args=[self.listing.pk])]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.async_get(url)['X-Cache'], 'MISS')
+                self.assertEqual(self.async_get(url)['X-Cache'], 'HIT')
+                self.listing.save()
+                self.assertEqual(self.async_get(url)['X-Cache'], 'MISS')
+
+    @override_settings(LISTINGS_CACHE_TIMEOUT=0)
+    def test_profiled(self):
+        response = self.async_get(reverse('listings:listing-list-async'))
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="2 queries"')
+
+    def test_read_only(self):
+        response = async_to_sync(self.client.post)(reverse('listings:listing-list-async'), {})
+        self.assertEqual(response.status_code, 405)
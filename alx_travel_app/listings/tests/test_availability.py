@@ -0,0 +1,89 @@
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..models import Listing
+from .base import TestCase
+from .factories import make_user, make_listing, make_booking
+
+
+class ListingAvailabilitySearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user()
+        cls.check_in = date.today() + timedelta(days=30)
+        cls.check_out = cls.check_in + timedelta(days=3)
+
+        cls.free = make_listing(cls.host, max_guests=6)
+        cls.booked = make_listing(cls.host, max_guests=6)
+        cls.small = make_listing(cls.host, max_guests=2)
+        cls.cancelled = make_listing(cls.host, max_guests=6)
+        cls.adjacent = make_listing(cls.host, max_guests=6)
+
+        make_booking(cls.booked, check_in=cls.check_in + timedelta(days=1), nights=5)
+        make_booking(cls.cancelled, check_in=cls.check_in, status='CANCELLED')
+        # Checking out the day we check in does not overlap
+        make_booking(cls.adjacent, check_in=cls.check_in - timedelta(days=2), nights=2)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('listings:listing-list')
+
+    def _search(self, **params):
+        params.setdefault('check_in', self.check_in.isoformat())
+        params.setdefault('check_out', self.check_out.isoformat())
+        return self.client.get(self.url, params)
+
+    def test_excludes_booked_listings(self):
+        response = self._search()
+        self.assertEqual(response.status_code, 200)
+        ids = {item['id'] for item in response.data['results']}
+        self.assertEqual(ids, {self.free.id, self.small.id, self.cancelled.id, self.adjacent.id})
+        self.assertTrue(all(item['is_available'] for item in response.data['results']))
+
+    def test_respects_guest_capacity(self):
+        response = self._search(guests=4)
+        ids = {item['id'] for item in response.data['results']}
+        self.assertNotIn(self.small.id, ids)
+        self.assertIn(self.free.id, ids)
+
+    def test_availability_is_resolved_in_bulk(self):
+        for _ in range(20):
+            make_listing(self.host)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._search()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertIn('NOT EXISTS', ctx.captured_queries[-1]['sql'].upper())
+
+    def test_retrieve_annotates_without_excluding(self):
+        url = reverse('listings:listing-detail', args=[self.booked.pk])
+        response = self.client.get(url, {
+            'check_in': self.check_in.isoformat(),
+            'check_out': self.check_out.isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['is_available'])
+
+    def test_without_dates_is_available_is_null(self):
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['results'][0]['is_available'])
+
+    def test_invalid_ranges_are_rejected(self):
+        self.assertEqual(self._search(check_out=self.check_in.isoformat()).status_code, 400)
+        self.assertEqual(self._search(check_in='not-a-date').status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'guests': 2}).status_code, 400)
+
+    def test_queryset_available_matches_per_row_check(self):
+        available = set(
+            Listing.objects.available(self.check_in, self.check_out).values_list('pk', flat=True)
+        )
+        expected = {
+            listing.pk for listing in Listing.objects.all()
+            if not listing.bookings.overlapping(self.check_in, self.check_out).exists()
+        }
+        self.assertEqual(available, expected)
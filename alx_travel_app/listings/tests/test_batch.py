@@ -0,0 +1,154 @@
+from datetime import date, timedelta
+from unittest import mock
+
+from django.core import mail
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..models import Booking, ListingCalendar
+from .base import TestCase
+from .factories import make_user, make_listing, make_booking
+
+
+def item(listing, guest, check_in, nights=2, **kwargs):
+    return {
+        'listing': listing.pk,
+        'guest_id': guest.pk,
+        'check_in': check_in.isoformat(),
+        'check_out': (check_in + timedelta(days=nights)).isoformat(),
+        'number_of_guests': 1,
+        **kwargs,
+    }
+
+
+class BatchImportTests(TestCase):
+    def setUp(self):
+        self.listing = make_listing()
+        self.other = make_listing()
+        self.guest = make_user()
+        self.client = APIClient()
+        self.client.force_authenticate(make_user(is_staff=True))
+        self.url = reverse('listings:booking-batch-create')
+        self.day = date.today() + timedelta(days=10)
+
+    def _post(self, items):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, items, format='json')
+
+    def test_partial_failure(self):
+        make_booking(self.listing, check_in=self.day, nights=3)
+        items = [
+            item(self.listing, self.guest, self.day + timedelta(days=1)),   # overlaps existing
+            item(self.listing, self.guest, self.day + timedelta(days=5)),
+            item(self.listing, self.guest, self.day + timedelta(days=6)),   # overlaps item 1
+            item(self.other, self.guest, self.day, number_of_guests=9),
+            item(self.other, self.guest, self.day, nights=0),
+            {'listing': 0},
+            item(self.other, self.guest, self.day),
+        ]
+        response = self._post(items)
+
+        self.assertEqual(response.status_code, 207, response.data)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 5))
+        codes = [result['code'] for result in response.data['results']]
+        self.assertEqual(codes, [409, 201, 409, 400, 400, 400, 201])
+        self.assertEqual(list(response.data['results'][3]['errors']), ['number_of_guests'])
+        self.assertEqual(list(response.data['results'][4]['errors']), ['check_out'])
+
+        booking = Booking.objects.get(pk=response.data['results'][1]['id'])
+        self.assertEqual((booking.guest, booking.status), (self.guest, 'PENDING'))
+        self.assertEqual(booking.total_price, 2 * self.listing.price_per_night)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_all_created(self):
+        response = self._post([item(self.listing, self.guest, self.day), item(self.other, self.guest, self.day)])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+
+    def test_ids_without_returning_inserts(self):
+        # MySQL cannot return the pks of a bulk insert
+        make_booking(self.listing, check_in=self.day, nights=2, status='CANCELLED')
+        items = [item(self.listing, self.guest, self.day + timedelta(days=3 * i)) for i in range(3)]
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            response = self._post(items)
+        self.assertEqual(response.status_code, 201, response.data)
+        ids = [result['id'] for result in response.data['results']]
+        created = Booking.objects.filter(listing=self.listing, status='PENDING').order_by('check_in')
+        self.assertEqual(ids, list(created.values_list('pk', flat=True)))
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_unknown_listing_and_guest(self):
+        response = self._post([
+            {**item(self.listing, self.guest, self.day), 'listing': 999999},
+            {**item(self.listing, self.guest, self.day), 'guest_id': 999999},
+        ])
+        self.assertEqual([list(result['errors']) for result in response.data['results']], [['listing'], ['guest_id']])
+
+    def test_updates_calendar(self):
+        ListingCalendar.build(self.listing.pk)
+        self._post([item(self.listing, self.guest, self.day)])
+        calendar = ListingCalendar.objects.get(listing=self.listing)
+        self.assertEqual(calendar.occupancy.blocked_nights(self.day, self.day + timedelta(days=5)),
+                         [self.day, self.day + timedelta(days=1)])
+
+    def test_queries_do_not_grow_with_items(self):
+        def queries(n, start):
+            items = [item(self.listing, self.guest, start + timedelta(days=3 * i)) for i in range(n)]
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post(self.url, items, format='json')
+            return len(ctx.captured_queries)
+        self.assertEqual(queries(2, self.day), queries(20, self.day + timedelta(days=100)))
+
+    @override_settings(LISTINGS_BATCH_MAX_ITEMS=2)
+    def test_rejects_bad_payloads(self):
+        for payload in ({'listing': self.listing.pk}, [], [{}] * 3):
+            response = self.client.post(self.url, payload, format='json')
+            self.assertEqual(response.status_code, 400, payload)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(self.guest)
+        response = self.client.post(self.url, [item(self.listing, self.guest, self.day)], format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class BatchStatusTests(TestCase):
+    def setUp(self):
+        self.listing = make_listing()
+        self.day = date.today() + timedelta(days=10)
+        self.pending = make_booking(self.listing, check_in=self.day, status='PENDING')
+        self.confirmed = make_booking(self.listing, check_in=self.day + timedelta(days=5))
+        self.client = APIClient()
+        self.client.force_authenticate(make_user(is_staff=True))
+        self.url = reverse('listings:booking-batch-status')
+
+    def test_transitions_apply_in_order(self):
+        ListingCalendar.build(self.listing.pk)
+        before = self.confirmed.updated_at
+        response = self.client.patch(self.url, [
+            {'id': self.pending.pk, 'status': 'CONFIRMED'},
+            {'id': self.pending.pk, 'status': 'COMPLETED'},
+            {'id': self.confirmed.pk, 'status': 'PENDING'},
+            {'id': self.confirmed.pk, 'status': 'CANCELLED'},
+            {'id': 999999, 'status': 'CANCELLED'},
+            {'id': self.confirmed.pk, 'status': 'LOST'},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 207, response.data)
+        self.assertEqual([result['code'] for result in response.data['results']], [200, 200, 400, 200, 404, 400])
+        self.assertEqual(response.data['results'][2]['errors'],
+                         {'status': ['Cannot change status from CONFIRMED to PENDING']})
+        self.pending.refresh_from_db()
+        self.confirmed.refresh_from_db()
+        self.assertEqual((self.pending.status, self.confirmed.status), ('COMPLETED', 'CANCELLED'))
+        self.assertGreater(self.confirmed.updated_at, before)
+
+        calendar = ListingCalendar.objects.get(listing=self.listing)
+        self.assertEqual(calendar.occupancy.blocked_nights(self.day, self.day + timedelta(days=30)), [])
+
+    def test_all_updated(self):
+        response = self.client.patch(self.url, [{'id': self.pending.pk, 'status': 'CANCELLED'}], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['updated'], response.data['failed']), (1, 0))
@@ -0,0 +1,29 @@
+from django.test import SimpleTestCase
+
+from ..benchmarks.base import compare, summarize
+
+
+def result(case, p95_ms, queries=2, **extra):
+    return {'size': 1000, 'case': case, 'runs': 20, 'p95_ms': p95_ms, 'queries': queries, **extra}
+
+
+class BaselineCompareTests(SimpleTestCase):
+    def test_slowdown_past_threshold_regresses(self):
+        baseline = [result('list', 10.0), result('search', 10.0)]
+        regressions = compare([result('list', 11.5), result('search', 12.5)], baseline, threshold=0.2)
+        self.assertEqual(regressions, ['case=search size=1000: p95_ms 10.00ms -> 12.50ms'])
+
+    def test_small_absolute_changes_are_noise(self):
+        self.assertEqual(compare([result('list', 0.9)], [result('list', 0.3)], threshold=0.2), [])
+
+    def test_extra_queries_regress(self):
+        regressions = compare([result('list', 10.0, queries=3)], [result('list', 10.0)], threshold=0.2)
+        self.assertEqual(regressions, ['case=list size=1000: queries 2 -> 3'])
+
+    def test_unmatched_measurements_are_skipped(self):
+        baseline = [result('list', 10.0)]
+        self.assertEqual(compare([result('list', 50.0, threads=4), result('filter', 50.0)], baseline, 0.2), [])
+
+    def test_summarize_throughput(self):
+        self.assertEqual(summarize([0.01] * 10)['throughput_rps'], 100.0)
+        self.assertEqual(summarize([0.01] * 10, elapsed=0.05)['throughput_rps'], 200.0)
@@ -0,0 +1,133 @@
+import threading
+from datetime import date, timedelta
+from unittest import skipUnless
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..locks import listing_lock
+from ..models import Booking
+from .base import TestCase, TransactionTestCase
+from .factories import make_user, make_listing, make_booking
+
+
+def booking_payload(listing, guest, check_in, nights=3, **kwargs):
+    payload = {
+        'listing': listing.pk,
+        'guest_id': guest.pk,
+        'check_in': check_in.isoformat(),
+        'check_out': (check_in + timedelta(days=nights)).isoformat(),
+        'number_of_guests': 1,
+    }
+    payload.update(kwargs)
+    return payload
+
+
+class BookingCreateTests(TestCase):
+    def setUp(self):
+        self.listing = make_listing()
+        self.guest = make_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.guest)
+        self.url = reverse('listings:booking-list')
+        self.check_in = date.today() + timedelta(days=5)
+
+    def test_create_prices_booking(self):
+        response = self.client.post(self.url, booking_payload(self.listing, self.guest, self.check_in))
+        self.assertEqual(response.status_code, 201, response.data)
+        booking = Booking.objects.get(pk=response.data['id'])
+        self.assertEqual(booking.total_price, 3 * self.listing.price_per_night)
+        self.assertEqual(booking.guest, self.guest)
+
+    def test_overlapping_booking_is_rejected(self):
+        make_booking(self.listing, check_in=self.check_in + timedelta(days=1))
+        response = self.client.post(self.url, booking_payload(self.listing, self.guest, self.check_in))
+        self.assertEqual(response.status_code, 400)
+
+
+class ListingLockTests(TransactionTestCase):
+    """Each worker thread uses its own connection, like another process would."""
+
+    def setUp(self):
+        self.listing = make_listing()
+
+    def _contender(self, listing_id):
+        entered = threading.Event()
+
+        def lock():
+            try:
+                with listing_lock(listing_id):
+                    entered.set()
+            finally:
+                connection.close()
+        worker = threading.Thread(target=lock)
+        worker.start()
+        return worker, entered
+
+    def test_lock_statement_targets_only_the_listing_row(self):
+        with CaptureQueriesContext(connection) as queries:
+            with listing_lock(self.listing.pk):
+                pass
+        statements = [query['sql'] for query in queries if 'listings_listing' in query['sql']]
+        self.assertEqual(len(statements), 1)
+        column = f'{connection.ops.quote_name("listings_listing")}.{connection.ops.quote_name("id")}'
+        self.assertRegex(statements[0], rf'WHERE {column} = {self.listing.pk}( FOR UPDATE)?$')
+        self.assertEqual('FOR UPDATE' in statements[0], connection.features.has_select_for_update)
+
+    # Only row locks keep listings apart; SQLite's write lock serializes every writer
+    @skipUnless(connection.features.has_select_for_update, 'SQLite locks the whole database')
+    def test_unrelated_listings_do_not_block_each_other(self):
+        other = make_listing()
+        with listing_lock(self.listing.pk):
+            worker, entered = self._contender(other.pk)
+            self.assertTrue(entered.wait(timeout=5))
+        worker.join()
+
+    def test_same_listing_is_serialized(self):
+        with listing_lock(self.listing.pk):
+            worker, entered = self._contender(self.listing.pk)
+            self.assertFalse(entered.wait(timeout=0.2))
+        self.assertTrue(entered.wait(timeout=5))
+        worker.join()
+
+    def test_lock_is_held_until_the_outer_transaction_commits(self):
+        with transaction.atomic():
+            with listing_lock(self.listing.pk):
+                pass
+            worker, entered = self._contender(self.listing.pk)
+            self.assertFalse(entered.wait(timeout=0.2))
+        self.assertTrue(entered.wait(timeout=5))
+        worker.join()
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    threads = 8
+
+    def test_exactly_one_parallel_booking_wins(self):
+        listing = make_listing()
+        guests = [make_user() for _ in range(self.threads)]
+        check_in = date.today() + timedelta(days=5)
+        url = reverse('listings:booking-list')
+        barrier = threading.Barrier(self.threads)
+        statuses = []
+
+        def attempt(guest):
+            client = APIClient()
+            client.force_authenticate(guest)
+            try:
+                barrier.wait()
+                response = client.post(url, booking_payload(listing, guest, check_in))
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=attempt, args=(guest,)) for guest in guests]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(sorted(statuses), [201] + [400] * (self.threads - 1))
+        self.assertEqual(Booking.objects.filter(listing=listing).count(), 1)
@@ -0,0 +1,120 @@
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..cache import response_cache
+from .base import TestCase
+from .factories import make_user, make_listing, make_booking, make_review
+
+
+class ListingResponseCacheTests(TestCase):
+    def setUp(self):
+        self.host = make_user()
+        self.listing = make_listing(self.host)
+        self.client = APIClient()
+        self.list_url = reverse('listings:listing-list')
+        self.detail_url = reverse('listings:listing-detail', args=[self.listing.pk])
+
+    def _get(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_repeat_list_is_served_from_cache(self):
+        first, _ = self._get(self.list_url)
+        second, queries = self._get(self.list_url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(queries, 0)
+        self.assertEqual(first.data, second.data)
+
+    def test_key_ignores_parameter_order_but_not_page(self):
+        self._get(self.list_url, {'city': 'Nairobi', 'ordering': 'price_per_night'})
+        response, _ = self._get(self.list_url, {'ordering': 'price_per_night', 'city': 'Nairobi'})
+        self.assertEqual(response['X-Cache'], 'HIT')
+        response = self.client.get(self.list_url, {'city': 'Nairobi', 'ordering': 'price_per_night', 'page': 2})
+        self.assertEqual(response.status_code, 404)
+        response, _ = self._get(self.list_url, {'city': 'Kigali'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_listing_write_invalidates_list_and_detail(self):
+        self._get(self.list_url)
+        self._get(self.detail_url)
+        self.listing.title = 'Renamed'
+        self.listing.save()
+
+        response, _ = self._get(self.detail_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['title'], 'Renamed')
+        response, _ = self._get(self.list_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_soft_delete_invalidates(self):
+        self._get(self.list_url)
+        admin = make_user(is_staff=True)
+        self.client.force_authenticate(admin)
+        self.assertEqual(self.client.delete(self.detail_url).status_code, 204)
+        self.client.force_authenticate(None)
+
+        response, _ = self._get(self.list_url)
+        self.assertEqual(response.data['count'], 0)
+        self.assertEqual(self.client.get(self.detail_url).status_code, 404)
+
+    def test_review_write_invalidates_rating(self):
+        self._get(self.detail_url)
+        make_review(make_booking(self.listing, status='COMPLETED'), rating=4)
+        response, _ = self._get(self.detail_url)
+        self.assertEqual(response.data['average_rating'], 4.0)
+
+    def test_booking_write_only_retires_availability_lists(self):
+        check_in = date.today() + timedelta(days=10)
+        dates = {'check_in': check_in.isoformat(), 'check_out': (check_in + timedelta(days=2)).isoformat()}
+        other = make_listing(self.host)
+        self._get(self.list_url)
+        self._get(self.list_url, dates)
+        self._get(reverse('listings:listing-detail', args=[other.pk]))
+
+        make_booking(self.listing, check_in=check_in)
+
+        response, _ = self._get(self.list_url, dates)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([item['id'] for item in response.data['results']], [other.pk])
+        self.assertEqual(self._get(self.list_url)[0]['X-Cache'], 'HIT')
+        self.assertEqual(
+            self._get(reverse('listings:listing-detail', args=[other.pk]))[0]['X-Cache'], 'HIT'
+        )
+
+    def test_invalidation_repeats_on_commit(self):
+        self._get(self.detail_url)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.listing.save()
+        self._get(self.detail_url)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._get(self.detail_url)[0]['X-Cache'], 'MISS')
+
+    def test_stats_endpoint_is_staff_only(self):
+        response_cache.reset_stats()
+        self._get(self.list_url)
+        self._get(self.list_url)
+        stats_url = reverse('listings:listing-cache-stats')
+        self.assertEqual(self.client.get(stats_url).status_code, 403)
+
+        self.client.force_authenticate(make_user(is_staff=True))
+        response = self.client.get(stats_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['hits'], 1)
+        self.assertEqual(response.data['misses'], 1)
+        self.assertEqual(response.data['hit_ratio'], 0.5)
+
+    @override_settings(LISTINGS_CACHE_TIMEOUT=0)
+    def test_timeout_zero_disables_cache(self):
+        self._get(self.list_url)
+        response, queries = self._get(self.list_url)
+        self.assertNotIn('X-Cache', response)
+        self.assertGreater(queries, 0)
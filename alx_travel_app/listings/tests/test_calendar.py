@@ -0,0 +1,143 @@
+import threading
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..calendar import Occupancy, rebuild_calendars
+from ..locks import listing_lock
+from ..models import Booking, ListingCalendar
+from .base import TestCase, TransactionTestCase
+from .factories import make_user, make_listing, make_booking
+
+
+def nights(first, count):
+    return [first + timedelta(days=i) for i in range(count)]
+
+
+class OccupancyTests(SimpleTestCase):
+    def test_fill_and_read_back(self):
+        start = date(2026, 1, 10)
+        occupancy = Occupancy.from_stays([(start, start + timedelta(days=3))])
+        occupancy.fill(start - timedelta(days=5), start - timedelta(days=3), True)
+        occupancy.fill(start + timedelta(days=1), start + timedelta(days=2), False)
+
+        self.assertEqual(
+            occupancy.blocked_nights(date(2026, 1, 1), date(2026, 2, 1)),
+            nights(start - timedelta(days=5), 2) + [start, start + timedelta(days=2)],
+        )
+        self.assertEqual(occupancy.blocked_nights(start + timedelta(days=2), start + timedelta(days=2)), [])
+
+    def test_round_trips_through_bytes(self):
+        start = date(2026, 3, 1)
+        occupancy = Occupancy.from_stays([(start, start + timedelta(days=40))])
+        copy = Occupancy.from_bytes(occupancy.start_date, occupancy.to_bytes())
+        self.assertEqual(copy.blocked_nights(start, start + timedelta(days=60)), nights(start, 40))
+        self.assertEqual(len(occupancy.to_bytes()), 5)
+
+
+class ListingCalendarTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = make_user(is_staff=True)
+        self.listing = make_listing()
+        self.start = date.today() + timedelta(days=10)
+        self.url = reverse('listings:listing-calendar', args=[self.listing.pk])
+
+    def _blocked(self, **params):
+        params.setdefault('from', self.start.isoformat())
+        params.setdefault('to', (self.start + timedelta(days=30)).isoformat())
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['blocked']
+
+    def _update_status(self, booking, status):
+        self.client.force_authenticate(self.staff)
+        url = reverse('listings:booking-update-status', args=[booking.pk])
+        response = self.client.patch(url, {'status': status}, format='json')
+        self.client.force_authenticate(None)
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def test_built_on_first_read_then_patched_by_bookings(self):
+        make_booking(self.listing, check_in=self.start, nights=2)
+        self.assertFalse(ListingCalendar.objects.exists())
+        self.assertEqual(self._blocked(), nights(self.start, 2))
+
+        later = self.start + timedelta(days=5)
+        make_booking(self.listing, check_in=later, nights=3, status='PENDING')
+        self.assertEqual(self._blocked(), nights(self.start, 2) + nights(later, 3))
+
+    def test_status_changes_free_and_keep_nights(self):
+        self._blocked()
+        pending = make_booking(self.listing, check_in=self.start, nights=2, status='PENDING')
+        confirmed = make_booking(self.listing, check_in=self.start + timedelta(days=2), nights=2)
+
+        self._update_status(pending, 'CONFIRMED')
+        self.assertEqual(self._blocked(), nights(self.start, 4))
+        self._update_status(confirmed, 'CANCELLED')
+        self.assertEqual(self._blocked(), nights(self.start, 2))
+        self._update_status(pending, 'COMPLETED')
+        self.assertEqual(self._blocked(), [])
+
+    def test_cancelling_keeps_overlapping_legacy_booking(self):
+        first = make_booking(self.listing, check_in=self.start, nights=4)
+        self._blocked()
+        # Written around the serializer, as old data may be
+        make_booking(self.listing, check_in=self.start + timedelta(days=2), nights=4)
+        Booking.objects.get(pk=first.pk).delete()
+        self.assertEqual(self._blocked(), nights(self.start + timedelta(days=2), 4))
+
+    def test_reads_do_not_touch_bookings(self):
+        make_booking(self.listing, check_in=self.start, nights=2)
+        self._blocked()
+        with CaptureQueriesContext(connection) as queries:
+            self._blocked()
+        self.assertEqual(len(queries), 2)
+        self.assertFalse([q for q in queries if 'listings_booking' in q['sql']])
+
+    def test_window_is_clipped_and_validated(self):
+        make_booking(self.listing, check_in=self.start, nights=4)
+        self.assertEqual(
+            self._blocked(**{'from': (self.start + timedelta(days=3)).isoformat()}),
+            [self.start + timedelta(days=3)],
+        )
+        self.assertEqual(self.client.get(self.url, {'from': '2026-05-01', 'to': '2026-05-01'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'from': '2026-01-01', 'to': '2030-01-01'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'from': 'soon'}).status_code, 400)
+
+    def test_inactive_listing_is_not_found(self):
+        self.listing.is_active = False
+        self.listing.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_rebuild_matches_incremental(self):
+        make_booking(self.listing, check_in=self.start, nights=2)
+        make_booking(self.listing, check_in=self.start + timedelta(days=3), nights=2, status='CANCELLED')
+        incremental = self._blocked()
+        rebuild_calendars([self.listing.pk])
+        self.assertEqual(self._blocked(), incremental)
+
+
+class CalendarBuildRaceTests(TransactionTestCase):
+    def test_build_waits_for_booking_in_flight(self):
+        listing = make_listing()
+        check_in = date.today() + timedelta(days=10)
+
+        def first_read():
+            try:
+                ListingCalendar.build(listing.pk)
+            finally:
+                connection.close()
+
+        with listing_lock(listing.pk):
+            make_booking(listing, check_in=check_in, nights=2)
+            reader = threading.Thread(target=first_read)
+            reader.start()
+            reader.join(timeout=0.2)
+        reader.join()
+
+        calendar = ListingCalendar.objects.get(listing=listing)
+        self.assertEqual(calendar.occupancy.blocked_nights(check_in, check_in + timedelta(days=5)), nights(check_in, 2))
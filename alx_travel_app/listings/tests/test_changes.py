@@ -0,0 +1,100 @@
+from datetime import date, timedelta
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import Listing
+from .base import TestCase
+from .factories import make_user, make_listing, make_listings, make_booking
+
+
+@override_settings(LISTINGS_SYNC_LAG=timedelta(0), LISTINGS_SYNC_PAGE_SIZE=2)
+class ListingChangesTests(TestCase):
+    def setUp(self):
+        self.host = make_user()
+        make_listings(self.host, 4)
+        self.inactive = make_listing(self.host, is_active=False)
+        # Ties on updated_at: only the id keeps the order stable
+        earlier = timezone.now() - timedelta(minutes=5)
+        Listing.objects.update(updated_at=earlier)
+        self.ids = list(Listing.objects.order_by('id').values_list('id', flat=True))
+        self.client = APIClient()
+        self.url = reverse('listings:listing-changes')
+
+    def _sync(self, since=''):
+        """Follow the feed to its end; returns the changed ids and the cursor to keep."""
+        ids = []
+        while True:
+            response = self.client.get(self.url, {'since': since})
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.data['results'])
+            since = response.data['next']
+            if not response.data['has_more']:
+                return ids, since
+
+    def test_initial_sync_includes_inactive(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual([row['id'] for row in response.data['results']], self.ids[:2])
+        self.assertTrue(response.data['has_more'])
+
+        ids, _ = self._sync()
+        self.assertEqual(ids, self.ids)
+
+    def test_only_changes_after_cursor(self):
+        _, since = self._sync()
+        self.assertEqual(self.client.get(self.url, {'since': since}).data, {'results': [], 'next': since, 'has_more': False})
+
+        listing = Listing.objects.get(pk=self.ids[1])
+        listing.title = 'Renamed'
+        listing.save()
+        staff = make_user(is_staff=True)
+        self.client.force_authenticate(staff)
+        self.client.delete(reverse('listings:listing-detail', args=[self.ids[0]]))
+        created = make_listing(self.host)
+
+        response = self.client.get(self.url, {'since': since, 'fields': 'id,is_active'})
+        self.assertEqual(response.data['results'], [
+            {'id': self.ids[1], 'is_active': True}, {'id': self.ids[0], 'is_active': False},
+        ])
+        ids, _ = self._sync(since)
+        self.assertEqual(ids, [self.ids[1], self.ids[0], created.pk])
+
+    @override_settings(LISTINGS_SYNC_LAG=timedelta(seconds=5))
+    def test_recent_changes_are_held_back(self):
+        _, since = self._sync()
+        make_listing(self.host)
+        self.assertEqual(self._sync(since)[0], [])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'since': 'garbage'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('since', response.data)
+
+
+@override_settings(LISTINGS_SYNC_LAG=timedelta(0))
+class BookingChangesTests(TestCase):
+    def test_guests_see_their_own_bookings(self):
+        listing = make_listing()
+        guest, other = make_user(), make_user()
+        day = date.today() + timedelta(days=10)
+        mine = make_booking(listing, guest, check_in=day)
+        make_booking(listing, other, check_in=day + timedelta(days=5))
+
+        client = APIClient()
+        url = reverse('listings:booking-changes')
+        self.assertEqual(client.get(url).status_code, 403)
+        client.force_authenticate(guest)
+        response = client.get(url)
+        self.assertEqual([row['id'] for row in response.data['results']], [mine.pk])
+        self.assertEqual(client.get(url, {'since': response.data['next']}).data['results'], [])
+
+        mine.status = 'CANCELLED'
+        mine.save()
+        rows = client.get(url, {'since': response.data['next']}).data['results']
+        self.assertEqual([(row['id'], row['status']) for row in rows], [(mine.pk, 'CANCELLED')])
+
+        client.force_authenticate(make_user(is_staff=True))
+        self.assertEqual(len(client.get(url).data['results']), 2)
@@ -0,0 +1,99 @@
+from datetime import date, timedelta
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..fast_serializers import FastListingSerializer
+from ..serializers import ListingSerializer
+from .base import TestCase
+from .factories import make_user, make_listing
+
+
+@override_settings(LISTINGS_CACHE_TIMEOUT=0)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        host = make_user()
+        self.listing = make_listing(host)
+        self.other = make_listing(host, city='Mombasa')
+        self.client = APIClient()
+        self.url = reverse('listings:listing-list')
+        self.detail_url = reverse('listings:listing-detail', args=[self.listing.pk])
+
+    def test_list_not_modified(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertIn('Last-Modified', response)
+
+        with mock.patch.object(FastListingSerializer, 'serialize_many') as serialize, self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        serialize.assert_not_called()
+
+        # Other filters, pages or formats are other representations
+        self.assertEqual(self.client.get(self.url, {'city': 'Mombasa'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_changes(self):
+        etag = self.client.get(self.url)['ETag']
+        self.other.title = 'Renamed'
+        self.other.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # Deactivating a listing leaves max(updated_at) of the list as it was; the count moves
+        etag = response['ETag']
+        self.client.force_authenticate(make_user(is_staff=True))
+        self.client.delete(reverse('listings:listing-detail', args=[self.other.pk]))
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_ignores_if_modified_since(self):
+        response = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_not_modified(self):
+        response = self.client.get(self.detail_url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        with mock.patch.object(ListingSerializer, 'to_representation') as serialize, self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        serialize.assert_not_called()
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        self.listing.price_per_night = 120
+        self.listing.save()
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_availability_search_is_not_conditional(self):
+        check_in = date.today() + timedelta(days=10)
+        params = {'check_in': check_in, 'check_out': check_in + timedelta(days=2)}
+        self.assertNotIn('ETag', self.client.get(self.url, params))
+        self.assertNotIn('ETag', self.client.get(self.detail_url, params))
+
+    def test_unknown_listing(self):
+        response = self.client.get(reverse('listings:listing-detail', args=[0]), HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+
+
+class CachedConditionalGetTests(TestCase):
+    def test_cache_hit_needs_no_query(self):
+        make_listing()
+        client = APIClient()
+        url = reverse('listings:listing-list')
+        etag = client.get(url)['ETag']
+
+        with self.assertNumQueries(0):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.assertNumQueries(0):
+            response = client.get(url)
+        self.assertEqual((response['X-Cache'], response['ETag']), ('HIT', etag))
+
+        make_listing()
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
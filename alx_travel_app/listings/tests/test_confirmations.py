@@ -0,0 +1,124 @@
+from datetime import date, timedelta
+from unittest import mock
+
+from celery.exceptions import Retry
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import Booking
+from ..tasks import send_booking_confirmation, send_pending_confirmations
+from .base import TestCase
+from .factories import make_user, make_listing, make_booking
+from .test_bookings import booking_payload
+
+
+class BookingConfirmationTests(TestCase):
+    def setUp(self):
+        self.listing = make_listing(title='Sea View')
+        self.guest = make_user(first_name='Amina')
+        self.check_in = date.today() + timedelta(days=5)
+
+    def test_create_enqueues_after_commit(self):
+        client = APIClient()
+        client.force_authenticate(self.guest)
+        url = reverse('listings:booking-list')
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = client.post(url, booking_payload(self.listing, self.guest, self.check_in))
+            self.assertEqual(response.status_code, 201, response.data)
+            self.assertEqual(mail.outbox, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for callback in callbacks:
+                callback()
+        self.assertEqual(len(mail.outbox), 1)
+        message = mail.outbox[0]
+        self.assertEqual(message.to, [self.guest.email])
+        self.assertIn('Sea View', message.subject)
+        self.assertIn('Hi Amina', message.body)
+        self.assertIsNotNone(Booking.objects.get(pk=response.data['id']).confirmation_sent_at)
+
+    def test_broker_outage_does_not_fail_the_booking(self):
+        client = APIClient()
+        client.force_authenticate(self.guest)
+        with mock.patch.object(send_booking_confirmation, 'delay', side_effect=OSError('broker down')):
+            with self.assertLogs('listings.views', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = client.post(
+                        reverse('listings:booking-list'),
+                        booking_payload(self.listing, self.guest, self.check_in),
+                    )
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(Booking.objects.get(pk=response.data['id']).confirmation_sent_at)
+
+    def test_batch_is_one_query_and_one_connection(self):
+        bookings = [
+            make_booking(make_listing(), check_in=self.check_in) for _ in range(5)
+        ]
+        with mock.patch('django.core.mail.get_connection', wraps=mail.get_connection) as get_connection:
+            with CaptureQueriesContext(connection) as queries:
+                sent = send_booking_confirmation([booking.pk for booking in bookings])
+        self.assertEqual(sent, 5)
+        self.assertEqual(get_connection.call_count, 1)
+        # One joined SELECT, then one claiming UPDATE per message, plus savepoint bookkeeping
+        statements = [q['sql'] for q in queries if not q['sql'].upper().startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertEqual(len(statements), 6, statements)
+        self.assertEqual(sum(sql.startswith('SELECT') for sql in statements), 1)
+
+    def test_retries_do_not_resend(self):
+        booking = make_booking(self.listing, guest=self.guest)
+        self.assertEqual(send_booking_confirmation(booking.pk), 1)
+        self.assertEqual(send_booking_confirmation(booking.pk), 0)
+        self.assertEqual(send_booking_confirmation.delay([booking.pk]).get(), 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_failed_send_is_retried_later(self):
+        booking = make_booking(self.listing, guest=self.guest)
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError):
+            with self.assertRaises(Retry):
+                send_booking_confirmation.apply(args=[booking.pk], throw=True)
+        booking.refresh_from_db()
+        self.assertIsNone(booking.confirmation_sent_at)
+
+        self.assertEqual(send_booking_confirmation(booking.pk), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_failure_mid_batch_keeps_sent_stamps(self):
+        bookings = [make_booking(make_listing(), check_in=self.check_in) for _ in range(3)]
+        send_messages = locmem.EmailBackend.send_messages
+
+        def second_fails(backend, messages):
+            if len(mail.outbox) == 1:
+                raise OSError('connection reset')
+            return send_messages(backend, messages)
+
+        with mock.patch.object(locmem.EmailBackend, 'send_messages', second_fails):
+            with self.assertRaises(Retry):
+                send_booking_confirmation.apply(args=[[booking.pk for booking in bookings]], throw=True)
+        stamped = Booking.objects.filter(pk__in=[booking.pk for booking in bookings], confirmation_sent_at__isnull=False)
+        self.assertEqual(list(stamped.values_list('pk', flat=True)), [bookings[0].pk])
+
+        self.assertEqual(send_booking_confirmation([booking.pk for booking in bookings]), 2)
+        self.assertEqual([message.to for message in mail.outbox], [[booking.guest.email] for booking in bookings])
+
+    def test_sweep_sends_only_recent_unsent(self):
+        sent = make_booking(self.listing, check_in=self.check_in)
+        send_booking_confirmation(sent.pk)
+        lost = make_booking(self.listing, check_in=self.check_in + timedelta(days=5))
+        fresh = make_booking(self.listing, check_in=self.check_in + timedelta(days=10))
+        stale = make_booking(self.listing, check_in=self.check_in + timedelta(days=15))
+        now = timezone.now()
+        Booking.objects.filter(pk=lost.pk).update(created_at=now - timedelta(minutes=30))
+        Booking.objects.filter(pk=stale.pk).update(created_at=now - timedelta(days=30))
+        mail.outbox.clear()
+
+        self.assertEqual(send_pending_confirmations(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [lost.guest.email])
+        fresh.refresh_from_db()
+        self.assertIsNone(fresh.confirmation_sent_at)
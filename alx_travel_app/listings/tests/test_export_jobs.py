@@ -0,0 +1,130 @@
+import gzip
+import json
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from listings import exports
+from listings.models import ExportJob
+from listings.tasks import export_bookings
+
+from .base import TestCase
+from .factories import make_user, make_listing, make_booking, make_review
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings = override_settings(LISTINGS_EXPORT_ROOT=self.root, LISTINGS_EXPORT_CHUNK_ROWS=2)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.listing = make_listing()
+        self.other = make_listing()
+        day = date.today() + timedelta(days=10)
+        self.bookings = [
+            make_booking(self.listing, check_in=day + timedelta(days=5 * n), status=status)
+            for n, status in enumerate(['COMPLETED', 'CONFIRMED', 'PENDING', 'CONFIRMED'])
+        ] + [make_booking(self.other, check_in=day)]
+        make_review(self.bookings[0], rating=4)
+        self.staff = make_user(is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def _create(self, filters=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('listings:export-job-list'), {'filters': filters or {}}, format='json')
+        return response
+
+    def _rows(self, job, start=1):
+        rows = []
+        for number in range(start, job.chunks_written + 1):
+            with gzip.open(exports.chunk_path(job, number), 'rt', encoding='utf-8') as fh:
+                rows.extend(json.loads(line) for line in fh)
+        return rows
+
+    def test_writes_chunks(self):
+        response = self._create()
+        self.assertEqual(response.status_code, 201)
+        job = ExportJob.objects.get(pk=response.data['id'])
+        self.assertEqual((job.status, job.total_rows, job.rows_written, job.chunks_written), ('COMPLETED', 5, 5, 3))
+
+        rows = self._rows(job)
+        self.assertEqual([row['id'] for row in rows], [booking.pk for booking in self.bookings])
+        self.assertEqual(rows[0]['listing_details']['id'], self.listing.pk)
+        self.assertEqual(rows[0]['review']['rating'], 4)
+
+        response = self.client.get(reverse('listings:export-job-detail', args=[job.pk]))
+        self.assertEqual(response.data['status'], 'COMPLETED')
+        self.assertEqual(response.data['progress']['state'], 'PROGRESS')
+        self.assertEqual(response.data['progress']['rows'], 5)
+        self.assertEqual(len(response.data['chunks']), 3)
+
+        download = self.client.get(response.data['chunks'][0])
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(download['Content-Type'], 'application/gzip')
+        lines = gzip.decompress(b''.join(download.streaming_content)).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(self.client.get(reverse('listings:export-job-chunk', args=[job.pk, 4])).status_code, 404)
+
+    def test_resumes_after_last_chunk(self):
+        job = ExportJob.objects.create(requested_by=self.staff, filters={})
+        exports.write_export(job.pk)
+        job.refresh_from_db()
+        first = self._rows(job)
+
+        # A worker that died after the first chunk: later chunks are gone
+        for number in (2, 3):
+            exports.chunk_path(job, number).unlink()
+        ExportJob.objects.filter(pk=job.pk).update(
+            status='RUNNING', last_id=self.bookings[1].pk, chunks_written=1, rows_written=2,
+        )
+        exports.chunk_path(job, 1).write_bytes(b'kept')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('listings:export-job-resume', args=[job.pk]))
+        self.assertEqual(response.status_code, 202)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_written, job.chunks_written), ('COMPLETED', 5, 3))
+        self.assertEqual(exports.chunk_path(job, 1).read_bytes(), b'kept')
+        self.assertEqual(self._rows(job, start=2), first[2:])
+
+        response = self.client.post(reverse('listings:export-job-resume', args=[job.pk]))
+        self.assertEqual(response.status_code, 400)
+
+    def test_fails_once_io_retries_run_out(self):
+        job = ExportJob.objects.create(requested_by=self.staff, filters={})
+        calls = []
+
+        def disk_full(job_id, report=None):
+            calls.append(ExportJob.objects.get(pk=job_id).status)
+            raise OSError('No space left on device')
+
+        with mock.patch.object(exports, 'write_export', disk_full):
+            export_bookings.apply(args=[job.pk])
+        job.refresh_from_db()
+        self.assertEqual(len(calls), export_bookings.max_retries + 1)
+        self.assertNotIn('FAILED', calls)
+        self.assertEqual((job.status, job.error), ('FAILED', 'No space left on device'))
+
+    def test_honours_filters(self):
+        response = self._create({'listing': self.other.pk, 'ordering': 'ignored'})
+        job = ExportJob.objects.get(pk=response.data['id'])
+        self.assertEqual(job.filters, {'listing': self.other.pk})
+        self.assertEqual([row['id'] for row in self._rows(job)], [self.bookings[4].pk])
+
+    def test_invalid_filters(self):
+        response = self._create({'status': 'LOST'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.data['filters'])
+        self.assertFalse(ExportJob.objects.exists())
+
+    def test_staff_only(self):
+        self.client.force_authenticate(make_user())
+        self.assertEqual(self._create().status_code, 403)
@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+from datetime import date, timedelta
+
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .base import TestCase
+from .factories import make_user, make_listing, make_booking
+
+
+class BookingExportTests(TestCase):
+    def setUp(self):
+        self.listing = make_listing()
+        self.other = make_listing()
+        self.guest = make_user(email='ana@example.com')
+        day = date.today() + timedelta(days=10)
+        self.bookings = [
+            make_booking(self.listing, self.guest, check_in=day, special_requests='Late, "very" late'),
+            make_booking(self.listing, check_in=day + timedelta(days=5), status='PENDING'),
+            make_booking(self.other, self.guest, check_in=day),
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(make_user(is_staff=True))
+        self.url = reverse('listings:booking-export')
+
+    def _get(self, params=None):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertIn('.ndjson"', response['Content-Disposition'])
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+        self.assertEqual([row['id'] for row in rows], [booking.pk for booking in reversed(self.bookings)])
+        first = self.bookings[0]
+        self.assertEqual(rows[-1], {
+            'id': first.pk, 'listing': self.listing.pk, 'listing_title': self.listing.title,
+            'guest': self.guest.pk, 'guest_email': 'ana@example.com',
+            'check_in': first.check_in.isoformat(), 'check_out': first.check_out.isoformat(),
+            'number_of_guests': 1, 'total_price': '300.00', 'status': 'CONFIRMED',
+            'special_requests': 'Late, "very" late',
+            'created_at': rows[-1]['created_at'], 'updated_at': rows[-1]['updated_at'],
+            'confirmation_sent_at': None,
+        })
+        self.assertTrue(rows[-1]['created_at'].endswith('Z'))
+
+    def test_csv(self):
+        rows = list(csv.DictReader(io.StringIO(self._get({'format': 'csv'}))))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[-1]['special_requests'], 'Late, "very" late')
+        self.assertEqual(rows[-1]['confirmation_sent_at'], '')
+
+    def test_honours_filters(self):
+        rows = self._get({'listing': self.listing.pk, 'status': 'CONFIRMED'}).splitlines()
+        self.assertEqual([json.loads(row)['id'] for row in rows], [self.bookings[0].pk])
+        rows = self._get({'guest': self.guest.pk, 'format': 'csv', 'ordering': 'created_at'}).splitlines()
+        self.assertEqual([int(row.split(',')[0]) for row in rows[1:]], [self.bookings[0].pk, self.bookings[2].pk])
+
+    def test_invalid_filter(self):
+        response = self.client.get(self.url, {'status': 'LOST', 'format': 'csv'})
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.content.startswith(b'status\r\n'))
+
+    def test_staff_only(self):
+        self.client.force_authenticate(self.guest)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .base import TestCase
+from .factories import make_user, make_listing, make_booking
+
+
+@override_settings(LISTINGS_CACHE_TIMEOUT=0)
+class FacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        host = make_user()
+        cls.villa = make_listing(host, property_type='VILLA', bedrooms=5, price_per_night=Decimal('450'), city='Mombasa')
+        cls.flat = make_listing(host, bedrooms=1, price_per_night=Decimal('40'))
+        cls.house = make_listing(host, property_type='HOUSE', bedrooms=3, price_per_night=Decimal('100'))
+        make_listing(host, price_per_night=Decimal('75'), city='Kampala', country='Uganda')
+        make_listing(host, is_active=False, city='Kigali')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('listings:listing-list')
+
+    def _facets(self, params, queries=None):
+        if queries is None:
+            response = self.client.get(self.url, params)
+        else:
+            with self.assertNumQueries(queries):
+                response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['facets']
+
+    @staticmethod
+    def _counts(buckets):
+        return {bucket['value']: bucket['count'] for bucket in buckets}
+
+    def test_counts(self):
+        # count + page, one aggregate for the bucketed facets, one GROUP BY per city/country
+        facets = self._facets({'facets': 'property_type,bedrooms,price_band,city,country'}, queries=5)
+        self.assertEqual(list(facets), ['property_type', 'bedrooms', 'price_band', 'city', 'country'])
+        self.assertEqual(self._counts(facets['property_type']), {
+            'APARTMENT': 2, 'HOUSE': 1, 'VILLA': 1, 'CABIN': 0, 'BEACH_HOUSE': 0, 'OTHER': 0,
+        })
+        self.assertEqual(self._counts(facets['bedrooms']), {'0-1': 1, '2': 1, '3': 1, '4': 0, '5+': 1})
+        self.assertEqual(facets['bedrooms'][-1], {'value': '5+', 'min': 5, 'max': None, 'count': 1})
+        self.assertEqual(self._counts(facets['price_band']), {'<50': 1, '50-100': 1, '100-200': 1, '200-500': 1, '500+': 0})
+        self.assertEqual(facets['city'], [
+            {'value': 'Nairobi', 'count': 2}, {'value': 'Kampala', 'count': 1}, {'value': 'Mombasa', 'count': 1},
+        ])
+        self.assertEqual(self._counts(facets['country']), {'Kenya': 3, 'Uganda': 1})
+
+    def test_counts_follow_filters(self):
+        facets = self._facets({'facets': 'city,bedrooms', 'country': 'Kenya', 'min_price': 50, 'page': 1})
+        self.assertEqual(self._counts(facets['city']), {'Nairobi': 1, 'Mombasa': 1})
+        self.assertEqual(self._counts(facets['bedrooms']), {'0-1': 0, '2': 0, '3': 1, '4': 0, '5+': 1})
+
+        day = date.today() + timedelta(days=10)
+        make_booking(self.villa, check_in=day)
+        facets = self._facets({
+            'facets': 'property_type', 'check_in': day, 'check_out': day + timedelta(days=2), 'search': 'place',
+        })
+        self.assertEqual(self._counts(facets['property_type'])['VILLA'], 0)
+        self.assertEqual(self._counts(facets['property_type'])['APARTMENT'], 2)
+
+    def test_with_cursor_paging(self):
+        response = self.client.get(self.url, {'facets': 'country', 'cursor': ''})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._counts(response.data['facets']['country']), {'Kenya': 3, 'Uganda': 1})
+
+    def test_unknown_facet(self):
+        response = self.client.get(self.url, {'facets': 'city,colour'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('colour', str(response.data['facets']))
+
+    def test_without_facets(self):
+        self.assertNotIn('facets', self.client.get(self.url).data)
+
+    @override_settings(LISTINGS_FACET_CACHE_TIMEOUT=30)
+    def test_cached_across_pages(self):
+        self._facets({'facets': 'city,bedrooms', 'page': 1, 'ordering': 'price_per_night'})
+        # Only the page queries: the counts come from the cache
+        facets = self._facets({'facets': 'bedrooms,city', 'page': 1, 'ordering': '-created_at'}, queries=2)
+        self.assertEqual(self._counts(facets['city'])['Nairobi'], 2)
+
+        make_listing(self.villa.host, city='Mombasa')
+        facets = self._facets({'facets': 'city,bedrooms'})
+        self.assertEqual(self._counts(facets['city'])['Mombasa'], 2)
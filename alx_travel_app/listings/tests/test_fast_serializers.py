@@ -0,0 +1,139 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from ..models import Listing, Booking
+from ..pagination import KeysetPagination
+from ..serializers import ListingSerializer, BookingSerializer
+from .base import TestCase
+from .factories import make_user, make_listing, make_booking, make_review
+
+
+@override_settings(LISTINGS_CACHE_TIMEOUT=0)
+class FastSerializerCompatibilityTests(TestCase):
+    """The fast list path must render exactly what the ModelSerializers render."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user(first_name='Ämélie', last_name="O'Hara")
+        cls.staff = make_user(is_staff=True)
+        cls.guest = make_user()
+        cls.check_in = date.today() + timedelta(days=20)
+
+        cls.listings = [
+            make_listing(cls.host, price_per_night=Decimal('99.5'), latitude=Decimal('-1.2921'),
+                         longitude=Decimal('36.821946'), amenities={'wifi': True, 'pool': False}),
+            make_listing(cls.host, title='Café loft \U0001F3E0', description='Line one\nLine "two"'),
+            make_listing(cls.host, price_per_night=Decimal('1234.00'), max_guests=12),
+        ]
+        past = date.today() - timedelta(days=30)
+        reviewed = make_booking(cls.listings[0], cls.guest, check_in=past, status='COMPLETED',
+                                special_requests='Late arrival')
+        make_review(reviewed, rating=4, comment='Great')
+        make_booking(cls.listings[1], cls.guest, check_in=cls.check_in, status='PENDING')
+        make_booking(cls.listings[2], cls.guest, check_in=cls.check_in + timedelta(days=40))
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _legacy(self, serializer_class, queryset, params):
+        request = Request(APIRequestFactory().get('/', params))
+        return JSONRenderer().render(serializer_class(queryset, many=True, context={'request': request}).data)
+
+    def _fast(self, url, params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return JSONRenderer().render(response.data['results'])
+
+    def test_listing_list_matches_model_serializer(self):
+        expected = self._legacy(ListingSerializer, Listing.objects.order_by('-created_at', '-id'), {})
+        self.assertEqual(self._fast(reverse('listings:listing-list'), {}), expected)
+
+    def test_listing_availability_list_matches_model_serializer(self):
+        params = {'check_in': self.check_in.isoformat(),
+                  'check_out': (self.check_in + timedelta(days=2)).isoformat()}
+        queryset = Listing.objects.exclude(pk=self.listings[1].pk).order_by('-created_at', '-id')
+        self.assertEqual(self._fast(reverse('listings:listing-list'), params), self._legacy(ListingSerializer, queryset, params))
+
+    def test_booking_list_matches_model_serializer(self):
+        self.client.force_authenticate(self.staff)
+        queryset = Booking.objects.order_by('-created_at', '-id')
+        self.assertEqual(self._fast(reverse('listings:booking-list'), {}), self._legacy(BookingSerializer, queryset, {}))
+
+    def test_booking_list_with_dates_matches_model_serializer(self):
+        self.client.force_authenticate(self.staff)
+        params = {'check_in': self.check_in.isoformat(),
+                  'check_out': (self.check_in + timedelta(days=2)).isoformat()}
+        queryset = Booking.objects.order_by('-created_at', '-id')
+        self.assertEqual(self._fast(reverse('listings:booking-list'), params),
+                         self._legacy(BookingSerializer, queryset, params))
+
+    def test_booking_list_runs_a_fixed_number_of_queries(self):
+        self.client.force_authenticate(self.staff)
+        for _ in range(5):
+            make_booking(make_listing(self.host), make_user())
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('listings:booking-list'))
+        # COUNT(*) for the paginator and one joined SELECT
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+
+@override_settings(LISTINGS_CACHE_TIMEOUT=0)
+class FieldSelectionTests(TestCase):
+    def setUp(self):
+        self.listing = make_listing()
+        self.guest = make_user()
+        make_booking(self.listing, self.guest)
+        self.client = APIClient()
+
+    def test_fields_trims_listing_output(self):
+        response = self.client.get(reverse('listings:listing-list'), {'fields': 'id,price_per_night,title'})
+        self.assertEqual(list(response.data['results'][0]), ['id', 'title', 'price_per_night'])
+
+    def test_expand_adds_nested_objects_back(self):
+        response = self.client.get(reverse('listings:listing-list'), {'fields': 'id', 'expand': 'host'})
+        self.assertEqual(list(response.data['results'][0]), ['id', 'host'])
+
+        self.client.force_authenticate(self.guest)
+        url = reverse('listings:booking-list')
+        row = self.client.get(url, {'fields': 'id,status'}).data['results'][0]
+        self.assertEqual(list(row), ['id', 'status'])
+        row = self.client.get(url, {'fields': 'id,status', 'expand': 'listing'}).data['results'][0]
+        self.assertEqual(list(row), ['id', 'listing_details', 'status'])
+        self.assertEqual(row['listing_details']['id'], self.listing.id)
+
+    def test_trimmed_fields_page_with_cursors(self):
+        listings = [self.listing, make_listing(), make_listing()]
+        booking_ids = [make_booking(listing, self.guest).pk for listing in listings[1:]]
+        self.client.force_authenticate(self.guest)
+        cases = [
+            ('listings:listing-list', {'fields': 'title'}, len(listings)),
+            ('listings:listing-list-async', {'fields': 'title'}, len(listings)),
+            ('listings:booking-list', {'fields': 'status'}, len(booking_ids) + 1),
+            ('listings:booking-list', {'fields': 'status', 'expand': 'listing'}, len(booking_ids) + 1),
+        ]
+        with mock.patch.object(KeysetPagination, 'page_size', 2):
+            for name, params, total in cases:
+                rows, url, params = [], reverse(name), {**params, 'cursor': ''}
+                while url:
+                    response = self.client.get(url, params)
+                    self.assertEqual(response.status_code, 200)
+                    page = response.json()
+                    rows.extend(page['results'])
+                    url, params = page['next'], None
+                self.assertEqual(len(rows), total)
+                self.assertNotIn('created_at', rows[0])
+
+    def test_trimmed_fields_trim_the_query(self):
+        self.client.force_authenticate(self.guest)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('listings:booking-list'), {'fields': 'id,status'})
+        self.assertNotIn('JOIN', ctx.captured_queries[-1]['sql'].upper())
@@ -0,0 +1,93 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test import override_settings, skipUnlessDBFeature
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from ..views import ListingViewSet
+from .base import TestCase
+from .factories import make_user, make_listing
+
+
+def filtered_queryset(params):
+    """The queryset ListingViewSet.list would paginate for ``params``."""
+    request = Request(APIRequestFactory().get('/', params))
+    view = ListingViewSet(request=request, action='list', format_kwarg=None, kwargs={})
+    return view.filter_queryset(view.get_queryset())
+
+
+@override_settings(LISTINGS_CACHE_TIMEOUT=0)
+class ListingRangeFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        host = make_user()
+        cls.cheap = make_listing(host, price_per_night=Decimal('40'), bedrooms=1, max_guests=2)
+        cls.mid = make_listing(host, price_per_night=Decimal('120'), bedrooms=2, max_guests=4)
+        cls.big = make_listing(host, price_per_night=Decimal('300'), bedrooms=4, max_guests=8)
+        cls.mombasa = make_listing(host, price_per_night=Decimal('150'), bedrooms=2, max_guests=6, city='Mombasa')
+        cls.inactive = make_listing(host, price_per_night=Decimal('100'), bedrooms=2, max_guests=4, is_active=False)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('listings:listing-list')
+
+    def _ids(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row['id'] for row in response.data['results']]
+
+    def test_price_range_sorted_by_price(self):
+        self.assertEqual(
+            self._ids(city='Nairobi', min_price=50, max_price=300, ordering='price_per_night'),
+            [self.mid.pk, self.big.pk],
+        )
+
+    def test_capacity_bounds(self):
+        self.assertEqual(set(self._ids(min_bedrooms=2, max_bedrooms=3)), {self.mid.pk, self.mombasa.pk})
+        self.assertEqual(set(self._ids(min_guests=5)), {self.big.pk, self.mombasa.pk})
+        self.assertEqual(self._ids(max_guests=2), [self.cheap.pk])
+
+    def test_exact_filters_still_work(self):
+        self.assertEqual(self._ids(bedrooms=4), [self.big.pk])
+        self.assertEqual(self._ids(city='Mombasa'), [self.mombasa.pk])
+
+    def test_invalid_bound_is_rejected(self):
+        self.assertEqual(self.client.get(self.url, {'min_price': 'cheap'}).status_code, 400)
+
+
+@skipUnlessDBFeature('supports_partial_indexes', 'supports_explaining_query_execution')
+class ListingRangeIndexTests(TestCase):
+    """The common search shapes are answered from the partial indexes."""
+    # What a plan says when rows are sorted after being fetched
+    SORT_STEP = {'sqlite': 'TEMP B-TREE', 'postgresql': 'Sort Key'}
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be scanned sequentially
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, params, index):
+        plan = filtered_queryset(params).explain()
+        self.assertIn(index, plan)
+
+    def test_city_price_range(self):
+        self.assertUsesIndex(
+            {'city': 'Nairobi', 'min_price': 50, 'max_price': 200, 'min_guests': 3, 'ordering': 'price_per_night'},
+            'listing_active_city_price_idx',
+        )
+
+    def test_property_type_price_range(self):
+        self.assertUsesIndex(
+            {'property_type': 'VILLA', 'max_price': 200, 'min_bedrooms': 2},
+            'listing_active_type_price_idx',
+        )
+
+    def test_price_only_sorted_by_price(self):
+        self.assertUsesIndex({'min_price': 50, 'ordering': 'price_per_night'}, 'listing_active_price_idx')
+
+    def test_sort_by_price_needs_no_sort_step(self):
+        plan = filtered_queryset({'city': 'Nairobi', 'min_price': 50, 'ordering': 'price_per_night'}).explain()
+        self.assertNotIn(self.SORT_STEP.get(connection.vendor, 'TEMP B-TREE'), plan)
@@ -0,0 +1,124 @@
+import math
+from decimal import Decimal
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .. import geo
+from ..models import Listing
+from .base import TestCase
+from .factories import make_user, make_listing
+
+NAIROBI = (-1.286389, 36.817223)
+
+
+def haversine(a, b):
+    lat1, lng1, lat2, lng2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * geo.EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def offset(point, north_km=0, east_km=0):
+    lat, lng = point
+    lat += math.degrees(north_km / geo.EARTH_RADIUS_KM)
+    lng += math.degrees(east_km / geo.EARTH_RADIUS_KM) / math.cos(math.radians(lat))
+    return round(lat, 6), round(lng, 6)
+
+
+class GeoCellTests(SimpleTestCase):
+    def test_cells_are_tenth_degree_tiles(self):
+        self.assertEqual(geo.cell_for(-90, -180), 0)
+        self.assertEqual(geo.cell_for(-90, -179.95), 0)
+        self.assertEqual(geo.cell_for(-90, -179.9), 1)
+        self.assertEqual(geo.cell_for(-89.9, -180), geo.CELLS_PER_ROW)
+        self.assertEqual(geo.cell_for(90, 180), geo.ROWS * geo.CELLS_PER_ROW - geo.CELLS_PER_ROW)
+        self.assertIsNone(geo.cell_for(None, 10))
+
+    def test_box_covers_the_circle(self):
+        for point in (NAIROBI, (60.0, 10.0), (-33.9, 18.4)):
+            lat_min, lat_max, lng_ranges = geo.bounding_box(*point, 25)
+            for bearing in range(0, 360, 15):
+                north = 25 * math.cos(math.radians(bearing))
+                east = 25 * math.sin(math.radians(bearing))
+                lat, lng = offset(point, north * 0.999, east * 0.999)
+                self.assertTrue(lat_min <= lat <= lat_max)
+                self.assertTrue(any(west <= lng <= east_ for west, east_ in lng_ranges))
+
+    def test_box_splits_at_antimeridian(self):
+        _, _, lng_ranges = geo.bounding_box(0, 179.95, 20)
+        self.assertEqual(len(lng_ranges), 2)
+        self.assertEqual(lng_ranges[0][1], 180.0)
+        self.assertEqual(lng_ranges[1][0], -180.0)
+
+    def test_one_range_per_row(self):
+        box = geo.bounding_box(*NAIROBI, 10)
+        ranges = geo.cell_ranges(*box)
+        self.assertEqual(len(ranges), geo._row(box[1]) - geo._row(box[0]) + 1)
+        self.assertTrue(any(first <= geo.cell_for(*NAIROBI) <= last for first, last in ranges))
+
+
+@override_settings(LISTINGS_CACHE_TIMEOUT=0)
+class NearbySearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user()
+        cls.by_distance = {}
+        for km in (0.5, 4, 9, 15, 40):
+            lat, lng = offset(NAIROBI, north_km=km * 0.6, east_km=-km * 0.8)
+            cls.by_distance[km] = make_listing(cls.host, latitude=Decimal(str(lat)), longitude=Decimal(str(lng)))
+        cls.inactive = make_listing(cls.host, latitude=Decimal('-1.286'), longitude=Decimal('36.817'), is_active=False)
+        cls.nowhere = make_listing(cls.host)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('listings:listing-list')
+
+    def _near(self, point=NAIROBI, **params):
+        params['near'] = f'{point[0]},{point[1]}'
+        return self.client.get(self.url, params)
+
+    def test_nearest_first_within_radius(self):
+        response = self._near(radius_km=10)
+        self.assertEqual(response.status_code, 200, response.data)
+        results = response.data['results']
+        self.assertEqual([row['id'] for row in results], [self.by_distance[km].pk for km in (0.5, 4, 9)])
+        for row, km in zip(results, (0.5, 4, 9)):
+            listing = self.by_distance[km]
+            expected = haversine(NAIROBI, (float(listing.latitude), float(listing.longitude)))
+            self.assertAlmostEqual(row['distance_km'], expected, places=2)
+            self.assertAlmostEqual(row['distance_km'], km, delta=0.05)
+
+    def test_default_radius_and_explicit_ordering(self):
+        self.assertEqual(self._near().data['count'], 3)
+        response = self._near(radius_km=20, ordering='-created_at')
+        self.assertEqual(
+            [row['id'] for row in response.data['results']],
+            [self.by_distance[km].pk for km in (15, 9, 4, 0.5)],
+        )
+
+    def test_plain_list_has_no_distance(self):
+        self.assertNotIn('distance_km', self.client.get(self.url).data['results'][0])
+
+    def test_wraps_around_the_antimeridian(self):
+        east = make_listing(self.host, latitude=Decimal('0.010000'), longitude=Decimal('179.990000'))
+        west = make_listing(self.host, latitude=Decimal('0.000000'), longitude=Decimal('-179.980000'))
+        response = self._near(point=(0.0, -179.999), radius_km=5)
+        self.assertEqual([row['id'] for row in response.data['results']], [east.pk, west.pk])
+
+    def test_invalid_params(self):
+        self.assertEqual(self.client.get(self.url, {'near': 'nairobi'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'near': '91,10'}).status_code, 400)
+        self.assertEqual(self._near(radius_km=500).status_code, 400)
+        self.assertEqual(self._near(cursor='').status_code, 400)
+
+    def test_save_keeps_cell_in_step(self):
+        listing = self.by_distance[40]
+        listing.latitude, listing.longitude = Decimal('10.05'), Decimal('20.05')
+        listing.save(update_fields=['latitude', 'longitude'])
+        self.assertEqual(Listing.objects.get(pk=listing.pk).geo_cell, geo.cell_for(10.05, 20.05))
+        self.assertIsNone(Listing.objects.get(pk=self.nowhere.pk).geo_cell)
+
+    def test_candidates_come_from_the_cell_index(self):
+        plan = Listing.objects.filter(is_active=True).nearby(*NAIROBI, 10).explain()
+        self.assertIn('geo_cell', plan)
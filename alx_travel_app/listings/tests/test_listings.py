@@ -0,0 +1,79 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIClient
+
+from ..models import Listing
+from .base import TestCase
+from .factories import make_user, make_listing, make_listings, make_booking, make_review
+
+
+class ListingRatingStatsTests(TestCase):
+    def setUp(self):
+        self.listing = make_listing()
+
+    def _completed_booking(self):
+        return make_booking(self.listing, status='COMPLETED')
+
+    def test_stats_follow_review_writes(self):
+        first = make_review(self._completed_booking(), rating=5)
+        make_review(self._completed_booking(), rating=2)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.review_count, 2)
+        self.assertEqual(self.listing.rating_avg, 3.5)
+
+        first.rating = 3
+        first.save()
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.rating_avg, 2.5)
+
+        first.delete()
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.review_count, 1)
+        self.assertEqual(self.listing.rating_avg, 2.0)
+
+    def test_average_rating_reads_denormalized_column(self):
+        make_review(self._completed_booking(), rating=4)
+        listing = Listing.objects.get(pk=self.listing.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(listing.average_rating(), 4.0)
+
+
+@override_settings(LISTINGS_CACHE_TIMEOUT=0)
+class ListingListQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        hosts = [make_user() for _ in range(5)]
+        for host in hosts:
+            make_listings(host, 200)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('listings:listing-list')
+
+    def _list_queries(self, page_size):
+        with mock.patch.object(PageNumberPagination, 'page_size', page_size):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), page_size)
+        return len(ctx.captured_queries)
+
+    def test_query_count_is_independent_of_page_size(self):
+        counts = {size: self._list_queries(size) for size in (10, 100, 1000)}
+        self.assertEqual(len(set(counts.values())), 1, counts)
+        # One MAX(updated_at)/COUNT for the ETag, which the paginator reuses,
+        # and one SELECT ... JOIN auth_user
+        self.assertEqual(counts[10], 2)
+
+    def test_list_exposes_denormalized_rating(self):
+        listing = Listing.objects.first()
+        make_review(make_booking(listing, status='COMPLETED'), rating=4)
+        response = self.client.get(reverse('listings:listing-detail', args=[listing.pk]))
+        self.assertEqual(response.data['average_rating'], 4.0)
+        self.assertEqual(response.data['review_count'], 1)
+        self.assertEqual(response.data['host']['id'], listing.host_id)
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import Listing
+from .base import TestCase
+from .factories import make_user, make_listings, make_booking
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host = make_user()
+        make_listings(cls.host, 25)
+        # Force ties on created_at so only the id tiebreaker keeps pages stable
+        now = timezone.now()
+        for i, pk in enumerate(Listing.objects.order_by('pk').values_list('pk', flat=True)):
+            Listing.objects.filter(pk=pk).update(created_at=now - timedelta(minutes=i // 4))
+        cls.expected = list(Listing.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('listings:listing-list')
+
+    def _walk(self, url, params=None, key='next'):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item['id'] for item in response.data['results'])
+            url, params, pages = response.data[key], None, pages + 1
+        return ids, pages, response
+
+    def test_forward_walk_visits_every_row_once(self):
+        ids, pages, _ = self._walk(self.url, {'cursor': ''})
+        self.assertEqual(ids, self.expected)
+        self.assertEqual(pages, 3)
+
+    def test_backward_walk_mirrors_forward_walk(self):
+        _, _, last = self._walk(self.url, {'cursor': ''})
+        ids, pages, _ = self._walk(last.data['previous'], key='previous')
+        # Pages arrive last-to-first, rows within each page stay newest first
+        self.assertEqual(pages, 2)
+        self.assertEqual(ids, self.expected[10:20] + self.expected[:10])
+
+    def test_count_is_skipped_unless_requested(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, {'cursor': ''})
+        self.assertNotIn('count', response.data)
+        # The only count is the one the ETag is built from (listings.conditional)
+        counts = [q['sql'] for q in ctx.captured_queries if 'COUNT(' in q['sql'].upper()]
+        self.assertEqual(len(counts), 1)
+        self.assertIn('MAX(', counts[0].upper())
+        self.assertIsNone(response.data['previous'])
+
+        response = self.client.get(self.url, {'cursor': '', 'count': 'true'})
+        self.assertEqual(response.data['count'], 25)
+
+    def test_page_number_clients_keep_working(self):
+        response = self.client.get(self.url, {'page': 2})
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual([item['id'] for item in response.data['results']], self.expected[10:20])
+
+    def test_invalid_cursor_and_ordering(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'garbage'}).status_code, 404)
+        response = self.client.get(self.url, {'cursor': '', 'ordering': 'price_per_night'})
+        self.assertEqual(response.status_code, 400)
+
+
+class BookingKeysetPaginationTests(TestCase):
+    def test_staff_can_walk_all_bookings(self):
+        host = make_user()
+        listings = make_listings(host, 12)
+        bookings = [make_booking(listing) for listing in listings]
+        client = APIClient()
+        client.force_authenticate(make_user(is_staff=True))
+
+        url, params, ids = reverse('listings:booking-list'), {'cursor': ''}, []
+        while url:
+            response = client.get(url, params)
+            ids.extend(item['id'] for item in response.data['results'])
+            url, params = response.data['next'], None
+        self.assertEqual(ids, sorted((b.pk for b in bookings), reverse=True))
@@ -0,0 +1,98 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..middleware import ProfilingMiddleware
+from ..profiling import ProfileStore, _bucket_percentile, profile_store
+from .base import TestCase
+from .factories import make_user, make_listings
+
+
+@override_settings(LISTINGS_CACHE_TIMEOUT=0, LISTINGS_PROFILING_FLUSH_SECONDS=0)
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        profile_store.reset()
+        self.addCleanup(profile_store.reset)
+        self.client = APIClient()
+        make_listings(make_user(), 3)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('listings:listing-list'))
+        self.assertEqual(response.status_code, 200)
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", serialize;dur=[\d.]+$')
+        self.assertNotIn('dupsql', timing)
+
+    def test_repeated_sql_is_flagged(self):
+        def view(request):
+            for _ in range(3):
+                list(get_user_model().objects.filter(pk=1))
+            return HttpResponse('ok')
+
+        with self.assertLogs('listings.middleware', 'WARNING'):
+            response = ProfilingMiddleware(view)(RequestFactory().get('/'))
+        self.assertIn('dupsql;desc="3 repeated queries"', response['Server-Timing'])
+        self.assertEqual(profile_store.snapshot()['unresolved']['requests_with_duplicate_sql'], 1)
+
+    def test_perf_stats_is_staff_only(self):
+        url = reverse('listings:listing-perf-stats')
+        self.client.force_authenticate(make_user())
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_perf_stats_aggregates_per_view(self):
+        for _ in range(2):
+            self.client.get(reverse('listings:listing-list'))
+        self.client.force_authenticate(make_user(is_staff=True))
+
+        stats = self.client.get(reverse('listings:listing-perf-stats')).data['listing-list']
+        self.assertEqual(stats['requests'], 2)
+        self.assertEqual(stats['requests_with_duplicate_sql'], 0)
+        self.assertEqual(set(stats), {
+            'requests', 'requests_with_duplicate_sql', 'total_ms', 'db_ms', 'serialize_ms', 'queries', 'size_bytes',
+        })
+        self.assertEqual(sum(stats['queries']['histogram'].values()), 2)
+        self.assertGreater(stats['size_bytes']['mean'], 0)
+
+        self.assertEqual(self.client.delete(reverse('listings:listing-perf-stats')).status_code, 204)
+        self.assertNotIn('listing-list', profile_store.snapshot())
+
+    @override_settings(LISTINGS_PROFILING=False)
+    def test_disabled(self):
+        response = self.client.get(reverse('listings:listing-list'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(profile_store.snapshot(), {})
+
+    @override_settings(LISTINGS_PROFILING_FLUSH_SECONDS=60)
+    def test_flush_is_two_cache_round_trips(self):
+        for view in ('listing-list', 'listing-detail', 'booking-list'):
+            profile_store.record(view, total_ms=3, queries=2)
+        cache = mock.Mock(wraps=profile_store.cache)
+        with mock.patch.object(ProfileStore, 'cache', cache):
+            profile_store.flush()
+        self.assertEqual([call[0] for call in cache.method_calls], ['get_many', 'set_many'])
+        self.assertEqual({view: stats['requests'] for view, stats in profile_store.snapshot().items()},
+                         {'listing-list': 1, 'listing-detail': 1, 'booking-list': 1})
+
+    def test_workers_add_up_and_reset_together(self):
+        other = ProfileStore()
+        other.record('listing-list', total_ms=3)
+        profile_store.record('listing-list', total_ms=30)
+        stats = profile_store.snapshot()['listing-list']
+        self.assertEqual((stats['requests'], stats['total_ms']['mean']), (2, 16.5))
+
+        profile_store.reset()
+        self.assertEqual(profile_store.snapshot(), {})
+        # The other worker drops its pre-reset totals on its next flush
+        other.flush()
+        self.assertEqual(profile_store.snapshot(), {})
+
+    def test_bucket_percentile(self):
+        bounds = (1, 5, 10)
+        self.assertEqual(_bucket_percentile(bounds, [90, 5, 5, 0], 50), 1)
+        self.assertEqual(_bucket_percentile(bounds, [90, 5, 5, 0], 95), 5)
+        self.assertIsNone(_bucket_percentile(bounds, [0, 0, 0, 1], 99))
+        self.assertIsNone(_bucket_percentile(bounds, [0, 0, 0, 0], 50))
@@ -0,0 +1,154 @@
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..models import Listing, Review
+from ..pagination import KeysetPagination
+from .base import TestCase
+from .factories import make_user, make_listing, make_booking, make_review
+
+
+class RatingHistogramTests(TestCase):
+    def setUp(self):
+        self.listing = make_listing()
+
+    def _completed_booking(self, listing=None):
+        return make_booking(listing or self.listing, status='COMPLETED')
+
+    def _histogram(self, listing=None):
+        return Listing.objects.get(pk=(listing or self.listing).pk).rating_histogram()
+
+    def test_histogram_follows_review_writes(self):
+        first = make_review(self._completed_booking(), rating=5)
+        make_review(self._completed_booking(), rating=2)
+        self.assertEqual(self._histogram(), {1: 0, 2: 1, 3: 0, 4: 0, 5: 1})
+
+        first.rating = 3
+        first.save()
+        self.assertEqual(self._histogram(), {1: 0, 2: 1, 3: 1, 4: 0, 5: 0})
+
+        first.delete()
+        self.assertEqual(self._histogram(), {1: 0, 2: 1, 3: 0, 4: 0, 5: 0})
+
+    def test_cascaded_deletes_update_the_histogram(self):
+        review = make_review(self._completed_booking(), rating=4)
+        review.booking.delete()
+        listing = Listing.objects.get(pk=self.listing.pk)
+        self.assertEqual(listing.rating_histogram(), {1: 0, 2: 0, 3: 0, 4: 0, 5: 0})
+        self.assertEqual((listing.review_count, listing.rating_avg), (0, 0))
+
+    def test_matches_a_full_recompute(self):
+        for rating in (1, 4, 4, 5):
+            make_review(self._completed_booking(), rating=rating)
+        listing = Listing.objects.get(pk=self.listing.pk)
+        kept = (listing.rating_histogram(), listing.review_count, listing.rating_avg)
+
+        Listing.objects.update(stars_1=0, stars_4=0, review_count=0, rating_avg=0)
+        Listing.objects.filter(pk=self.listing.pk).refresh_rating_stats()
+        stale = listing.updated_at
+        listing.refresh_from_db()
+        self.assertEqual((listing.rating_histogram(), listing.review_count, listing.rating_avg), kept)
+        self.assertEqual(kept[2], 3.5)
+        # Conditional GETs must see the backfill
+        self.assertGreater(listing.updated_at, stale)
+
+    def test_writes_never_read_the_reviews_table(self):
+        booking = self._completed_booking()
+        with CaptureQueriesContext(connection) as queries:
+            make_review(booking, rating=4)
+        selects = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+        self.assertEqual(selects, [])
+
+    def test_histogram_update_binds_only_integers(self):
+        review = make_review(self._completed_booking(), rating=5)
+        review.rating = 2
+        for save in (review.save, review.delete):
+            with mock.patch.object(connection.ops, 'last_executed_query', wraps=connection.ops.last_executed_query) as sql:
+                with CaptureQueriesContext(connection):
+                    save()
+            updates = [call.args[2] for call in sql.call_args_list if call.args[1].startswith('UPDATE "listings_listing"')]
+            self.assertEqual(len(updates), 1)
+            self.assertFalse(any(isinstance(param, bool) for param in updates[0]), updates[0])
+
+    def test_save_checks_the_booking_in_one_query(self):
+        booking = self._completed_booking()
+        review = Review(listing_id=self.listing.pk, booking_id=booking.pk, reviewer_id=booking.guest_id, rating=3)
+        with CaptureQueriesContext(connection) as queries:
+            review.save()
+        selects = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+        self.assertEqual(len(selects), 1)
+        self.assertIn('"listings_booking"', selects[0])
+
+    def test_save_rejects_a_booking_of_another_listing(self):
+        booking = self._completed_booking(make_listing())
+        with self.assertRaises(ValueError):
+            Review.objects.create(listing=self.listing, booking=booking, reviewer=booking.guest, rating=3)
+
+
+class ListingReviewsEndpointTests(TestCase):
+    def setUp(self):
+        self.listing = make_listing()
+        self.client = APIClient()
+        self.url = reverse('listings:listing-reviews', args=[self.listing.pk])
+
+    def test_lists_reviews_with_summary(self):
+        for rating in (5, 4, 4):
+            make_review(make_booking(self.listing, status='COMPLETED'), rating=rating)
+
+        # The listing, then one page of reviews joined to their reviewers
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'count': 'true'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([review['rating'] for review in response.data['results']], [4, 4, 5])
+        self.assertIn('email', response.data['results'][0]['reviewer'])
+        self.assertEqual(response.data['summary'], {
+            'average_rating': 13 / 3,
+            'review_count': 3,
+            'histogram': {1: 0, 2: 0, 3: 0, 4: 2, 5: 1},
+        })
+
+    def test_pages_with_cursors(self):
+        reviews = [make_review(make_booking(self.listing, status='COMPLETED')) for _ in range(3)]
+        seen, url = [], self.url
+        with mock.patch.object(KeysetPagination, 'page_size', 2):
+            while url:
+                response = self.client.get(url)
+                seen.extend(review['id'] for review in response.data['results'])
+                url = response.data['next']
+        self.assertEqual(seen, [review.pk for review in reversed(reviews)])
+
+    def test_guest_reviews_a_completed_booking(self):
+        booking = make_booking(self.listing, status='COMPLETED')
+        self.client.force_authenticate(booking.guest)
+        response = self.client.post(self.url, {'booking': booking.pk, 'rating': 4, 'comment': 'Lovely'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['reviewer']['id'], booking.guest_id)
+        self.listing.refresh_from_db()
+        self.assertEqual((self.listing.review_count, self.listing.stars_4), (1, 1))
+
+        response = self.client.post(self.url, {'booking': booking.pk, 'rating': 2})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Review.objects.count(), 1)
+
+    def test_rejects_bookings_the_user_cannot_review(self):
+        booking = make_booking(self.listing, status='COMPLETED')
+        cases = [
+            (make_user(), booking),
+            (booking.guest, make_booking(self.listing, guest=booking.guest, check_in=booking.check_out)),
+            (booking.guest, make_booking(make_listing(), guest=booking.guest, status='COMPLETED')),
+        ]
+        for user, reviewed in cases:
+            self.client.force_authenticate(user)
+            response = self.client.post(self.url, {'booking': reviewed.pk, 'rating': 5})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('booking', response.data)
+        self.assertFalse(Review.objects.exists())
+
+    def test_anonymous_users_cannot_post(self):
+        booking = make_booking(self.listing, status='COMPLETED')
+        response = self.client.post(self.url, {'booking': booking.pk, 'rating': 5})
+        self.assertIn(response.status_code, (401, 403))
@@ -0,0 +1,70 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..search import get_search_backend, search_terms
+from .base import TestCase
+from .factories import make_user, make_listing, make_listings
+
+
+@override_settings(LISTINGS_CACHE_TIMEOUT=0)
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'full-text search backend required')
+class ListingFullTextSearchTests(TestCase):
+    def setUp(self):
+        self.host = make_user()
+        self.client = APIClient()
+        self.url = reverse('listings:listing-list')
+        self.in_title = make_listing(self.host, title='Seaside villa with pool')
+        self.in_description = make_listing(
+            self.host, title='Quiet retreat', description='A short walk to the seaside.'
+        )
+        self.in_city = make_listing(self.host, title='Loft', city='Mombasa')
+        self.unrelated = make_listing(self.host, title='Mountain cabin', description='Snowy peaks.')
+
+    def _search(self, term, **params):
+        response = self.client.get(self.url, {'search': term, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_ranks_title_matches_first(self):
+        self.assertEqual(self._search('seaside'), [self.in_title.id, self.in_description.id])
+
+    def test_terms_are_prefix_matched_and_anded(self):
+        self.assertEqual(self._search('mombas'), [self.in_city.id])
+        self.assertEqual(self._search('seaside pool'), [self.in_title.id])
+
+    def test_explicit_ordering_overrides_rank(self):
+        ids = self._search('seaside', ordering='created_at')
+        self.assertEqual(ids, [self.in_title.id, self.in_description.id])
+        ids = self._search('seaside', ordering='-created_at')
+        self.assertEqual(ids, [self.in_description.id, self.in_title.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.unrelated.title = 'Seaside cabin'
+        self.unrelated.save()
+        self.assertIn(self.unrelated.id, self._search('seaside'))
+
+        self.in_title.delete()
+        self.assertNotIn(self.in_title.id, self._search('seaside'))
+
+    def test_punctuation_cannot_break_the_query(self):
+        self.assertEqual(self._search('"seaside* ('), [self.in_title.id, self.in_description.id])
+        self.assertEqual(len(self._search('!!!')), 4)
+
+    def test_rebuild_picks_up_bulk_created_rows(self):
+        bulk = make_listings(self.host, 2, title='Treehouse hideaway')
+        self.assertEqual(self._search('treehouse'), [])
+        get_search_backend().rebuild()
+        self.assertEqual(sorted(self._search('treehouse')), sorted(l.id for l in bulk))
+
+    @override_settings(LISTINGS_SEARCH_BACKEND='')
+    def test_icontains_fallback(self):
+        self.assertEqual(sorted(self._search('seasid')), sorted([self.in_title.id, self.in_description.id]))
+
+
+class SearchTermsTests(TestCase):
+    def test_keeps_word_tokens_only(self):
+        self.assertEqual(search_terms(['Beach-House', '"pool"*', 'AND']), ['beach', 'house', 'pool', 'and'])
@@ -0,0 +1,81 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Exists, F, OuterRef
+
+from ..models import Listing, Booking, Review
+from .base import TestCase
+
+User = get_user_model()
+
+
+class BulkSeedTests(TestCase):
+    options = {
+        'bulk': True, 'users': 30, 'listings': 25, 'bookings': 300,
+        'reviews': 60, 'batch_size': 7, 'seed': 7,
+    }
+
+    def _seed(self, **overrides):
+        out = StringIO()
+        call_command('seed', stdout=out, **{**self.options, **overrides})
+        return out.getvalue()
+
+    def _snapshot(self):
+        return (
+            list(User.objects.order_by('pk').values_list('pk', 'username', 'first_name', 'last_name')),
+            list(Listing.objects.order_by('pk').values_list(
+                'pk', 'title', 'host_id', 'price_per_night', 'latitude', 'amenities', 'is_active')),
+            list(Booking.objects.order_by('pk').values_list(
+                'pk', 'listing_id', 'guest_id', 'check_in', 'check_out', 'status', 'total_price')),
+            list(Review.objects.order_by('pk').values_list('pk', 'booking_id', 'reviewer_id', 'rating')),
+        )
+
+    def test_creates_requested_volume_and_reports_throughput(self):
+        output = self._seed()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Listing.objects.count(), 25)
+        self.assertEqual(Booking.objects.count(), 300)
+        self.assertGreater(Review.objects.count(), 0)
+        self.assertLessEqual(Review.objects.count(), 60)
+        self.assertIn('rows/s', output)
+
+    def test_same_seed_same_data(self):
+        self._seed()
+        first = self._snapshot()
+        for model in (Review, Booking, Listing, User):
+            model.objects.all().delete()
+        self._seed()
+        self.assertEqual(self._snapshot(), first)
+
+        for model in (Review, Booking, Listing, User):
+            model.objects.all().delete()
+        self._seed(seed=8)
+        self.assertNotEqual(self._snapshot()[1], first[1])
+
+    def test_bookings_never_overlap_within_a_listing(self):
+        self._seed()
+        overlapping = Booking.objects.filter(
+            listing=OuterRef('listing'), check_in__lt=OuterRef('check_out'), check_out__gt=OuterRef('check_in')
+        ).exclude(pk=OuterRef('pk'))
+        self.assertFalse(Booking.objects.filter(Exists(overlapping)).exists())
+        self.assertFalse(Booking.objects.filter(guest=F('listing__host')).exists())
+
+    def test_reviews_are_valid_and_aggregates_refreshed(self):
+        self._seed()
+        self.assertFalse(Review.objects.exclude(reviewer=F('booking__guest')).exists())
+        self.assertFalse(Review.objects.exclude(booking__status='COMPLETED').exists())
+        for listing in Listing.objects.filter(review_count__gt=0)[:5]:
+            self.assertEqual(listing.review_count, listing.reviews.count())
+
+    def test_password_is_hashed_once_and_usable(self):
+        self._seed(users=3, listings=1, bookings=0, reviews=0)
+        hashes = set(User.objects.values_list('password', flat=True))
+        self.assertEqual(len(hashes), 1)
+        self.assertTrue(User.objects.first().check_password('password123'))
+
+    def test_appends_after_existing_rows(self):
+        self._seed()
+        self._seed(seed=9)
+        self.assertEqual(Listing.objects.count(), 50)
+        self.assertEqual(Booking.objects.count(), 600)
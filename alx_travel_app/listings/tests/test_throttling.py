@@ -0,0 +1,199 @@
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .. import throttling
+from .base import TestCase
+from .factories import make_user, make_listing
+
+# Fixed clock for tests reading header values
+NOW = 1200.0
+# Average cost of one allow_request on the locmem cache (best of several runs)
+OVERHEAD_BUDGET_US = 200
+
+
+class FakeRedis:
+    """redis-py stand-in whose scripts run take_token against a dict, at ``now``."""
+    def __init__(self, now):
+        self.now = now
+        self.buckets = {}
+        self.calls = []
+        self.scripts = []
+
+    def register_script(self, source):
+        self.scripts.append(source)
+
+        def script(keys, args, client):
+            self.calls.append((keys, args))
+            (key,), (rate, capacity) = keys, args
+            allowed, tokens = throttling.take_token(self.buckets.get(key), self.now, rate, capacity)
+            self.buckets[key] = (tokens, self.now)
+            return [int(allowed), str(tokens)]
+        return script
+
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = 1000.0
+        self.store = throttling.TokenBucketStore(clock=lambda: self.now)
+
+    def _take_all(self, take):
+        """Burst four requests into a 3-token bucket refilling 1/s, then let it refill."""
+        results = [take()[0] for _ in range(4)]
+        self.now += 1.5
+        allowed, rate_limit = take()
+        results.append((allowed, rate_limit.remaining, rate_limit.reset))
+        self.now += 100
+        allowed, rate_limit = take()
+        # Refills up to the capacity, never past it
+        results.append((allowed, rate_limit.remaining, rate_limit.reset))
+        return results
+
+    def test_parse_rate(self):
+        self.assertEqual(throttling.parse_rate('120/min'), (120, 2.0))
+        self.assertEqual(throttling.parse_rate('10/s'), (10, 10.0))
+        self.assertEqual(throttling.parse_rate('48/day'), (48, 48 / 86400))
+
+    def test_burst_then_refill(self):
+        self.assertEqual(
+            self._take_all(lambda: self.store.take('t', 1.0, 3)),
+            [True, True, True, False, (True, 0, 2.5), (True, 2, 1.0)],
+        )
+
+    def test_shared_cache_bucket(self):
+        def take():
+            # Any cache without scripts; the locmem one stands in for memcached
+            return self.store._take_shared(cache, 'shared', 1.0, 3)
+        self.assertEqual(self._take_all(take), [True, True, True, False, (True, 0, 2.5), (True, 2, 1.0)])
+        self.assertIsNone(cache.get('shared:lock'))
+
+        with mock.patch.object(cache, 'add', wraps=cache.add) as add, \
+                mock.patch.object(cache, 'get', wraps=cache.get) as get, \
+                mock.patch.object(cache, 'set', wraps=cache.set) as set_, \
+                mock.patch.object(cache, 'delete', wraps=cache.delete) as delete:
+            take()
+        self.assertEqual([call.call_count for call in (add, get, set_, delete)], [1, 1, 1, 1])
+
+    def test_shared_cache_lets_through_when_locked(self):
+        cache.add('shared:lock', 1)
+        with mock.patch.object(throttling, 'LOCK_WAIT', 0):
+            self.assertEqual(self.store._take_shared(cache, 'shared', 1.0, 3), (True, None))
+        self.assertIsNone(cache.get('shared'))
+
+    def test_redis_script(self):
+        redis = FakeRedis(now=self.now)
+        redis_cache = RedisCache('redis://localhost:6379/0', {})
+        # Stands in for the client wrapper RedisCache would build lazily
+        redis_cache.__dict__['_cache'] = SimpleNamespace(get_client=lambda key, write: redis)
+
+        def take():
+            redis.now = self.now
+            return self.store._take_redis(redis_cache, 'listings:throttle:r', 1.0, 3)
+        self.assertEqual(self._take_all(take), [True, True, True, False, (True, 0, 2.5), (True, 2, 1.0)])
+        self.assertEqual(redis.scripts, [throttling.TAKE_SCRIPT])
+        key = redis_cache.make_and_validate_key('listings:throttle:r')
+        self.assertEqual(set(keys[0] for keys, _ in redis.calls), {key})
+        self.assertEqual(redis.calls[0][1], [1.0, 3])
+
+    @override_settings(LISTINGS_THROTTLE_RATES={'listing.list': '1000000/s'})
+    def test_overhead(self):
+        throttle = throttling.TokenBucketThrottle()
+        request = Request(APIRequestFactory().get('/api/listings/'), authenticators=())
+        view = SimpleNamespace(throttle_scope='listing', action='list')
+        throttle.allow_request(request, view)
+
+        rounds = 2000
+        timings = []
+        # Best of several runs, so a busy machine does not fail the budget
+        for _ in range(5):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                throttle.allow_request(request, view)
+            timings.append((time.perf_counter() - start) / rounds * 1e6)
+        self.assertLess(min(timings), OVERHEAD_BUDGET_US)
+
+    @override_settings(LISTINGS_THROTTLE_RATES={'listing.list': '1000000/s'})
+    def test_locmem_bucket_is_one_read_and_one_write(self):
+        throttle = throttling.TokenBucketThrottle()
+        request = Request(APIRequestFactory().get('/api/listings/'), authenticators=())
+        view = SimpleNamespace(throttle_scope='listing', action='list')
+        store_cache = throttling.bucket_store.cache
+
+        rounds = 100
+        calls = {}
+        with mock.patch.object(store_cache, 'get', wraps=store_cache.get) as calls['get'], \
+                mock.patch.object(store_cache, 'set', wraps=store_cache.set) as calls['set'], \
+                mock.patch.object(store_cache, 'add', wraps=store_cache.add) as calls['add'], \
+                mock.patch.object(store_cache, 'incr', wraps=store_cache.incr) as calls['incr']:
+            for _ in range(rounds):
+                self.assertTrue(throttle.allow_request(request, view))
+        self.assertEqual({name: call.call_count for name, call in calls.items()},
+                         {'get': rounds, 'set': rounds, 'add': 0, 'incr': 0})
+
+
+@override_settings(
+    LISTINGS_CACHE_TIMEOUT=0,
+    LISTINGS_THROTTLE_RATES={'listing.list': '3/min', 'booking.create': '1/min'},
+)
+class ThrottleTests(TestCase):
+    def setUp(self):
+        clock = mock.patch.object(throttling.bucket_store, 'clock', lambda: NOW)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.client = APIClient()
+        self.url = reverse('listings:listing-list')
+        self.listing = make_listing()
+
+    def test_list_limit(self):
+        remaining = []
+        for _ in range(3):
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-RateLimit-Limit'], '3')
+            remaining.append(response['X-RateLimit-Remaining'])
+        self.assertEqual(remaining, ['2', '1', '0'])
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '20')
+        self.assertEqual(response['X-RateLimit-Remaining'], '0')
+        self.assertEqual(response['X-RateLimit-Reset'], '60')
+
+        # Another client address and a signed in user have buckets of their own
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR='10.0.0.2').status_code, 200)
+        self.client.force_authenticate(make_user())
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_per_action(self):
+        for _ in range(3):
+            self.client.get(self.url)
+        detail = self.client.get(reverse('listings:listing-detail', args=[self.listing.pk]))
+        self.assertEqual(detail.status_code, 200)
+        self.assertNotIn('X-RateLimit-Limit', detail)
+        self.assertEqual(self.client.get(reverse('listings:listing-list-async')).status_code, 429)
+
+    def test_booking_create(self):
+        guest = make_user()
+        self.client.force_authenticate(guest)
+        url = reverse('listings:booking-list')
+        check_in = date.today() + timedelta(days=10)
+        payload = {
+            'listing': self.listing.pk, 'guest_id': guest.pk, 'number_of_guests': 1,
+            'check_in': check_in, 'check_out': check_in + timedelta(days=2),
+        }
+        self.assertEqual(self.client.post(url, payload, format='json').status_code, 201)
+        payload.update(check_in=check_in + timedelta(days=5), check_out=check_in + timedelta(days=7))
+        response = self.client.post(url, payload, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        # Reads of the same user are not held back by the write limit
+        self.assertEqual(self.client.get(url).status_code, 200)
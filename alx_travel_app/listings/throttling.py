@@ -0,0 +1,202 @@
+"""
+Token-bucket rate limiting per user (or client IP) and viewset action.
+
+Limits live in LISTINGS_THROTTLE_RATES under ``<throttle_scope>.<action>``
+keys, e.g. ``{'listing.list': '120/min', 'booking.create': '10/min'}``.
+A rate of N per period is a bucket of N tokens refilled at N/period per
+second, so a client can burst up to N requests and is then held to the
+average rate. Actions without an entry are not limited.
+
+Buckets live in the LISTINGS_CACHE_ALIAS cache and are refilled and
+taken from atomically on every backend:
+
+* Redis: a Lua script does both in one round trip, using the server clock.
+* Local memory: the bucket is read and written under a process-wide lock.
+  The cache is per process too, so this is exact and never leaves it.
+* Other shared caches (memcached, database, file) have no scripts or
+  compare-and-set, so the read and write are guarded by a lock key taken
+  with ``add``: four round trips (add, get, set, delete). A request that
+  cannot take the lock within LOCK_WAIT seconds is let through unmetered.
+"""
+import math
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+# Shared caches: how long to wait for a bucket's lock key, and when the
+# key expires if its holder died
+LOCK_WAIT = 0.05
+LOCK_TIMEOUT = 1
+
+# KEYS[1] bucket; ARGV refill per second, capacity. Returns {allowed, tokens}.
+# Reading TIME before writing needs Redis 5+ (effect replication).
+TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'stamp')
+local tokens = tonumber(state[1]) or capacity
+local stamp = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - stamp) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'stamp', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """``'120/min'`` -> (capacity 120, refill 2.0 tokens per second)."""
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / PERIODS[period.strip()[0]]
+
+
+def take_token(state, now, rate, capacity):
+    """
+    Refill bucket ``state`` (``(tokens, stamp)``, or None for a full bucket)
+    up to ``now`` and take a token: (allowed, tokens left). Mirrors TAKE_SCRIPT.
+    """
+    tokens, stamp = state or (capacity, now)
+    tokens = min(capacity, tokens + max(0.0, now - stamp) * rate)
+    allowed = tokens >= 1
+    if allowed:
+        tokens -= 1
+    return allowed, tokens
+
+
+class TokenBucketStore:
+    """Takes tokens from buckets kept in the listings cache."""
+    prefix = 'listings:throttle'
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._script = None
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'LISTINGS_CACHE_ALIAS', 'default')]
+
+    def take(self, key, rate, capacity):
+        """
+        Take a token from bucket ``key``; returns (allowed, RateLimit), the
+        RateLimit being None when a shared cache's bucket could not be locked.
+        """
+        cache = self.cache
+        key = f'{self.prefix}:{key}'
+        if isinstance(cache, RedisCache):
+            return self._take_redis(cache, key, rate, capacity)
+        if isinstance(cache, LocMemCache):
+            with self._lock:
+                return self._take_locked(cache, key, rate, capacity)
+        return self._take_shared(cache, key, rate, capacity)
+
+    def _take_redis(self, cache, key, rate, capacity):
+        key = cache.make_and_validate_key(key)
+        # RedisCache has no public way to run a script; its client wrapper
+        # hands out the redis-py client that owns ``key``
+        client = cache._cache.get_client(key, write=True)
+        if self._script is None:
+            # Sent as EVALSHA, loading the script on the first miss
+            self._script = client.register_script(TAKE_SCRIPT)
+        allowed, tokens = self._script(keys=[key], args=[rate, capacity], client=client)
+        return bool(allowed), RateLimit.from_bucket(capacity, rate, float(tokens))
+
+    def _take_locked(self, cache, key, rate, capacity):
+        """Refill and take with the caller holding the bucket's lock."""
+        now = self.clock()
+        allowed, tokens = take_token(cache.get(key), now, rate, capacity)
+        cache.set(key, (tokens, now), math.ceil(capacity / rate) + 1)
+        return allowed, RateLimit.from_bucket(capacity, rate, tokens)
+
+    def _take_shared(self, cache, key, rate, capacity):
+        lock = f'{key}:lock'
+        deadline = time.monotonic() + LOCK_WAIT
+        while not cache.add(lock, 1, LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                return True, None
+            time.sleep(0.001)
+        try:
+            return self._take_locked(cache, key, rate, capacity)
+        finally:
+            cache.delete(lock)
+
+
+bucket_store = TokenBucketStore()
+
+
+class RateLimit:
+    """
+    The limiter state of one throttled request, for the response headers:
+    requests left, seconds until the limit is whole again (``reset``) and
+    until the next request is let through (``retry_after``).
+    """
+    __slots__ = ('limit', 'remaining', 'reset', 'retry_after')
+
+    def __init__(self, limit, remaining, reset, retry_after):
+        self.limit = limit
+        self.remaining = max(0, int(remaining))
+        self.reset = max(0.0, reset)
+        self.retry_after = max(0.0, retry_after)
+
+    @classmethod
+    def from_bucket(cls, limit, rate, tokens):
+        """State of a token bucket holding ``tokens`` and refilling at ``rate`` per second."""
+        return cls(limit, tokens, reset=(limit - tokens) / rate, retry_after=(1 - tokens) / rate)
+
+    def headers(self):
+        return {
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Remaining': str(self.remaining),
+            'X-RateLimit-Reset': str(math.ceil(self.reset)),
+        }
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttles ``<view.throttle_scope>.<view.action>`` by LISTINGS_THROTTLE_RATES.
+
+    The bucket state is left on ``request.rate_limit`` for
+    RateLimitHeadersMixin; DRF adds ``Retry-After`` to 429 responses.
+    """
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        rate = scope and settings.LISTINGS_THROTTLE_RATES.get(f'{scope}.{view.action}')
+        if not rate:
+            return True
+        capacity, per_second = parse_rate(rate)
+
+        user = request.user
+        ident = f'user:{user.pk}' if user.is_authenticated else f'ip:{self.get_ident(request)}'
+        allowed, rate_limit = bucket_store.take(f'{scope}.{view.action}:{ident}', per_second, capacity)
+        if rate_limit is not None:
+            self.rate_limit = request.rate_limit = rate_limit
+        return allowed
+
+    def wait(self):
+        return self.rate_limit.retry_after
+
+
+class RateLimitHeadersMixin:
+    """Adds the ``X-RateLimit-*`` headers of TokenBucketThrottle to responses."""
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        rate_limit = getattr(request, 'rate_limit', None)
+        if rate_limit is not None:
+            for name, value in rate_limit.headers().items():
+                response[name] = value
+        return response
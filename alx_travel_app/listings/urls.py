@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
 
 # Create a router and register our viewsets
 router = DefaultRouter()
 router.register(r'listings', views.ListingViewSet, basename='listing')
 router.register(r'bookings', views.BookingViewSet, basename='booking')
+router.register(r'export-jobs', views.ExportJobViewSet, basename='export-job')
 
 app_name = 'listings'
 
@@ -18,4 +19,8 @@ urlpatterns = [
     path('bookings/<int:pk>/update_status/', 
          views.BookingViewSet.as_view({'patch': 'update_status'}), 
          name='booking-update-status'),
+
+    # Async variants of the listing reads, for ASGI deployments
+    path('async/listings/', async_views.AsyncListingList.as_view(), name='listing-list-async'),
+    path('async/listings/<str:pk>/', async_views.AsyncListingDetail.as_view(), name='listing-detail-async'),
 ]
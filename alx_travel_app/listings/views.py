@@ -1,38 +1,360 @@
-from rest_framework import viewsets, permissions, status
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Sum
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from celery.utils import uuid
+from rest_framework import mixins, viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 
-from .models import Listing, Booking, Review
+from . import analytics, batch, changes, conditional, exports, facets, profiling
+from .cache import AVAILABILITY_PARAMS, response_cache
+from .fast_serializers import FastListingSerializer, FastBookingSerializer
+from .filters import AmenityFilter, AvailabilityFilter, BookingFilterSet, ListingFilterSet, NearbyFilter
+from .models import Listing, ListingCalendar, ListingMonthlyStats, Booking, ExportJob, Review, RollupWatermark
+from .pagination import KeysetPagination, PageOrKeysetPagination
+from .search import ListingSearchFilter
 from .serializers import (
     ListingSerializer, 
     BookingSerializer, 
-    BookingStatusUpdateSerializer
+    BookingStatusUpdateSerializer,
+    CalendarQuerySerializer,
+    ExportJobSerializer,
+    FacetQuerySerializer,
+    ListingReviewSerializer,
+    StatsQuerySerializer,
 )
+from .tasks import export_bookings, send_booking_confirmation
+from .throttling import RateLimitHeadersMixin
+
+logger = logging.getLogger(__name__)
+
+
+class FastListMixin:
+    """
+    Serve ``list`` through a values()-based serializer from fast_serializers.
+    """
+    fast_serializer_class = None
+
+    def get_fast_serializer(self, queryset):
+        return self.fast_serializer_class.from_request(self.request)
+
+    def list_extras(self, queryset):
+        """Extra keys for the paginated list body, given the filtered queryset."""
+        return {}
+
+    def change_feed(self, request, queryset):
+        """The rows of ``queryset`` changed after ``?since=``, see listings.changes."""
+        serializer = self.fast_serializer_class.from_request(request)
+        return Response(changes.read_changes(queryset, serializer, request.query_params.get('since')))
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_fast_serializer(queryset)
+        rows = serializer.prepare(queryset)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            with profiling.span(request):
+                data = serializer.serialize_many(page)
+            response = self.get_paginated_response(data)
+            response.data.update(self.list_extras(queryset))
+            return response
+        with profiling.span(request):
+            data = serializer.serialize_many(rows)
+        return Response(data)
+
 
-class ListingViewSet(viewsets.ModelViewSet):
+class ListingViewSet(RateLimitHeadersMixin, FastListMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows listings to be viewed or edited.
+
+    Passing ``check_in``/``check_out`` (and optionally ``guests``) switches
+    the list into availability search mode, see AvailabilityFilter.
+
+    ``list`` and ``retrieve`` are served from response_cache when possible.
+    Pass ``?cursor=`` to page with keyset pagination instead of ``?page=``.
+    ``?search=`` uses the full-text backend from listings.search.
+    ``?near=lat,lng&radius_km=`` lists nearby listings by distance (listings.geo).
+    ``?amenities=wifi,pool[&amenities_match=any]`` filters on amenity_mask.
+    ``list`` accepts ``?fields=``/``?expand=`` (see fast_serializers).
+    ``?facets=property_type,city,bedrooms,price_band`` adds counts per
+    filter value over the filtered list (listings.facets).
+    ``calendar`` returns blocked nights from the listing's occupancy bitmap.
+    ``reviews`` lists and adds reviews; its rating summary is read from
+    the histogram kept on the listing row.
+    ``stats``/``host_stats`` serve monthly figures from ListingMonthlyStats.
+    ``perf_stats`` reports the per-view histograms of ProfilingMiddleware.
+    Actions are rate limited per ``listing.<action>`` (listings.throttling).
+    ``list``/``retrieve`` answer conditional GETs (listings.conditional).
+    ``changes`` is a ``?since=`` feed of every change, deactivations included.
     """
-    queryset = Listing.objects.filter(is_active=True).order_by('-created_at')
+    throttle_scope = 'listing'
+    queryset = Listing.objects.filter(is_active=True).select_related('host').order_by('-created_at', '-id')
     serializer_class = ListingSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['property_type', 'bedrooms', 'bathrooms', 'city', 'country']
+    fast_serializer_class = FastListingSerializer
+    pagination_class = PageOrKeysetPagination
+    filter_backends = [
+        DjangoFilterBackend, AmenityFilter, AvailabilityFilter, filters.OrderingFilter,
+        ListingSearchFilter, NearbyFilter,
+    ]
+    filterset_class = ListingFilterSet
     search_fields = ['title', 'description', 'address', 'city', 'country']
     ordering_fields = ['price_per_night', 'created_at', 'updated_at']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
 
     def get_permissions(self):
         """
         Instantiates and returns the list of permissions that this view requires.
         """
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'cache_stats', 'perf_stats']:
             permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+        elif self.action in ['stats', 'host_stats']:
+            permission_classes = [permissions.IsAuthenticated]
+        elif self.action == 'reviews' and self.request.method == 'POST':
+            permission_classes = [permissions.IsAuthenticated]
         else:
             permission_classes = [permissions.AllowAny]
         return [permission() for permission in permission_classes]
 
+    def get_fast_serializer(self, queryset):
+        annotations = queryset.query.annotations
+        return self.fast_serializer_class.from_request(
+            self.request,
+            availability='annotated' if 'is_available' in annotations else None,
+            distance='distance_km' in annotations,
+        )
+
+    def list_extras(self, queryset):
+        if 'facets' not in self.request.query_params:
+            return {}
+        params = FacetQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        names = params.validated_data['facets']
+
+        timeout = settings.LISTINGS_FACET_CACHE_TIMEOUT
+        if not timeout:
+            return {'facets': facets.facet_counts(queryset, names)}
+        # Cached apart from the page, for every page and ordering of the filter
+        key = response_cache.facet_key(self.request, names)
+        counts = response_cache.cache.get(key)
+        if counts is None:
+            counts = facets.facet_counts(queryset, names)
+            response_cache.set(key, counts, timeout)
+        return {'facets': counts}
+
+    def _cached_response(self, key, view, request, read_validators, use_last_modified=True):
+        """
+        The response of ``view``, from response_cache when possible.
+
+        Conditional GETs are answered with a 304 before anything is
+        serialized. ``read_validators()`` reads the Validators from the
+        database, or returns None for responses that cannot be validated;
+        cached responses keep theirs, so a cache hit runs no query.
+        """
+        data = validators = None
+        if response_cache.enabled:
+            data, state = response_cache.get_entry(key)
+            if state is not None:
+                validators = conditional.Validators(*state)
+        if validators is None:
+            validators = read_validators()
+
+        if validators is not None:
+            not_modified = validators.not_modified(request, use_last_modified)
+            if not_modified is not None:
+                return not_modified
+
+        if data is not None:
+            response = Response(data, headers={'X-Cache': 'HIT'})
+        else:
+            response = view(request)
+            if response_cache.enabled:
+                if response.status_code == status.HTTP_200_OK:
+                    response_cache.set_entry(key, response.data, validators and validators.state())
+                response['X-Cache'] = 'MISS'
+        return validators.apply(response) if validators is not None else response
+
+    def list(self, request, *args, **kwargs):
+        def read_validators():
+            # Availability searches also depend on bookings, which updated_at does not track
+            if any(param in request.query_params for param in AVAILABILITY_PARAMS):
+                return None
+            last_modified, count = conditional.list_state(self.filter_queryset(self.get_queryset()))
+            # The paginator uses this count instead of running its own
+            self.list_count = count
+            return conditional.Validators.build(request, last_modified, count)
+
+        key = response_cache.list_key(request)
+        view = super().list
+        return self._cached_response(
+            key, lambda request: view(request, *args, **kwargs), request, read_validators, use_last_modified=False,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_field]
+
+        def read_validators():
+            if any(param in request.query_params for param in AVAILABILITY_PARAMS):
+                return None
+            try:
+                last_modified = self.filter_queryset(self.get_queryset()).filter(pk=pk).values_list(
+                    'updated_at', flat=True
+                ).first()
+            except (TypeError, ValueError, DjangoValidationError):
+                return None
+            # Unknown listings fall through to the usual 404
+            return conditional.Validators.build(request, last_modified) if last_modified else None
+
+        key = response_cache.detail_key(request, pk)
+        view = super().retrieve
+        return self._cached_response(key, lambda request: view(request, *args, **kwargs), request, read_validators)
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Listings created, updated or deactivated after ``?since=``, oldest change first.
+        """
+        return self.change_feed(request, Listing.objects.all())
+
+    @action(detail=False, methods=['get'], url_path='cache-stats')
+    def cache_stats(self, request):
+        """
+        Hit/miss counters of the listing response cache (staff only).
+        """
+        return Response(response_cache.stats())
+
+    @action(detail=False, methods=['get', 'delete'], url_path='perf-stats')
+    def perf_stats(self, request):
+        """
+        Per-view request profiles from ProfilingMiddleware (staff only); DELETE resets them.
+        """
+        if request.method == 'DELETE':
+            profiling.profile_store.reset()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response(profiling.profile_store.snapshot())
+
+    @action(detail=True, methods=['get'])
+    def calendar(self, request, pk=None):
+        """
+        Blocked nights of a listing between ``?from=`` and ``?to=`` (exclusive).
+        """
+        params = CalendarQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        first, last = params.validated_data['from'], params.validated_data['to']
+
+        listing = self.get_object()
+        calendar = ListingCalendar.objects.filter(listing=listing).first()
+        if calendar is None:
+            calendar = ListingCalendar.build(listing.pk)
+        return Response({
+            'listing': listing.pk,
+            'from': first,
+            'to': last,
+            'blocked': calendar.occupancy.blocked_nights(first, last),
+        })
+
+    @action(detail=True, methods=['get', 'post'])
+    def reviews(self, request, pk=None):
+        """
+        A listing's reviews, newest first and keyset paginated, under a
+        ``summary`` of its rating histogram; POST adds the user's review.
+        """
+        listing = get_object_or_404(Listing.objects.filter(is_active=True), pk=pk)
+        context = {**self.get_serializer_context(), 'listing': listing}
+        if request.method == 'POST':
+            serializer = ListingReviewSerializer(data=request.data, context=context)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        paginator = KeysetPagination()
+        # The listing's review_count is exact, so ?count=true costs nothing
+        self.list_count = listing.review_count
+        page = paginator.paginate_queryset(
+            Review.objects.filter(listing=listing).select_related('reviewer'), request, view=self
+        )
+        response = paginator.get_paginated_response(ListingReviewSerializer(page, many=True, context=context).data)
+        response.data['summary'] = {
+            'average_rating': listing.rating_avg,
+            'review_count': listing.review_count,
+            'histogram': listing.rating_histogram(),
+        }
+        return response
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """
+        Monthly occupancy, revenue and rating of a listing (its host or staff).
+        """
+        listing = get_object_or_404(Listing.objects.only('id', 'host_id'), pk=pk)
+        if listing.host_id != request.user.pk and not request.user.is_staff:
+            raise PermissionDenied("Only the host can see this listing's stats.")
+        first, last = self._stats_window(request)
+
+        rows = ListingMonthlyStats.objects.filter(listing=listing, month__range=(first, last)).values(
+            'month', 'booked_nights', 'revenue', 'bookings', 'review_count', 'rating_total'
+        )
+        opened = analytics.opening_days(Listing.objects.filter(pk=listing.pk))
+        months, totals = analytics.summarize(self._every_month(rows, first, last), opened)
+        return Response({'listing': listing.pk, **self._stats_meta(), 'months': months, 'totals': totals})
+
+    @action(detail=False, methods=['get'], url_path='host-stats')
+    def host_stats(self, request):
+        """
+        Monthly figures over all of a host's active listings; staff may pass ``?host=``.
+
+        A listing adds to the available nights from the day it opened (see
+        analytics.opening_days). Deactivation is not dated, so deactivated
+        listings are left out of every month, nights and capacity alike.
+        """
+        host_id = request.user.pk
+        if request.user.is_staff and request.query_params.get('host'):
+            host_id = request.query_params['host']
+            if not str(host_id).isdigit():
+                raise ValidationError({'host': 'Expected a user id.'})
+        first, last = self._stats_window(request)
+
+        listings = Listing.objects.filter(host_id=host_id, is_active=True)
+        rows = ListingMonthlyStats.objects.filter(listing__in=listings, month__range=(first, last)).values(
+            'month'
+        ).annotate(
+            booked_nights=Sum('booked_nights'), revenue=Sum('revenue'), bookings=Sum('bookings'),
+            review_count=Sum('review_count'), rating_total=Sum('rating_total'),
+        ).order_by('month')
+        opened = analytics.opening_days(listings)
+        months, totals = analytics.summarize(self._every_month(rows, first, last), opened)
+        return Response({
+            'host': int(host_id), 'listings': len(opened), **self._stats_meta(), 'months': months, 'totals': totals,
+        })
+
+    def _stats_window(self, request):
+        params = StatsQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return params.validated_data['from'], params.validated_data['to']
+
+    @staticmethod
+    def _every_month(rows, first, last):
+        """Rollup rows with the months that have none filled in as zeros."""
+        found = {row['month']: row for row in rows}
+        empty = {'booked_nights': 0, 'revenue': Decimal('0'), 'bookings': 0, 'review_count': 0, 'rating_total': 0}
+        return [found.get(month, {'month': month, **empty}) for month in analytics.month_range(first, last)]
+
+    @staticmethod
+    def _stats_meta():
+        # Figures include changes up to this point in time
+        watermark = RollupWatermark.objects.filter(name='bookings').values_list('value', flat=True).first()
+        return {'refreshed_at': watermark}
+
     def perform_create(self, serializer):
         """
         Set the host to the current user when creating a new listing.
@@ -55,15 +377,26 @@ class ListingViewSet(viewsets.ModelViewSet):
         instance.save()
 
 
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(RateLimitHeadersMixin, FastListMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows bookings to be viewed or edited.
+
+    Pass ``?cursor=`` to page with keyset pagination instead of ``?page=``.
+    ``list`` accepts ``?fields=``/``?expand=listing`` (see fast_serializers).
+    ``batch_create``/``batch_status`` take arrays of bookings or status
+    changes and report per item (see listings.batch).
+    ``export`` streams the filtered bookings as NDJSON or CSV (see listings.exports).
+    Actions are rate limited per ``booking.<action>`` (listings.throttling).
+    ``changes`` is a ``?since=`` feed of the user's (or, for staff, all) changed bookings.
     """
+    throttle_scope = 'booking'
     serializer_class = BookingSerializer
+    fast_serializer_class = FastBookingSerializer
+    pagination_class = PageOrKeysetPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = ['listing', 'status', 'guest']
+    filterset_class = BookingFilterSet
     ordering_fields = ['check_in', 'check_out', 'created_at']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
 
     def get_queryset(self):
         """
@@ -71,8 +404,8 @@ class BookingViewSet(viewsets.ModelViewSet):
         """
         user = self.request.user
         if user.is_staff:
-            return Booking.objects.all().order_by('-created_at')
-        return Booking.objects.filter(guest=user).order_by('-created_at')
+            return Booking.objects.all().order_by('-created_at', '-id')
+        return Booking.objects.filter(guest=user).order_by('-created_at', '-id')
 
     def get_serializer_class(self):
         """
@@ -88,7 +421,8 @@ class BookingViewSet(viewsets.ModelViewSet):
         """
         if self.action in ['create']:
             permission_classes = [permissions.IsAuthenticated]
-        elif self.action in ['update', 'partial_update', 'destroy', 'update_status']:
+        elif self.action in ['update', 'partial_update', 'destroy', 'update_status', 'batch_create', 'batch_status',
+                             'export']:
             permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
         else:
             permission_classes = [permissions.IsAuthenticated]
@@ -96,9 +430,26 @@ class BookingViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         """
-        Set the guest to the current user when creating a new booking.
+        Set the guest to the current user when creating a new booking and
+        queue the confirmation email once the booking is committed.
         """
-        serializer.save(guest=self.request.user)
+        booking = serializer.save(guest=self.request.user)
+        transaction.on_commit(lambda: self._enqueue_confirmation(booking.pk))
+
+    @staticmethod
+    def _enqueue_confirmation(booking_id):
+        try:
+            send_booking_confirmation.delay(booking_id)
+        except Exception:
+            # The booking is already saved; send_pending_confirmations retries it
+            logger.exception("Could not queue confirmation for booking %s", booking_id)
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Bookings created or updated after ``?since=``, oldest change first.
+        """
+        return self.change_feed(request, self.get_queryset())
 
     @action(detail=True, methods=['patch'])
     def update_status(self, request, pk=None):
@@ -112,3 +463,101 @@ class BookingViewSet(viewsets.ModelViewSet):
             serializer.save()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['get'], renderer_classes=[exports.NDJSONRenderer, exports.CSVRenderer])
+    def export(self, request):
+        """
+        Stream all bookings matching the list filters, ``?format=ndjson`` or ``csv`` (staff only).
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        renderer = request.accepted_renderer
+        rows = exports.booking_rows(queryset, settings.LISTINGS_EXPORT_CHUNK_SIZE)
+        response = StreamingHttpResponse(
+            renderer.stream(rows), content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        filename = f'bookings-{timezone.localdate():%Y%m%d}.{renderer.format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch_create(self, request):
+        """
+        Create many bookings at once (staff only); each item gets its own result.
+        """
+        results = batch.import_bookings(self._batch_items(request))
+        return self._batch_response(results, 'created', status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['patch'], url_path='batch-status')
+    def batch_status(self, request):
+        """
+        Change the status of many bookings at once (staff only); each item gets its own result.
+        """
+        results = batch.update_statuses(self._batch_items(request))
+        return self._batch_response(results, 'updated', status.HTTP_200_OK)
+
+    @staticmethod
+    def _batch_items(request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'non_field_errors': ['Expected a non-empty list of items.']})
+        if len(items) > settings.LISTINGS_BATCH_MAX_ITEMS:
+            raise ValidationError({'non_field_errors': [f'At most {settings.LISTINGS_BATCH_MAX_ITEMS} items per request.']})
+        return items
+
+    @staticmethod
+    def _batch_response(results, done, success_status):
+        failed = sum(1 for result in results if 'errors' in result)
+        return Response(
+            {done: len(results) - failed, 'failed': failed, 'results': results},
+            status=status.HTTP_207_MULTI_STATUS if failed else success_status,
+        )
+
+
+class ExportJobViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Background booking exports (staff only).
+
+    ``create`` queues listings.tasks.export_bookings; poll ``retrieve`` for
+    status and progress, then download each gzip NDJSON chunk from
+    ``chunk``. ``resume`` re-queues a job that stopped before completing.
+    """
+    queryset = ExportJob.objects.all()
+    serializer_class = ExportJobSerializer
+    permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+
+    def perform_create(self, serializer):
+        job = serializer.save(requested_by=self.request.user, task_id=uuid())
+        transaction.on_commit(lambda: self._enqueue(job))
+
+    @staticmethod
+    def _enqueue(job):
+        try:
+            export_bookings.apply_async((job.pk,), task_id=job.task_id)
+        except Exception:
+            # The job is saved; it can be started again with resume
+            logger.exception("Could not queue export job %s", job.pk)
+
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        """
+        Queue the job again; it carries on after its last written chunk.
+        """
+        job = self.get_object()
+        if job.status == 'COMPLETED':
+            raise ValidationError({'status': 'This export has already completed.'})
+        job.task_id = uuid()
+        job.save(update_fields=['task_id', 'updated_at'])
+        transaction.on_commit(lambda: self._enqueue(job))
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'], url_path=r'chunks/(?P<number>[0-9]+)')
+    def chunk(self, request, pk=None, number=None):
+        """
+        Download one gzip NDJSON chunk of the export.
+        """
+        job = self.get_object()
+        number = int(number)
+        if not 1 <= number <= job.chunks_written:
+            raise NotFound('No such chunk.')
+        path = exports.chunk_path(job, number)
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name, content_type='application/gzip')